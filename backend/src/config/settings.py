@@ -7,7 +7,13 @@ load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = os.getenv('DJANGO_SECRET_KEY')
-DEBUG = True
+DEBUG = os.getenv('DJANGO_DEBUG', '1') == '1'
+
+# Необязательные подсистемы. На рабочих воркерах их можно выключить,
+# тогда их модули не импортируются при старте процесса
+ENABLE_ADMIN = os.getenv('DJANGO_ADMIN', '1') == '1'
+ENABLE_API_DOCS = os.getenv('API_DOCS', '1') == '1'
+ENABLE_DEBUG_TOOLBAR = DEBUG and os.getenv('DEBUG_TOOLBAR', '1') == '1'
 
 ALLOWED_HOSTS = ['127.0.0.1', ]
 INTERNAL_IPS = ['127.0.0.1', ]
@@ -15,7 +21,6 @@ CORS_ORIGIN_WHITELIST = ['http://localhost:8080',
                          'http://127.0.0.1:8000']
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sites',
@@ -28,13 +33,17 @@ INSTALLED_APPS = [
     'allauth.account',
     'rest_auth',
     'rest_framework.authtoken',
-    'django_filters',
-    'debug_toolbar',
-    'drf_yasg',
     'corsheaders',
 
-    'users',
+    'core',
+    'users.apps.UsersConfig',
 ]
+if ENABLE_ADMIN:
+    INSTALLED_APPS.insert(0, 'django.contrib.admin')
+if ENABLE_DEBUG_TOOLBAR:
+    INSTALLED_APPS.append('debug_toolbar')
+if ENABLE_API_DOCS:
+    INSTALLED_APPS.append('drf_yasg')
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -45,11 +54,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
-    'debug_toolbar_force.middleware.ForceDebugToolbarMiddleware',
 
     'core.middleware.ExceptionHandler',
 ]
+if ENABLE_DEBUG_TOOLBAR:
+    MIDDLEWARE[-1:-1] = [
+        'debug_toolbar.middleware.DebugToolbarMiddleware',
+        'debug_toolbar_force.middleware.ForceDebugToolbarMiddleware',
+    ]
 
 ROOT_URLCONF = 'config.urls'
 
@@ -102,6 +114,36 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Хэширование паролей: argon2, bcrypt или pbkdf2.
+# При PASSWORD_HASHING_WORKERS > 0 хэширование выполняется в пуле процессов
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'pbkdf2')
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', 0))
+# Остальные алгоритмы нужны для проверки старых паролей,
+# при входе они перехэшируются основным алгоритмом
+_PASSWORD_HASHERS = {
+    'argon2': 'Argon2PasswordHasher',
+    'bcrypt': 'BCryptSHA256PasswordHasher',
+    'pbkdf2': 'PBKDF2PasswordHasher',
+}
+_PASSWORD_HASHERS_PREFIX = ('core.hashers.Pooled' if PASSWORD_HASHING_WORKERS
+                            else 'django.contrib.auth.hashers.')
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS_PREFIX + _PASSWORD_HASHERS[name]
+    for name in sorted(_PASSWORD_HASHERS, key=lambda n: n != PASSWORD_HASHER)
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+# Фоновые задачи, см. core.tasks и manage.py run_tasks
+TASKS_BACKEND = os.getenv('TASKS_BACKEND', 'core.tasks.DatabaseBackend')
+
+# Снимок графа подписок, см. manage.py build_graph_snapshot
+GRAPH_SNAPSHOT_PATH = os.getenv('GRAPH_SNAPSHOT_PATH')
+
+# Алиасы DATABASES для шардов графа подписок, см. users.repository.
+# Чтение из шардов включается после backfill_follow_shards
+DATABASE_ROUTERS = ['users.routers.FollowShardRouter']
+FOLLOW_SHARDS = []
+FOLLOW_SHARDS_READ = False
+
 # djangorestframework
 
 REST_FRAMEWORK = {
@@ -113,6 +155,15 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
 
     'DEFAULT_PAGINATION_CLASS':
@@ -148,6 +199,8 @@ USE_TZ = True
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 STATIC_URL = '/static/'
+# Заранее отрендеренная схема API, см. manage.py render_schema
+SCHEMA_ROOT = os.path.join(STATIC_ROOT, 'schema')
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
@@ -1,24 +1,28 @@
 from django.conf import settings
 from django.conf.urls.static import static
-from django.contrib import admin
 from django.urls import path, include
-from .yasg import urlpaatterns as doc_urls
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('api-auth/', include('rest_framework.urls')),
     path('api/', include('users.urls')),
 ]
 
+# Admin
+if settings.ENABLE_ADMIN:
+    from django.contrib import admin
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
+
 # Documentation
-urlpatterns += doc_urls
+if settings.ENABLE_API_DOCS:
+    from .yasg import urlpaatterns as doc_urls
+    urlpatterns += doc_urls
 
 # Static
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL,
                           document_root=settings.MEDIA_ROOT)
 # Debug toolbar
-if settings.DEBUG:
+if settings.ENABLE_DEBUG_TOOLBAR:
     import debug_toolbar
     urlpatterns = [
         path('__debug__/', include(debug_toolbar.urls)),
@@ -1,27 +1,122 @@
+import hashlib
+import os
+from functools import lru_cache
+
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse
 from django.urls import path
 from drf_yasg import openapi
+from drf_yasg.renderers import _SpecRenderer
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
+info = openapi.Info(
+    title='Django Movies',
+    default_version='v1',
+    desctiprion='Movie api',
+    license=openapi.License(name='BSD License'),
+)
+
 schema_view = get_schema_view(
-    openapi.Info(
-        title='Django Movies',
-        default_version='v1',
-        desctiprion='Movie api',
-        license=openapi.License(name='BSD License'),
-    ),
+    info,
     public=True,
     permission_classes=(permissions.AllowAny,)
 )
 
+
+@lru_cache(maxsize=None)
+def code_version():
+    """
+    Версия кода для инвалидации схемы: CODE_VERSION из настроек
+    или окружения (например хэш коммита), иначе хэш исходников,
+    из которых строится схема
+    """
+    version = getattr(settings, 'CODE_VERSION', None) or \
+        os.getenv('CODE_VERSION')
+    if version:
+        return version
+    digest = hashlib.md5()
+    for file_path in schema_source_files():
+        # Относительный путь не зависит от каталога деплоя
+        digest.update(os.path.relpath(file_path, settings.BASE_DIR).encode())
+        with open(file_path, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:12]
+
+
+def schema_source_files():
+    """
+    Модули верхнего уровня приложений проекта и пакета config:
+    urls, views, serializers и т.д. Миграции, тесты, команды,
+    static и media в схему не попадают и не обходятся.
+    """
+    base_dir = os.path.realpath(settings.BASE_DIR)
+    packages = {os.path.join(base_dir, 'config')}
+    for app_config in apps.get_app_configs():
+        app_path = os.path.realpath(app_config.path)
+        if os.path.dirname(app_path) == base_dir:
+            packages.add(app_path)
+    return sorted(os.path.join(package, name)
+                  for package in packages
+                  for name in os.listdir(package) if name.endswith('.py'))
+
+
+def schema_file_path(renderer_format):
+    """Путь к заранее отрендеренной схеме текущей версии кода"""
+    extension = renderer_format.lstrip('.')
+    return os.path.join(settings.SCHEMA_ROOT,
+                        f'schema-{code_version()}.{extension}')
+
+
+class CachedSchemaView(schema_view):
+    """
+    Схема API строится один раз и хранится в памяти уже отрендеренной.
+    Если командой render_schema создан файл для текущей версии кода,
+    схема читается из него.
+    """
+    _rendered = {}
+
+    def get(self, request, version='', format=None):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, _SpecRenderer):
+            # Страницы swagger/redoc сами загружают схему по ?format=openapi
+            return super().get(request, version, format)
+
+        key = (code_version(), request.version or version or '',
+               request.build_absolute_uri('/'), renderer.format)
+        content = self._rendered.get(key)
+        if content is None:
+            content = self._read_prerendered(renderer.format)
+        if content is None:
+            response = super().get(request, version, format)
+            content = renderer.render(response.data,
+                                      request.accepted_media_type,
+                                      self.get_renderer_context())
+        self._rendered[key] = content
+
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        return HttpResponse(content, content_type=content_type)
+
+    @staticmethod
+    def _read_prerendered(renderer_format):
+        try:
+            with open(schema_file_path(renderer_format), 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+
 urlpaatterns = [
     path('swagger(?P<format>\.json|\.yaml)',
-         schema_view.without_ui(cache_timeout=0),
+         CachedSchemaView.without_ui(),
          name='schema-json'),
     path('swagger/',
-         schema_view.with_ui('swagger', cache_timeout=0),
+         CachedSchemaView.with_ui('swagger'),
          name='schema-swagger-ui'),
     path('redoc/',
-         schema_view.with_ui('redoc', cache_timeout=0),
+         CachedSchemaView.with_ui('redoc'),
          name='schema-redok'),
 ]
@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from core.models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """Очередь фоновых задач, в основном для разбора упавших задач"""
+    list_display = ['name', 'status', 'attempts', 'run_at', 'created_at']
+    list_filter = ['status', 'name']
+    readonly_fields = ['key', 'locked_at', 'created_at']
@@ -0,0 +1,196 @@
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from core.storage import ExpiringLRUCache
+
+_MISSING = object()
+
+
+class TieredCache:
+    """
+    Двухуровневый кэш: небольшой LRU в памяти процесса
+    перед общим кэшем Django.
+
+    Записи помечаются тегами. Версия тега хранится в общем кэше,
+    invalidate(tags) увеличивает версии, и все записи с этими тегами
+    перестают находиться во всех процессах. Версии тегов процесс
+    кэширует на local_timeout секунд, поэтому другие процессы
+    видят сброс с задержкой не больше local_timeout.
+
+    Одновременные промахи по одному ключу вычисляются один раз:
+    потоки процесса ждут первый поток, процессы - блокировку
+    в общем кэше (cache.add).
+    """
+
+    def __init__(self, prefix='tiered', timeout=None, local_timeout=None,
+                 local_size=None, lock_timeout=None):
+        self.prefix = prefix
+        self.timeout = timeout if timeout is not None else getattr(
+            settings, 'RESPONSE_CACHE_TIMEOUT', 60)
+        self.local_timeout = local_timeout if local_timeout is not None \
+            else getattr(settings, 'RESPONSE_CACHE_LOCAL_TIMEOUT', 1)
+        if local_size is None:
+            local_size = getattr(settings, 'RESPONSE_CACHE_LOCAL_SIZE', 1000)
+        self.lock_timeout = lock_timeout if lock_timeout is not None \
+            else getattr(settings, 'RESPONSE_CACHE_LOCK_TIMEOUT', 5)
+        self.local = ExpiringLRUCache(local_size)
+        self.versions = ExpiringLRUCache(local_size)
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+
+    def _version_key(self, tag):
+        return f'{self.prefix}:version:{tag}'
+
+    def get_versions(self, tags):
+        versions = self.versions.get_many(tags)
+        missing = [tag for tag in tags if tag not in versions]
+        if missing:
+            keys = {self._version_key(tag): tag for tag in missing}
+            found = cache.get_many(keys)
+            for key, tag in keys.items():
+                if key not in found:
+                    # Новая версия не совпадает с вытесненной из кэша
+                    cache.add(key, time.time_ns(), None)
+                    found[key] = cache.get(key)
+                versions[tag] = found[key]
+            self.versions.set_many({tag: versions[tag] for tag in missing},
+                                   self.local_timeout)
+        return [versions[tag] for tag in tags]
+
+    def invalidate(self, tags):
+        bumped = {}
+        for tag in set(tags):
+            key = self._version_key(tag)
+            try:
+                bumped[tag] = cache.incr(key)
+            except ValueError:
+                bumped[tag] = time.time_ns()
+                cache.set(key, bumped[tag], None)
+        # Текущий процесс видит новые версии сразу
+        self.versions.set_many(bumped, self.local_timeout)
+
+    def get_or_set(self, key, compute, tags=()):
+        """
+        Значение по ключу из кэша или результат compute().
+        compute возвращает (value, cacheable), некэшируемые
+        значения (например ответы с ошибкой) только возвращаются.
+        """
+        tags = list(tags)
+        versions = self.get_versions(tags)
+        digest = hashlib.md5(repr(versions).encode()).hexdigest()
+        key = f'{self.prefix}:{key}:{digest}'
+
+        while True:
+            found, value = self._get(key)
+            if found:
+                return value
+            with self._flights_lock:
+                event = self._flights.get(key)
+                leader = event is None
+                if leader:
+                    event = self._flights[key] = threading.Event()
+            if leader:
+                break
+            # Значение вычисляет другой поток, ждем его
+            event.wait(self.lock_timeout)
+            if not event.is_set():
+                return compute()[0]
+        try:
+            return self._compute_shared(key, compute)
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            event.set()
+
+    def _get(self, key):
+        local = self.local.get_many([key])
+        if key in local:
+            return True, local[key]
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            self.local.set_many({key: value}, self.local_timeout)
+            return True, value
+        return False, None
+
+    def _compute_shared(self, key, compute):
+        lock_key = f'{key}:lock'
+        locked = cache.add(lock_key, 1, self.lock_timeout)
+        if not locked:
+            # Значение вычисляет другой процесс
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                found, value = self._get(key)
+                if found:
+                    return value
+        try:
+            value, cacheable = compute()
+            if cacheable:
+                cache.set(key, value, self.timeout)
+                self.local.set_many({key: value}, self.local_timeout)
+            return value
+        finally:
+            if locked:
+                cache.delete(lock_key)
+
+
+_response_cache = None
+
+
+def get_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = TieredCache(prefix='response')
+    return _response_cache
+
+
+def reset_response_cache():
+    global _response_cache
+    _response_cache = None
+
+
+def cache_response(tags, vary_on_user=False):
+    """
+    Кэширование ответов на GET запросы метода ViewSet.
+    Ключ - имя view, аргументы URL, параметры запроса (страница, курсор)
+    и хост, с vary_on_user=True еще и пользователь.
+    Без vary_on_user ответ должен быть одинаковым для всех, кто прошел
+    проверку прав: права проверяются до обращения к кэшу.
+    tags(view, request, **kwargs) - теги для сброса кэша,
+    см. TieredCache.invalidate. Кэшируются только ответы 200.
+
+    @cache_response(lambda view, request, pk: [f'user:{pk}'])
+    def retrieve(self, request, pk=None): ...
+    """
+    def decorator(func):
+        @wraps(func)
+        def inner(self, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return func(self, request, *args, **kwargs)
+            parts = [type(self).__qualname__, func.__name__,
+                     request.get_host(), request.is_secure(),
+                     sorted(kwargs.items()),
+                     sorted(request.query_params.lists())]
+            if vary_on_user:
+                parts.append(request.user.pk)
+            key = hashlib.md5(repr(parts).encode()).hexdigest()
+
+            def compute():
+                response = func(self, request, *args, **kwargs)
+                if response.status_code == 200:
+                    return response.data, True
+                return response, False
+
+            result = get_response_cache().get_or_set(
+                key, compute, tags(self, request, **kwargs))
+            if isinstance(result, Response):
+                return result
+            return Response(result)
+        return inner
+    return decorator
@@ -0,0 +1,189 @@
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+
+# Заголовок сохраненного графа: метка и длины трех массивов
+HEADER = struct.Struct('<8s3q')
+MAGIC = b'CSRGRAPH'
+
+
+class CSRGraph:
+    """
+    Компактное хранение списков смежности (compressed sparse row).
+    nodes - отсортированные id вершин, у которых есть ребра,
+    offsets[i]:offsets[i + 1] - границы соседей nodes[i] в targets,
+    соседи каждой вершины отсортированы.
+    Массивы могут быть array('q') или memoryview поверх mmap файла.
+    """
+
+    def __init__(self, nodes=None, offsets=None, targets=None):
+        self.nodes = nodes if nodes is not None else array('q')
+        self.offsets = offsets if offsets is not None else array('q', [0])
+        self.targets = targets if targets is not None else array('q')
+
+    @classmethod
+    def from_sorted_edges(cls, edges):
+        """edges - пары (source, target), отсортированные по обоим полям"""
+        nodes, offsets, targets = array('q'), array('q', [0]), array('q')
+        current = None
+        for source, target in edges:
+            if source != current:
+                if current is not None:
+                    offsets.append(len(targets))
+                nodes.append(source)
+                current = source
+            targets.append(target)
+        if current is not None:
+            offsets.append(len(targets))
+        return cls(nodes, offsets, targets)
+
+    def write(self, file):
+        arrays = (self.nodes, self.offsets, self.targets)
+        file.write(HEADER.pack(MAGIC, *map(len, arrays)))
+        for values in arrays:
+            file.write(values)
+
+    @classmethod
+    def from_buffer(cls, buffer, offset=0):
+        """
+        Граф поверх буфера (например mmap) без копирования данных.
+        Возвращает граф и смещение первого байта после него.
+        """
+        magic, *counts = HEADER.unpack_from(buffer, offset)
+        if magic != MAGIC:
+            raise ValueError('Buffer does not contain a CSR graph')
+        view = memoryview(buffer)
+        position = offset + HEADER.size
+        arrays = []
+        for count in counts:
+            end = position + count * 8
+            arrays.append(view[position:end].cast('q'))
+            position = end
+        return cls(*arrays), position
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, node):
+        return self._index(node) is not None
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    @property
+    def nbytes(self):
+        return sum(len(a) * a.itemsize
+                   for a in (self.nodes, self.offsets, self.targets))
+
+    def _index(self, node):
+        i = bisect_left(self.nodes, node)
+        if i < len(self.nodes) and self.nodes[i] == node:
+            return i
+        return None
+
+    def _bounds(self, node):
+        i = self._index(node)
+        if i is None:
+            return 0, 0
+        return self.offsets[i], self.offsets[i + 1]
+
+    def neighbours(self, node):
+        start, end = self._bounds(node)
+        return self.targets[start:end]
+
+    def degree(self, node):
+        start, end = self._bounds(node)
+        return end - start
+
+    def has_edge(self, source, target):
+        start, end = self._bounds(source)
+        i = bisect_left(self.targets, target, start, end)
+        return i < end and self.targets[i] == target
+
+    def intersection(self, first, second):
+        """Общие соседи двух вершин, слиянием отсортированных списков"""
+        return sorted_intersection(self.neighbours(first),
+                                   self.neighbours(second))
+
+
+class DeltaCSRGraph:
+    """
+    CSR снимок и изменения ребер, сделанные после него.
+    Добавленные и удаленные ребра хранятся в словарях множеств,
+    запросы учитывают их поверх снимка.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self._added = {}
+        self._removed = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, node):
+        return node in self.base or bool(self._added.get(node))
+
+    @property
+    def delta_count(self):
+        return sum(map(len, self._added.values())) + \
+            sum(map(len, self._removed.values()))
+
+    def add_edge(self, source, target):
+        with self._lock:
+            self._discard(self._removed, source, target)
+            if not self.base.has_edge(source, target):
+                self._added.setdefault(source, set()).add(target)
+
+    def remove_edge(self, source, target):
+        with self._lock:
+            self._discard(self._added, source, target)
+            if self.base.has_edge(source, target):
+                self._removed.setdefault(source, set()).add(target)
+
+    @staticmethod
+    def _discard(edges, source, target):
+        targets = edges.get(source)
+        if targets is not None:
+            targets.discard(target)
+            if not targets:
+                del edges[source]
+
+    def has_edge(self, source, target):
+        if target in self._added.get(source, ()):
+            return True
+        if target in self._removed.get(source, ()):
+            return False
+        return self.base.has_edge(source, target)
+
+    def neighbours(self, node):
+        neighbours = self.base.neighbours(node)
+        if node not in self._added and node not in self._removed:
+            return neighbours
+        with self._lock:
+            added = self._added.get(node, set())
+            removed = self._removed.get(node, set())
+            return sorted(added.union(neighbours).difference(removed))
+
+    def degree(self, node):
+        return len(self.neighbours(node))
+
+    def intersection(self, first, second):
+        return sorted_intersection(self.neighbours(first),
+                                   self.neighbours(second))
+
+
+def sorted_intersection(first, second):
+    result = []
+    i = j = 0
+    while i < len(first) and j < len(second):
+        a, b = first[i], second[j]
+        if a == b:
+            result.append(a)
+            i += 1
+            j += 1
+        elif a < b:
+            i += 1
+        else:
+            j += 1
+    return result
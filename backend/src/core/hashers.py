@@ -0,0 +1,107 @@
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+logger = logging.getLogger('apps')
+
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Пул процессов для хэширования паролей.
+    Число процессов ограничено PASSWORD_HASHING_WORKERS, число ожидающих
+    задач - PASSWORD_HASHING_QUEUE (по умолчанию в 4 раза больше числа
+    процессов), поэтому всплеск логинов занимает
+    не больше заданного числа ядер.
+    """
+    global _pool, _pool_slots
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = settings.PASSWORD_HASHING_WORKERS
+                queue = getattr(settings, 'PASSWORD_HASHING_QUEUE',
+                                workers * 4)
+                _pool_slots = threading.BoundedSemaphore(queue)
+                _pool = ProcessPoolExecutor(max_workers=workers)
+    return _pool, _pool_slots
+
+
+class PasswordHashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервер перегружен, повторите попытку позже.'
+    default_code = 'password_hashing_unavailable'
+
+
+def _call_hasher(hasher_path, method, args, kwargs):
+    return getattr(import_string(hasher_path)(), method)(*args, **kwargs)
+
+
+class PooledHasherMixin:
+    """
+    Выполняет encode и verify базового хэшера в пуле процессов.
+    Алгоритм и формат хэша не меняются, поэтому пул можно включать
+    и выключать без миграции паролей.
+    Если очередь пула не освободилась за PASSWORD_HASHING_QUEUE_TIMEOUT
+    секунд, запрос сразу получает 503: хэширование в потоке запроса
+    заняло бы ядра, которые пул должен ограничивать.
+    """
+    base_hasher = None
+
+    def _run(self, method, *args, **kwargs):
+        if not settings.PASSWORD_HASHING_WORKERS:
+            return getattr(super(), method)(*args, **kwargs)
+        pool, slots = get_pool()
+        timeout = getattr(settings, 'PASSWORD_HASHING_QUEUE_TIMEOUT', 5)
+        if not slots.acquire(timeout=timeout):
+            logger.warning('Password hashing queue is full. [core.hashers]')
+            raise PasswordHashingUnavailable()
+        try:
+            return pool.submit(_call_hasher, self.base_hasher, method,
+                               args, kwargs).result()
+        finally:
+            slots.release()
+
+    def encode(self, password, salt, *args, **kwargs):
+        return self._run('encode', password, salt, *args, **kwargs)
+
+    def verify(self, password, encoded):
+        return self._run('verify', password, encoded)
+
+
+class PooledArgon2PasswordHasher(PooledHasherMixin,
+                                 hashers.Argon2PasswordHasher):
+    base_hasher = 'django.contrib.auth.hashers.Argon2PasswordHasher'
+
+
+class PooledBCryptSHA256PasswordHasher(PooledHasherMixin,
+                                       hashers.BCryptSHA256PasswordHasher):
+    base_hasher = 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher'
+
+
+class PooledPBKDF2PasswordHasher(PooledHasherMixin,
+                                 hashers.PBKDF2PasswordHasher):
+    base_hasher = 'django.contrib.auth.hashers.PBKDF2PasswordHasher'
+
+
+def check_password_hasher():
+    """
+    Библиотека основного хэшера (argon2-cffi, bcrypt) должна быть
+    установлена, иначе ошибка появится только при первом входе
+    """
+    hasher = hashers.get_hasher()
+    if getattr(hasher, 'library', None):
+        try:
+            hasher._load_library()
+        except ValueError as error:
+            raise ImproperlyConfigured(
+                f'PASSWORD_HASHER {hasher.algorithm}: {error}')
@@ -0,0 +1,256 @@
+import asyncio
+import json
+import math
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+
+class HTTPClient:
+    """
+    Минимальный асинхронный HTTP/1.1 клиент на asyncio с keep-alive.
+    Одно соединение на клиента, запросы выполняются по очереди,
+    как у браузера с одной вкладкой.
+    """
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        if parts.scheme != 'http':
+            raise ValueError('Only http:// URLs are supported')
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self._reader = self._writer = None
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+            self._reader = self._writer = None
+
+    async def request(self, method, path, data=None, params=None,
+                      headers=None):
+        """Возвращает (status, тело ответа, разобранное из JSON если можно)"""
+        target = self.prefix + path
+        if params:
+            target += '?' + urlencode(params)
+        body = b'' if data is None else json.dumps(data).encode()
+        lines = [f'{method} {target} HTTP/1.1',
+                 f'Host: {self.host}:{self.port}',
+                 'Accept: application/json',
+                 f'Content-Length: {len(body)}']
+        if data is not None:
+            lines.append('Content-Type: application/json')
+        lines.extend(f'{name}: {value}'
+                     for name, value in (headers or {}).items())
+        raw = ('\r\n'.join(lines) + '\r\n\r\n').encode() + body
+        return await asyncio.wait_for(self._send(raw), self.timeout)
+
+    async def _send(self, raw):
+        # Сервер мог закрыть keep-alive соединение между запросами
+        for attempt in range(2):
+            if self._writer is None:
+                self._reader, self._writer = await asyncio.open_connection(
+                    self.host, self.port)
+            try:
+                self._writer.write(raw)
+                await self._writer.drain()
+                return await self._read_response()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                if attempt:
+                    raise
+
+    async def _read_response(self):
+        status_line = await self._reader.readuntil(b'\r\n')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self._reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = await self._read_chunked()
+        elif 'content-length' in headers:
+            body = await self._reader.readexactly(
+                int(headers['content-length']))
+        else:
+            body = await self._reader.read()
+            headers['connection'] = 'close'
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+
+        content = body
+        if 'json' in headers.get('content-type', '') and body:
+            content = json.loads(body)
+        return status, content
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            line = await self._reader.readuntil(b'\r\n')
+            size = int(line.split(b';')[0], 16)
+            if not size:
+                await self._reader.readuntil(b'\r\n')
+                return b''.join(chunks)
+            chunks.append(await self._reader.readexactly(size))
+            await self._reader.readexactly(2)
+
+
+def percentile(values, percent):
+    """Перцентиль по отсортированному списку (nearest-rank)"""
+    if not values:
+        return None
+    rank = max(1, math.ceil(percent / 100 * len(values)))
+    return values[rank - 1]
+
+
+class Stats:
+    """Время ответов и ошибки по каждому эндпоинту"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.started_at = clock()
+        self.finished_at = None
+
+    def add(self, name, seconds, ok):
+        self.latencies[name].append(seconds)
+        if not ok:
+            self.errors[name] += 1
+
+    def finish(self):
+        self.finished_at = self.clock()
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or self.clock()) - self.started_at
+
+    def rows(self):
+        """Строки отчета: эндпоинт, запросы, rps, доля ошибок, p50-p99, max"""
+        elapsed = self.elapsed or 1
+        rows = []
+        names = sorted(self.latencies)
+        all_latencies = []
+        for name in names:
+            values = sorted(self.latencies[name])
+            all_latencies.extend(values)
+            rows.append(self._row(name, values, self.errors[name], elapsed))
+        if len(names) > 1:
+            rows.append(self._row('Total', sorted(all_latencies),
+                                  sum(self.errors.values()), elapsed))
+        return rows
+
+    @staticmethod
+    def _row(name, values, errors, elapsed):
+        return {
+            'name': name,
+            'requests': len(values),
+            'rps': len(values) / elapsed,
+            'error_rate': errors / len(values) if values else 0,
+            'p50': percentile(values, 50),
+            'p90': percentile(values, 90),
+            'p99': percentile(values, 99),
+            'max': values[-1] if values else None,
+        }
+
+    def report(self):
+        lines = [f'{"endpoint":<36} {"requests":>8} {"rps":>8} '
+                 f'{"errors":>7} {"p50, ms":>8} {"p90, ms":>8} '
+                 f'{"p99, ms":>8} {"max, ms":>8}']
+        for row in self.rows():
+            lines.append(
+                f'{row["name"]:<36} {row["requests"]:>8} '
+                f'{row["rps"]:>8.1f} {row["error_rate"]:>7.1%} '
+                + ' '.join(f'{row[key] * 1000:>8.1f}'
+                           for key in ('p50', 'p90', 'p99', 'max')))
+        return '\n'.join(lines)
+
+
+class Session:
+    """
+    Виртуальный пользователь сценария: свое соединение и заголовки,
+    каждый запрос попадает в статистику под именем эндпоинта.
+    Ответ с неожиданным статусом считается ошибкой.
+    """
+
+    def __init__(self, base_url, stats, timeout=30):
+        self.client = HTTPClient(base_url, timeout)
+        self.stats = stats
+        self.headers = {}
+        # Данные сценария между повторами: токен, найденные id
+        self.state = {}
+
+    async def request(self, name, method, path, data=None, params=None,
+                      expect=(200, 201, 204)):
+        started = time.monotonic()
+        try:
+            status, content = await self.client.request(
+                method, path, data, params, self.headers)
+        except (OSError, asyncio.TimeoutError,
+                asyncio.IncompleteReadError, ValueError):
+            self.stats.add(name, time.monotonic() - started, False)
+            await self.client.close()
+            return None, None
+        self.stats.add(name, time.monotonic() - started, status in expect)
+        return status, content
+
+    async def get(self, name, path, params=None, **kwargs):
+        return await self.request(name, 'GET', path, params=params, **kwargs)
+
+    async def post(self, name, path, data=None, **kwargs):
+        return await self.request(name, 'POST', path, data, **kwargs)
+
+    async def close(self):
+        await self.client.close()
+
+
+class LoadRunner:
+    """
+    Запуск сценария users виртуальными пользователями.
+    Пользователи стартуют равномерно за ramp_up секунд и повторяют
+    scenario(session, number) до окончания duration секунд
+    или iterations повторов.
+    """
+
+    def __init__(self, base_url, scenario, users=10, ramp_up=0,
+                 duration=60, iterations=None, timeout=30):
+        self.base_url = base_url
+        self.scenario = scenario
+        self.users = users
+        self.ramp_up = ramp_up
+        self.duration = duration
+        self.iterations = iterations
+        self.timeout = timeout
+
+    def run(self):
+        return asyncio.run(self.run_async())
+
+    async def run_async(self):
+        stats = Stats()
+        deadline = time.monotonic() + self.duration
+        await asyncio.gather(*(self._user(number, stats, deadline)
+                               for number in range(self.users)))
+        stats.finish()
+        return stats
+
+    async def _user(self, number, stats, deadline):
+        if self.ramp_up and self.users > 1:
+            await asyncio.sleep(self.ramp_up * number / self.users)
+        session = Session(self.base_url, stats, self.timeout)
+        iteration = 0
+        try:
+            while time.monotonic() < deadline and (
+                    self.iterations is None or iteration < self.iterations):
+                await self.scenario(session, number)
+                iteration += 1
+        finally:
+            await session.close()
@@ -0,0 +1,103 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Старт воркера: настройка django, загрузка middleware и urls
+BOOT_SCRIPT = '''
+import json, resource, time
+start = time.perf_counter()
+import django
+django.setup()
+from importlib import import_module
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+WSGIHandler()
+import_module(settings.ROOT_URLCONF)
+print(json.dumps({
+    'seconds': time.perf_counter() - start,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Показывает, сколько времени занимает импорт модулей ' \
+           'при старте воркера'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--group', choices=('package', 'module'),
+                            default='package',
+                            help='Суммировать время по пакетам '
+                                 'или показывать отдельные модули')
+        parser.add_argument('--repeat', type=int, default=1,
+                            help='Число запусков, в отчет попадает '
+                                 'медианный по времени старта')
+
+    def handle(self, *args, **options):
+        runs = sorted((self._boot() for _ in range(options['repeat'])),
+                      key=lambda run: run[0]['seconds'])
+        stats, imports = runs[len(runs) // 2]
+
+        self.stdout.write(
+            f'Startup: {stats["seconds"]:.3f} s, '
+            f'max RSS: {stats["max_rss_kb"] / 1024:.1f} MB, '
+            f'modules imported: {len(imports)}')
+        if options['group'] == 'package':
+            rows = group_by_package(imports)
+            self.stdout.write(f'{"package":<40} {"self, ms":>10} '
+                              f'{"modules":>8}')
+            for name, self_us, count in rows[:options['limit']]:
+                self.stdout.write(f'{name:<40} {self_us / 1000:>10.1f} '
+                                  f'{count:>8}')
+        else:
+            rows = sorted(imports, key=lambda row: -row[2])
+            self.stdout.write(f'{"module":<50} {"self, ms":>10} '
+                              f'{"total, ms":>10}')
+            for name, self_us, cumulative_us in rows[:options['limit']]:
+                self.stdout.write(f'{name:<50} {self_us / 1000:>10.1f} '
+                                  f'{cumulative_us / 1000:>10.1f}')
+
+    @staticmethod
+    def _boot():
+        # Отдельный процесс, чтобы уже загруженные модули
+        # текущей команды не попали в замер
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT],
+            cwd=settings.BASE_DIR, env=os.environ.copy(),
+            capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        return stats, parse_importtime(result.stderr)
+
+
+def parse_importtime(output):
+    """Строки python -X importtime -> список (module, self_us, total_us)"""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            # Заголовок таблицы
+            continue
+        imports.append((name.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+def group_by_package(imports):
+    """Суммарное собственное время модулей пакета верхнего уровня"""
+    totals = defaultdict(lambda: [0, 0])
+    for name, self_us, _ in imports:
+        package = totals[name.split('.')[0]]
+        package[0] += self_us
+        package[1] += 1
+    return sorted(((name, self_us, count)
+                   for name, (self_us, count) in totals.items()),
+                  key=lambda row: -row[1])
@@ -0,0 +1,23 @@
+import os
+
+from django.core.management.base import BaseCommand
+from drf_yasg.renderers import OpenAPIRenderer, SwaggerJSONRenderer, \
+    SwaggerYAMLRenderer
+
+from config.yasg import info, schema_file_path, schema_view
+
+
+class Command(BaseCommand):
+    help = 'Рендерит схему API в файлы для текущей версии кода'
+
+    def handle(self, *args, **options):
+        generator = schema_view.generator_class(info)
+        schema = generator.get_schema(request=None, public=True)
+        for renderer_class in (OpenAPIRenderer, SwaggerJSONRenderer,
+                               SwaggerYAMLRenderer):
+            renderer = renderer_class()
+            file_path = schema_file_path(renderer.format)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'wb') as file:
+                file.write(renderer.render(schema))
+            self.stdout.write(f'Schema saved to {file_path}')
@@ -0,0 +1,95 @@
+import multiprocessing
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.utils.module_loading import autodiscover_modules
+
+from core.tasks import work
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--threads', type=int, default=1,
+                            help='Число потоков в каждом процессе')
+        parser.add_argument('--batch-size', type=int, default=20,
+                            help='Сколько задач воркер забирает за раз')
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить задачи из очереди и выйти')
+
+    def handle(self, *args, **options):
+        # Регистрируем задачи из модулей tasks всех приложений
+        autodiscover_modules('tasks')
+        work_options = {'batch_size': options['batch_size'],
+                        'poll_interval': options['poll_interval'],
+                        'once': options['once']}
+        processes = options['processes']
+        if processes <= 1:
+            stop = threading.Event()
+            with _sigterm_sets(stop):
+                processed = _run_process(options['threads'], work_options,
+                                         stop)
+        else:
+            stop = multiprocessing.Event()
+            # Дочерние процессы не должны использовать соединения родителя
+            connections.close_all()
+            with _sigterm_sets(stop), multiprocessing.Pool(
+                    processes, initializer=_init_worker,
+                    initargs=(stop,)) as pool:
+                processed = sum(pool.starmap(
+                    _run_process,
+                    [(options['threads'], work_options)] * processes))
+        self.stdout.write(f'Tasks processed: {processed}')
+
+
+@contextmanager
+def _sigterm_sets(stop):
+    """По SIGTERM дорабатываем текущие задачи и выходим"""
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    previous = signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+
+# Общее для процессов пула событие остановки
+_stop = None
+
+
+def _init_worker(stop):
+    global _stop
+    _stop = stop
+    # Обработчик SIGTERM только у родителя: унаследованный при fork
+    # обработчик не дал бы Pool.terminate() завершить процесс
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def _run_process(threads, work_options, stop=None):
+    stop = stop or _stop
+    if threads <= 1:
+        return _work(stop, work_options, close_connection=False)
+    with ThreadPoolExecutor(threads) as pool:
+        futures = [pool.submit(_work, stop, work_options)
+                   for _ in range(threads)]
+        return sum(future.result() for future in futures)
+
+
+def _work(stop, work_options, close_connection=True):
+    try:
+        return work(stop, **work_options)
+    except KeyboardInterrupt:
+        stop.set()
+        return 0
+    finally:
+        if close_connection:
+            connection.close()
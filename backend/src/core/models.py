@@ -0,0 +1,44 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """
+    Отложенная задача в очереди, см. core.tasks.
+    Выполненные задачи удаляются, упавшие после всех повторов
+    остаются со статусом failed.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = ((PENDING, 'Pending'), (RUNNING, 'Running'),
+                      (FAILED, 'Failed'))
+
+    name = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict)
+    # Хэш имени и аргументов, одинаковые ожидающие задачи не дублируются
+    key = models.CharField(max_length=40)
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES,
+                              default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key'],
+                                    condition=Q(status='pending'),
+                                    name='task_pending_key_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['run_at'], condition=Q(status='pending'),
+                         name='task_pending_run_at_idx'),
+            models.Index(fields=['locked_at'], condition=Q(status='running'),
+                         name='task_running_locked_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} [{self.status}]'
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import math
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, \
+    PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class RecentCursorPagination(CursorPagination):
+    """
+    Keyset пагинация от новых записей к старым.
+    Не считает COUNT(*) и не использует OFFSET по всей таблице,
+    для запроса нужен индекс вида (<фильтр>, created_at DESC).
+    """
+    ordering = '-created_at'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """
+    Постраничная пагинация без COUNT(*) на каждый запрос.
+    Наличие следующей страницы определяется выборкой page_size + 1 записей,
+    count берется из оценки планировщика PostgreSQL, небольшие выборки
+    считаются точно, оба значения кэшируются на count_cache_timeout.
+    """
+    exact_count_threshold = 10000
+    count_cache_timeout = 60
+    # Такие страницы заведомо пустые, а огромный номер страницы
+    # дает OFFSET, который не помещается в bigint PostgreSQL
+    max_offset = 2 ** 31 - 1
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        page_number = request.query_params.get(self.page_query_param, 1)
+        if page_number in self.last_page_strings:
+            self.page_number = self._last_page(
+                self.total_count(queryset), page_size)
+        else:
+            try:
+                self.page_number = int(page_number)
+            except (TypeError, ValueError):
+                raise NotFound(self.invalid_page_message)
+        if self.page_number < 1 or \
+                (self.page_number - 1) * page_size > self.max_offset:
+            raise NotFound(self.invalid_page_message)
+
+        rows = self._page_rows(queryset, page_size)
+        if not rows and page_number in self.last_page_strings \
+                and self.page_number > 1:
+            # Оценка оказалась больше реального количества
+            self.page_number = self._last_page(
+                self.total_count(queryset, exact=True), page_size)
+            rows = self._page_rows(queryset, page_size)
+        if not rows and self.page_number > 1:
+            raise NotFound(self.invalid_page_message)
+        offset = (self.page_number - 1) * page_size
+
+        self.has_next = len(rows) > page_size
+        self.count = self.get_count(queryset, offset + len(rows))
+        self.request = request
+        return rows[:page_size]
+
+    def _page_rows(self, queryset, page_size):
+        offset = (self.page_number - 1) * page_size
+        return list(queryset[offset:offset + page_size + 1])
+
+    @staticmethod
+    def _last_page(count, page_size):
+        return max(1, math.ceil(count / page_size))
+
+    def get_count(self, queryset, seen):
+        """
+        Количество записей: на последней странице известно точно,
+        иначе total_count(), но не меньше уже прочитанного
+        """
+        if not self.has_next:
+            return seen
+        return max(self.total_count(queryset), seen)
+
+    def total_count(self, queryset, exact=False):
+        """
+        Оценка для больших выборок, точное значение для небольших.
+        Результат кэшируется: следующие страницы не выполняют
+        ни EXPLAIN, ни COUNT(*).
+        """
+        if not hasattr(queryset, 'query'):
+            return len(queryset)
+        key = _count_cache_key(queryset)
+        count = None if exact else cache.get(key)
+        if count is not None:
+            return count
+        if not exact:
+            count = estimate_count(queryset)
+        if count is None or count < self.exact_count_threshold:
+            count = queryset.count()
+        cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param,
+                                   self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param,
+                                   self.page_number - 1)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator для админки: для больших таблиц количество берется
+    из оценки планировщика PostgreSQL вместо COUNT(*).
+    Небольшие выборки считаются точно.
+    """
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'query'):
+            estimate = estimate_count(self.object_list)
+            if estimate is not None and \
+                    estimate >= self.exact_count_threshold:
+                return estimate
+        return super().count
+
+
+def estimate_count(queryset):
+    """
+    Оценка количества строк по плану запроса PostgreSQL,
+    для остальных баз None
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def _count_cache_key(queryset):
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+    return f'pagination:count:{queryset.db}:{digest}'
@@ -0,0 +1,34 @@
+import codecs
+import io
+import re
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from core.renderers import FastJSONRenderer, orjson
+
+# Целые больше 64 бит orjson молча превращает в float
+_LONG_NUMBER_RE = re.compile(rb'\d{20,}')
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser на orjson, для кодировок кроме utf-8 и тел с числами
+    из 20 и больше цифр - стандартный, он сохраняет большие целые точно
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        if _LONG_NUMBER_RE.search(body):
+            return super().parse(io.BytesIO(body), media_type,
+                                 parser_context)
+        try:
+            return orjson.loads(body)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
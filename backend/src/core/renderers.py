@@ -0,0 +1,84 @@
+import math
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _contains_non_finite(data):
+    """Есть ли NaN или Infinity в данных, включая ключи словарей"""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            children = list(value.values())
+            children.extend(value)
+        elif isinstance(value, (list, tuple)):
+            children = value
+        elif isinstance(value, float):
+            return not math.isfinite(value)
+        else:
+            continue
+        for child in children:
+            # Строки и целые - почти все значения ответа
+            kind = type(child)
+            if kind is str or kind is int or child is None:
+                continue
+            if isinstance(child, float):
+                if not math.isfinite(child):
+                    return True
+                continue
+            stack.append(child)
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson. Результат совпадает со стандартным побайтно,
+    кроме float: orjson пишет экспоненту короче (1e16 вместо 1e+16,
+    1e-7 вместо 1e-07), значения те же. NaN и Infinity orjson пишет
+    как null, поэтому такие данные рендерит стандартный рендер DRF
+    и выдает ValueError. Он же используется, если orjson не установлен,
+    запрошен отступ или данные не поддерживаются orjson.
+    """
+    _encoder = JSONEncoder()
+
+    def _default(self, obj):
+        value = self._encoder.default(obj)
+        if _contains_non_finite(value):
+            # Например Decimal('NaN') при COERCE_DECIMAL_TO_STRING = False
+            raise TypeError('Out of range float values are not JSON '
+                            'compliant')
+        return value
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self._default,
+                               option=orjson.OPT_NON_STR_KEYS |
+                               orjson.OPT_PASSTHROUGH_DATETIME |
+                               orjson.OPT_PASSTHROUGH_DATACLASS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        # NaN и Infinity в выводе orjson выглядят как null,
+        # без null данные можно не проверять
+        if b'null' in ret and _contains_non_finite(data):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        # Как и DRF экранируем \u2028 и \u2029
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028') \
+            .replace(b'\xe2\x80\xa9', b'\\u2029')
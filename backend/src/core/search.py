@@ -0,0 +1,151 @@
+import base64
+import heapq
+import json
+import math
+import re
+import time
+from collections import Counter, defaultdict
+
+TOKEN_RE = re.compile(r'[#@]?\w+', re.UNICODE)
+# Период полураспада "свежести" твита в секундах
+DEFAULT_HALF_LIFE = 24 * 60 * 60
+
+
+def tokenize(text):
+    """
+    Разбиваем текст твита на токены.
+    Хэштеги и упоминания сохраняются с префиксом (#tag, @user)
+    и дополнительно индексируются как обычное слово.
+    """
+    tokens = []
+    for match in TOKEN_RE.findall(text.lower()):
+        word = match.lstrip('#@')
+        if not word:
+            continue
+        if match[0] in '#@':
+            tokens.append(match[0] + word)
+        tokens.append(word)
+    return tokens
+
+
+def encode_cursor(position):
+    """Курсор для keyset пагинации: (now, score, doc_id)"""
+    raw = json.dumps(position).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        now, score, doc_id = json.loads(base64.urlsafe_b64decode(cursor))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+    return now, score, doc_id
+
+
+class SearchIndex:
+    """
+    Инвертированный индекс по текстам твитов.
+    Хранит для каждого токена документы и частоту токена в документе,
+    результаты ранжируются по tf-idf с понижением старых твитов.
+    """
+
+    def __init__(self, half_life=DEFAULT_HALF_LIFE):
+        self.half_life = half_life
+        self._postings = defaultdict(dict)
+        self._documents = {}
+
+    def __len__(self):
+        return len(self._documents)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._documents
+
+    def add(self, doc_id, text, created_at):
+        """Индексируем твит, повторное добавление обновляет документ"""
+        if doc_id in self._documents:
+            self.remove(doc_id)
+        counts = Counter(tokenize(text))
+        for token, tf in counts.items():
+            self._postings[token][doc_id] = tf
+        self._documents[doc_id] = (_timestamp(created_at), tuple(counts))
+
+    def remove(self, doc_id):
+        document = self._documents.pop(doc_id, None)
+        if document is None:
+            return
+        for token in document[1]:
+            postings = self._postings[token]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[token]
+
+    def search(self, query, limit=10, cursor=None, now=None):
+        """
+        Ищем твиты, содержащие все токены запроса.
+        Возвращаем список (doc_id, score) и курсор следующей страницы.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return [], None
+        if cursor is not None:
+            now, after_score, after_id = decode_cursor(cursor)
+        elif now is None:
+            now = time.time()
+        else:
+            now = _timestamp(now)
+
+        postings = sorted((self._postings.get(term, {}) for term in terms),
+                          key=len)
+        if not postings[0]:
+            return [], None
+
+        total = len(self._documents)
+        idf = [math.log(1 + total / len(p)) for p in postings]
+        candidates = []
+        for doc_id, tf in postings[0].items():
+            score = (1 + math.log(tf)) * idf[0]
+            for i, other in enumerate(postings[1:], 1):
+                other_tf = other.get(doc_id)
+                if other_tf is None:
+                    break
+                score += (1 + math.log(other_tf)) * idf[i]
+            else:
+                age = max(now - self._documents[doc_id][0], 0)
+                score = round(score * 0.5 ** (age / self.half_life), 9)
+                if cursor is not None and \
+                        (score, doc_id) >= (after_score, after_id):
+                    continue
+                candidates.append((score, doc_id))
+
+        page = heapq.nlargest(limit + 1, candidates)
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = encode_cursor([now, *page[-1]])
+        return [(doc_id, score) for score, doc_id in page], next_cursor
+
+
+def reindex(index, queryset, text_field='text', date_field='created_at',
+            batch_size=1000, start_after=None):
+    """
+    Инкрементальная переиндексация пачками по первичному ключу.
+    Возвращает последний обработанный pk, чтобы продолжить с него.
+    """
+    last_pk = start_after
+    while True:
+        batch = queryset.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        batch = list(batch.values_list('pk', text_field,
+                                       date_field)[:batch_size])
+        if not batch:
+            return last_pk
+        for pk, text, created_at in batch:
+            index.add(pk, text, created_at)
+        last_pk = batch[-1][0]
+
+
+def _timestamp(value):
+    if hasattr(value, 'timestamp'):
+        return value.timestamp()
+    return float(value)
@@ -0,0 +1,155 @@
+from operator import attrgetter, itemgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import models
+from django.utils.encoding import filepath_to_uri
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from core.storage import get_url_resolver
+
+# Поля, у которых значение из базы совпадает с выводом сериалайзера
+RAW_FIELDS = (serializers.IntegerField, serializers.CharField,
+              serializers.BooleanField, serializers.ReadOnlyField)
+
+
+class FastListSerializer(serializers.ListSerializer):
+    """
+    Сериализация списков только для чтения.
+    Для каждого поля один раз на страницу собирается функция чтения
+    значения, generic механизм DRF для каждой строки не вызывается.
+    Строки могут быть моделями или словарями из .values().
+    """
+
+    def to_representation(self, data):
+        rows = data.all() if isinstance(data, models.Manager) else data
+        rows = list(rows)
+        if not rows:
+            return []
+        readers = self._compile_readers(rows, isinstance(rows[0], dict))
+        return [{name: read(row) for name, read in readers} for row in rows]
+
+    def _compile_readers(self, rows, rows_are_dicts):
+        readers = []
+        for field in self.child._readable_fields:
+            nested = field.source == '*' or '.' in field.source
+            if nested or not isinstance(
+                    field, RAW_FIELDS + (serializers.FileField,)):
+                readers.append((field.field_name, _generic_reader(field)))
+                continue
+            if rows_are_dicts:
+                get = itemgetter(field.source)
+            else:
+                get = _attribute_reader(field.source)
+            if isinstance(field, serializers.FileField):
+                get = self._file_url_reader(field, get, rows,
+                                            rows_are_dicts)
+            readers.append((field.field_name, get))
+        return readers
+
+    def _file_url_reader(self, field, get, rows, rows_are_dicts):
+        if not rows_are_dicts:
+            get_file = get
+
+            def get(row):
+                return get_file(row).name
+
+        storage = self._file_storage(field)
+        use_url = getattr(field, 'use_url',
+                          api_settings.UPLOADED_FILES_USE_URL)
+        url = file_url_builder(storage, self.context.get('request'), use_url,
+                               names=[get(row) for row in rows])
+
+        def read(row):
+            name = get(row)
+            return url(name) if name else None
+
+        return read
+
+    def _file_storage(self, field):
+        # Для псевдонимов из .values() поля модели может не быть
+        try:
+            model_field = self.child.Meta.model._meta.get_field(
+                field.source_attrs[-1])
+        except FieldDoesNotExist:
+            return default_storage
+        return getattr(model_field, 'storage', default_storage)
+
+
+def file_url_builder(storage, request=None, use_url=True, names=()):
+    """
+    Функция name -> url файла, как у ImageField/FileField в DRF.
+    Для локального хранилища префикс считается один раз,
+    для остальных URL файлов names получаются одной пачкой
+    через кэширующий резолвер хранилища.
+    """
+    if not use_url:
+        return str
+    if isinstance(storage, FileSystemStorage):
+        base_url = storage.base_url
+        if request is not None:
+            base_url = request.build_absolute_uri(base_url)
+
+        def url(name):
+            return base_url + filepath_to_uri(name).lstrip('/')
+        return url
+
+    urls = get_url_resolver(storage).resolve(names)
+
+    def storage_url(name):
+        value = urls.get(name)
+        return value if value is not None else storage.url(name)
+
+    if request is None:
+        return storage_url
+
+    def url(name):
+        return request.build_absolute_uri(storage_url(name))
+    return url
+
+
+def _attribute_reader(source):
+    # Методы модели вызываются, как в Field.get_attribute DRF
+    get = attrgetter(source)
+
+    def read(row):
+        value = get(row)
+        return value() if callable(value) else value
+    return read
+
+
+def _generic_reader(field):
+    def read(row):
+        attribute = field.get_attribute(row)
+        if attribute is None:
+            return None
+        return field.to_representation(attribute)
+    return read
+
+
+class UpdateChangedFieldsMixin:
+    """
+    Обновление модели только измененными полями.
+    Сохраняет save(update_fields=...) только для полей, значения которых
+    отличаются от текущих, и ничего не пишет в базу, если изменений нет.
+    Список измененных полей доступен в changed_fields.
+    """
+    changed_fields = ()
+
+    def update(self, instance, validated_data):
+        serializers.raise_errors_on_nested_writes('update', self,
+                                                  validated_data)
+        changed_fields = []
+        for attr, value in validated_data.items():
+            if getattr(instance, attr) != value:
+                setattr(instance, attr, value)
+                changed_fields.append(attr)
+        self.changed_fields = changed_fields
+        if changed_fields:
+            instance.save(update_fields=changed_fields)
+            self.fields_changed(instance, changed_fields)
+        return instance
+
+    def fields_changed(self, instance, changed_fields):
+        """Вызывается после сохранения измененных полей"""
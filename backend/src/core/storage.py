@@ -0,0 +1,101 @@
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class ExpiringLRUCache:
+    """
+    LRU кэш, у каждой записи есть срок жизни.
+    Просроченные записи не возвращаются и вытесняются при обращении.
+    """
+
+    def __init__(self, maxsize=10000, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_many(self, keys):
+        now = self.clock()
+        found = {}
+        with self._lock:
+            for key in keys:
+                item = self._data.get(key)
+                if item is None:
+                    continue
+                value, expires_at = item
+                if expires_at <= now:
+                    del self._data[key]
+                    continue
+                self._data.move_to_end(key)
+                found[key] = value
+        return found
+
+    def set_many(self, values, timeout):
+        expires_at = self.clock() + timeout
+        with self._lock:
+            for key, value in values.items():
+                self._data[key] = (value, expires_at)
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class FileURLResolver:
+    """
+    Получение URL файлов хранилища пачкой на всю страницу.
+    Если у хранилища есть метод urls(names), он вызывается один раз
+    для всех имен, которых нет в кэше, иначе storage.url() по одному.
+    Подписанные URL кэшируются не дольше половины их срока жизни
+    (атрибут querystring_expire у хранилищ django-storages).
+    """
+
+    def __init__(self, storage, maxsize=None, timeout=None):
+        self.storage = storage
+        if maxsize is None:
+            maxsize = getattr(settings, 'FILE_URL_CACHE_SIZE', 10000)
+        if timeout is None:
+            timeout = getattr(settings, 'FILE_URL_CACHE_TIMEOUT', 300)
+        expire = getattr(storage, 'querystring_expire', None)
+        if expire:
+            timeout = min(timeout, expire / 2)
+        self.timeout = timeout
+        self.cache = ExpiringLRUCache(maxsize)
+
+    def resolve(self, names):
+        """Словарь имя файла -> URL для непустых имен"""
+        names = {name for name in names if name}
+        urls = self.cache.get_many(names)
+        missing = names.difference(urls)
+        if missing:
+            batch = getattr(self.storage, 'urls', None)
+            if batch is not None:
+                resolved = batch(sorted(missing))
+            else:
+                resolved = {name: self.storage.url(name) for name in missing}
+            self.cache.set_many(resolved, self.timeout)
+            urls.update(resolved)
+        return urls
+
+
+_resolvers = weakref.WeakKeyDictionary()
+_resolvers_lock = threading.Lock()
+
+
+def get_url_resolver(storage):
+    """Общий для процесса резолвер (и кэш) для каждого хранилища"""
+    with _resolvers_lock:
+        resolver = _resolvers.get(storage)
+        if resolver is None:
+            resolver = _resolvers[storage] = FileURLResolver(storage)
+    return resolver
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import logging
+import threading
+import traceback
+from collections import defaultdict
+from datetime import timedelta
+from functools import update_wrapper
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import Task
+
+logger = logging.getLogger('apps')
+
+_registry = {}
+
+
+class TaskFunction:
+    """Функция, которую можно выполнить в фоне через delay()"""
+
+    def __init__(self, func, name, max_retries, retry_delay, batch_size):
+        update_wrapper(self, func)
+        self.func = func
+        self.name = name
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.batch_size = batch_size
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, **kwargs):
+        """
+        Ставим задачу в очередь после коммита текущей транзакции.
+        Если транзакция откатится, задача не будет поставлена.
+        """
+        self.schedule(0, **kwargs)
+
+    def schedule(self, countdown, **kwargs):
+        """Как delay(), но задача выполнится не раньше чем через countdown"""
+        # Аргументы должны сериализоваться в JSON, проверяем сразу
+        json.dumps(kwargs)
+        run_at = timezone.now() + timedelta(seconds=countdown) \
+            if countdown else None
+        message = (self.name, kwargs, run_at)
+        transaction.on_commit(lambda: get_backend().enqueue([message]))
+
+    def delay_many(self, payloads):
+        """Как delay() для списка аргументов, одной вставкой в очередь"""
+        json.dumps(payloads)
+        messages = [(self.name, payload, None) for payload in payloads]
+        if messages:
+            transaction.on_commit(lambda: get_backend().enqueue(messages))
+
+    def run(self, payloads):
+        """Выполнение пачки задач, batch задачи получают весь список"""
+        if self.batch_size:
+            self.func(payloads)
+        else:
+            for payload in payloads:
+                self.func(**payload)
+
+
+def task(func=None, *, name=None, max_retries=3, retry_delay=60,
+         batch_size=None):
+    """
+    Регистрирует фоновую задачу.
+
+    @task
+    def send_notification(user_id): ...
+
+    send_notification.delay(user_id=1)
+
+    Для batch_size > 0 функция получает список аргументов всех
+    задач пачки: одинаковые задачи выполняются одним вызовом.
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        function = TaskFunction(func, task_name, max_retries, retry_delay,
+                                batch_size)
+        _registry[task_name] = function
+        return function
+    return decorator(func) if func is not None else decorator
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def task_key(name, payload):
+    raw = json.dumps([name, payload], sort_keys=True).encode()
+    return hashlib.sha1(raw).hexdigest()
+
+
+def get_backend():
+    path = getattr(settings, 'TASKS_BACKEND', 'core.tasks.DatabaseBackend')
+    return import_string(path)()
+
+
+class DatabaseBackend:
+    """Очередь в таблице core_task, задачи выполняет manage.py run_tasks"""
+
+    def enqueue(self, messages):
+        # Уже ожидающие выполнения одинаковые задачи не дублируются
+        Task.objects.bulk_create(
+            [Task(name=name, payload=payload, key=task_key(name, payload),
+                  run_at=run_at or timezone.now())
+             for name, payload, run_at in messages],
+            ignore_conflicts=True)
+
+
+class ImmediateBackend:
+    """
+    Задачи выполняются сразу после коммита, для разработки и тестов.
+    Ошибки задач, как и в воркере, только пишутся в лог
+    и не попадают в код, который закоммитил транзакцию.
+    """
+
+    def enqueue(self, messages):
+        for name, payload, _ in messages:
+            try:
+                get_task(name).run([payload])
+            except Exception:
+                logger.exception(f'Task {name} failed. [core.tasks]')
+
+
+def claim(limit):
+    """
+    Забираем до limit готовых к выполнению задач.
+    Задачи, заблокированные другим воркером, пропускаются,
+    зависшие в статусе running дольше TASKS_LOCK_TIMEOUT забираются снова.
+    """
+    now = timezone.now()
+    stale = now - timedelta(
+        seconds=getattr(settings, 'TASKS_LOCK_TIMEOUT', 600))
+    with transaction.atomic():
+        tasks = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=Task.PENDING, run_at__lte=now) |
+                    Q(status=Task.RUNNING, locked_at__lt=stale))
+            .order_by('run_at')[:limit])
+        if tasks:
+            Task.objects.filter(pk__in=[t.pk for t in tasks]).update(
+                status=Task.RUNNING, locked_at=now,
+                attempts=F('attempts') + 1)
+    for t in tasks:
+        t.attempts += 1
+    return tasks
+
+
+def run_pending(limit=20):
+    """Выполняем одну пачку задач, возвращаем число взятых задач"""
+    tasks = claim(limit)
+    groups = defaultdict(list)
+    for t in tasks:
+        groups[t.name].append(t)
+    for name, rows in groups.items():
+        function = get_task(name)
+        if function is None:
+            _failed(None, rows, f'Unknown task {name}')
+            continue
+        size = function.batch_size or 1
+        for start in range(0, len(rows), size):
+            chunk = rows[start:start + size]
+            try:
+                function.run([row.payload for row in chunk])
+            except Exception:
+                logger.exception(f'Task {name} failed. [core.tasks]')
+                _failed(function, chunk, traceback.format_exc())
+            else:
+                Task.objects.filter(pk__in=[row.pk for row in chunk]).delete()
+    return len(tasks)
+
+
+def _failed(function, rows, error):
+    now = timezone.now()
+    for row in rows:
+        if function is None or row.attempts > function.max_retries:
+            Task.objects.filter(pk=row.pk).update(
+                status=Task.FAILED, locked_at=None, error=error)
+            continue
+        # Экспоненциальная задержка между повторами
+        delay = function.retry_delay * 2 ** (row.attempts - 1)
+        try:
+            with transaction.atomic():
+                Task.objects.filter(pk=row.pk).update(
+                    status=Task.PENDING, locked_at=None, error=error,
+                    run_at=now + timedelta(seconds=delay))
+        except IntegrityError:
+            # Такая же задача уже ждет в очереди
+            Task.objects.filter(pk=row.pk).delete()
+
+
+def work(stop=None, batch_size=20, poll_interval=1.0, once=False):
+    """
+    Цикл воркера: выполняем задачи, пока они есть, затем ждем
+    poll_interval секунд. С once=True выходим, когда очередь пуста.
+    """
+    stop = stop or threading.Event()
+    processed = 0
+    while not stop.is_set():
+        count = run_pending(batch_size)
+        processed += count
+        if not count:
+            if once:
+                break
+            stop.wait(poll_interval)
+    return processed
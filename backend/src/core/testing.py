@@ -0,0 +1,129 @@
+import difflib
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+# UPDATE_QUERY_BUDGETS=1 python manage.py test - записать текущие
+# значения в файлы бюджетов вместо проверки
+UPDATE_ENV = 'UPDATE_QUERY_BUDGETS'
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+LIST_RE = re.compile(r'\(\?(?:, \?)+\)')
+SAVEPOINT_RE = re.compile(r'^(?:RELEASE |ROLLBACK TO )?SAVEPOINT ')
+
+
+def normalize_sql(sql):
+    """
+    SQL без значений: строки и числа заменяются на ?, списки IN
+    на (...), поэтому запросы с разными id совпадают
+    """
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    return LIST_RE.sub('(...)', sql)
+
+
+class QueryBudgetFile:
+    """Бюджеты в JSON файле: {имя: {"queries": n, "sql": [...]}}"""
+
+    def __init__(self, path):
+        self.path = path
+        self.budgets = self._load()
+        self.recorded = {}
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as file:
+            return json.load(file)
+
+    def get(self, name):
+        return self.budgets.get(name)
+
+    def record(self, name, sql):
+        self.recorded[name] = {'queries': len(sql), 'sql': sql}
+
+    def save(self):
+        if not self.recorded:
+            return
+        # Файл мог обновить другой класс тестов
+        budgets = self._load()
+        budgets.update(self.recorded)
+        with open(self.path, 'w') as file:
+            json.dump(budgets, file, indent=2, sort_keys=True)
+            file.write('\n')
+        self.budgets = budgets
+        self.recorded = {}
+
+
+class QueryBudgetMixin:
+    """
+    Бюджет запросов и времени для эндпоинтов.
+
+    class UsersBudgetTestCase(QueryBudgetMixin, APITestCase):
+        query_budget_file = os.path.join(os.path.dirname(__file__),
+                                         'query_budgets.json')
+
+        def test_list(self):
+            with self.assertQueryBudget('GET user-info-list'):
+                self.client.get(url)
+
+    Число запросов сравнивается с записанным в файле (или max_queries),
+    при превышении тест падает с diff выполненного SQL относительно
+    записанного. Время проверяется, если задан max_seconds
+    или query_budget_seconds. Для обновления файла тесты запускаются
+    с переменной окружения UPDATE_QUERY_BUDGETS=1.
+    """
+    query_budget_file = None
+    query_budget_seconds = None
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.query_budgets = QueryBudgetFile(cls.query_budget_file)
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.getenv(UPDATE_ENV):
+            cls.query_budgets.save()
+        super().tearDownClass()
+
+    @contextmanager
+    def assertQueryBudget(self, name, max_queries=None, max_seconds=None,
+                          using=DEFAULT_DB_ALIAS):
+        with CaptureQueriesContext(connections[using]) as context:
+            started = time.perf_counter()
+            yield context
+            elapsed = time.perf_counter() - started
+        # Точки сохранения зависят от вложенности транзакций в тесте
+        sql = [normalize_sql(query['sql'])
+               for query in context.captured_queries
+               if not SAVEPOINT_RE.match(query['sql'])]
+
+        if os.getenv(UPDATE_ENV):
+            self.query_budgets.record(name, sql)
+            return
+
+        budget = self.query_budgets.get(name)
+        if max_queries is None:
+            if budget is None:
+                self.fail(f'No query budget for {name!r} in '
+                          f'{self.query_budget_file}, run the tests with '
+                          f'{UPDATE_ENV}=1 to record it')
+            max_queries = budget['queries']
+        if len(sql) > max_queries:
+            expected = budget['sql'] if budget else []
+            diff = '\n'.join(difflib.unified_diff(
+                expected, sql, 'budget', 'executed', lineterm=''))
+            self.fail(f'{name}: {len(sql)} queries, budget {max_queries}\n'
+                      f'{diff}')
+
+        max_seconds = max_seconds or self.query_budget_seconds
+        if max_seconds is not None and elapsed > max_seconds:
+            self.fail(f'{name}: {elapsed * 1000:.0f} ms, '
+                      f'budget {max_seconds * 1000:.0f} ms')
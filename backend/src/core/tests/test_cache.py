@@ -0,0 +1,97 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from core.cache import TieredCache
+
+
+class TieredCacheTestCase(SimpleTestCase):
+    """Кэш в памяти процесса перед общим кэшем"""
+
+    def setUp(self):
+        cache.clear()
+        self.cache = TieredCache(prefix='test', timeout=60,
+                                 local_timeout=60, lock_timeout=2)
+        self.calls = 0
+
+    def compute(self, value='value', cacheable=True):
+        def func():
+            self.calls += 1
+            return value, cacheable
+        return func
+
+    def test_computed_once(self):
+        for _ in range(3):
+            self.assertEqual('value',
+                             self.cache.get_or_set('key', self.compute()))
+        self.assertEqual(1, self.calls)
+
+    def test_shared_tier_used_by_other_process(self):
+        self.cache.get_or_set('key', self.compute())
+        other = TieredCache(prefix='test')
+        self.assertEqual('value', other.get_or_set('key', self.compute()))
+        self.assertEqual(1, self.calls)
+
+    def test_not_cacheable(self):
+        self.cache.get_or_set('key', self.compute('error', False))
+        self.cache.get_or_set('key', self.compute('error', False))
+        self.assertEqual(2, self.calls)
+
+    def test_invalidate_by_tag(self):
+        self.cache.get_or_set('a', self.compute(), tags=['user:1'])
+        self.cache.get_or_set('b', self.compute(), tags=['user:2'])
+        self.cache.invalidate(['user:1'])
+        self.cache.get_or_set('a', self.compute(), tags=['user:1'])
+        self.cache.get_or_set('b', self.compute(), tags=['user:2'])
+        self.assertEqual(3, self.calls)
+
+    def test_invalidate_seen_by_other_process(self):
+        other = TieredCache(prefix='test', local_timeout=0)
+        other.get_or_set('a', self.compute(), tags=['user:1'])
+        self.cache.invalidate(['user:1'])
+        other.get_or_set('a', self.compute(), tags=['user:1'])
+        self.assertEqual(2, self.calls)
+
+    def test_evicted_version_not_reused(self):
+        self.cache.get_or_set('a', self.compute(), tags=['user:1'])
+        cache.delete('test:version:user:1')
+        self.cache.versions.clear()
+        self.cache.get_or_set('a', self.compute(), tags=['user:1'])
+        self.assertEqual(2, self.calls)
+
+    def test_single_flight(self):
+        def slow():
+            time.sleep(0.2)
+            self.calls += 1
+            return 'value', True
+
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(self.cache.get_or_set('key', slow)))
+            for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(['value'] * 5, results)
+        self.assertEqual(1, self.calls)
+
+    def test_waits_for_other_process(self):
+        """Разные экземпляры не делят потоки, но делят блокировку"""
+        def slow():
+            time.sleep(0.2)
+            self.calls += 1
+            return 'value', True
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            TieredCache(prefix='test').get_or_set('key', slow)))
+            for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(['value'] * 3, results)
+        self.assertEqual(1, self.calls)
@@ -0,0 +1,118 @@
+import io
+import os
+import random
+import timeit
+from unittest import skipUnless
+
+from django.test import SimpleTestCase
+
+from core.graph import CSRGraph, DeltaCSRGraph, sorted_intersection
+
+EDGES = [(1, 2), (1, 3), (1, 5), (4, 1), (4, 5), (7, 1)]
+
+
+class CSRGraphTestCase(SimpleTestCase):
+    """Списки смежности в CSR массивах"""
+
+    def setUp(self):
+        self.graph = CSRGraph.from_sorted_edges(EDGES)
+
+    def test_neighbours(self):
+        self.assertEqual([2, 3, 5], list(self.graph.neighbours(1)))
+        self.assertEqual([], list(self.graph.neighbours(2)))
+        self.assertEqual(2, self.graph.degree(4))
+        self.assertEqual(3, len(self.graph))
+        self.assertEqual(len(EDGES), self.graph.edge_count)
+
+    def test_has_edge(self):
+        self.assertTrue(self.graph.has_edge(4, 5))
+        self.assertFalse(self.graph.has_edge(4, 2))
+        self.assertFalse(self.graph.has_edge(6, 1))
+
+    def test_intersection(self):
+        self.assertEqual([5], self.graph.intersection(1, 4))
+        self.assertEqual([], sorted_intersection([1, 3], [2, 4]))
+
+    def test_empty_graph(self):
+        graph = CSRGraph.from_sorted_edges([])
+        self.assertNotIn(1, graph)
+        self.assertEqual([], list(graph.neighbours(1)))
+
+
+class CSRGraphBufferTestCase(SimpleTestCase):
+    """Сохранение графа и чтение без копирования"""
+
+    def test_roundtrip(self):
+        buffer = io.BytesIO()
+        CSRGraph.from_sorted_edges(EDGES).write(buffer)
+        CSRGraph.from_sorted_edges([(1, 9)]).write(buffer)
+        data = buffer.getvalue()
+
+        graph, offset = CSRGraph.from_buffer(data)
+        second, end = CSRGraph.from_buffer(data, offset)
+        self.assertEqual([2, 3, 5], list(graph.neighbours(1)))
+        self.assertTrue(graph.has_edge(7, 1))
+        self.assertEqual([9], list(second.neighbours(1)))
+        self.assertEqual(len(data), end)
+
+    def test_invalid_buffer(self):
+        with self.assertRaises(ValueError):
+            CSRGraph.from_buffer(bytes(64))
+
+
+class DeltaCSRGraphTestCase(SimpleTestCase):
+    """Изменения ребер поверх снимка"""
+
+    def setUp(self):
+        self.graph = DeltaCSRGraph(CSRGraph.from_sorted_edges(EDGES))
+
+    def test_add_and_remove_edges(self):
+        self.graph.add_edge(1, 4)
+        self.graph.remove_edge(1, 3)
+        self.graph.add_edge(8, 1)
+        self.assertEqual([2, 4, 5], self.graph.neighbours(1))
+        self.assertTrue(self.graph.has_edge(8, 1))
+        self.assertFalse(self.graph.has_edge(1, 3))
+        self.assertIn(8, self.graph)
+        self.assertEqual(3, self.graph.delta_count)
+
+    def test_revert_changes(self):
+        self.graph.remove_edge(1, 3)
+        self.graph.add_edge(1, 3)
+        self.graph.add_edge(2, 9)
+        self.graph.remove_edge(2, 9)
+        self.assertEqual(0, self.graph.delta_count)
+        self.assertEqual([2, 3, 5], list(self.graph.neighbours(1)))
+
+    def test_intersection(self):
+        self.graph.add_edge(4, 3)
+        self.assertEqual([3, 5], self.graph.intersection(1, 4))
+
+
+@skipUnless(os.getenv('BENCHMARKS'), 'set BENCHMARKS=1 to run benchmarks')
+class CSRGraphBenchmark(SimpleTestCase):
+    """Проверка ребра и пересечение на графе из миллиона ребер"""
+
+    def test_benchmark_queries(self):
+        rnd = random.Random(1)
+        edges = sorted({(rnd.randrange(20000), rnd.randrange(20000))
+                        for _ in range(1000000)})
+        graph = CSRGraph.from_sorted_edges(edges)
+        pairs = [(rnd.randrange(20000), rnd.randrange(20000))
+                 for _ in range(10000)]
+
+        def has_edge():
+            for source, target in pairs:
+                graph.has_edge(source, target)
+
+        def intersection():
+            for source, target in pairs[:1000]:
+                graph.intersection(source, target)
+
+        has_edge_time = min(timeit.repeat(has_edge, number=1, repeat=3))
+        intersection_time = min(timeit.repeat(intersection, number=1,
+                                              repeat=3))
+        print(f'\n{graph.nbytes / 2 ** 20:.1f} MB, '
+              f'has_edge: {has_edge_time / len(pairs) * 1e6:.2f} us, '
+              f'intersection: {intersection_time / 1000 * 1e6:.2f} us')
+        self.assertLess(has_edge_time / len(pairs), 1e-4)
@@ -0,0 +1,176 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, get_hasher, \
+    make_password
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from core import hashers as core_hashers
+from core.hashers import PasswordHashingUnavailable, \
+    PooledPBKDF2PasswordHasher, check_password_hasher
+
+User = get_user_model()
+
+PBKDF2_FIRST = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+ARGON2_FIRST = ['django.contrib.auth.hashers.Argon2PasswordHasher',
+                *PBKDF2_FIRST]
+POOLED = [
+    'core.hashers.PooledPBKDF2PasswordHasher',
+    'core.hashers.PooledArgon2PasswordHasher',
+    'core.hashers.PooledBCryptSHA256PasswordHasher',
+]
+
+try:
+    import argon2
+except ImportError:
+    argon2 = None
+
+
+class PasswordHashersTestCase(SimpleTestCase):
+    """Настройка списка хэшеров"""
+
+    def test_hashers_are_dotted_paths(self):
+        """Настройки не импортируют core.hashers"""
+        self.assertTrue(all(isinstance(path, str)
+                            for path in settings.PASSWORD_HASHERS))
+        self.assertEqual(
+            'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+            settings.PASSWORD_HASHERS[-1])
+        self.assertTrue(
+            settings.PASSWORD_HASHERS[0].endswith('PasswordHasher'))
+
+    @override_settings(PASSWORD_HASHING_WORKERS=2)
+    def test_pooled_hash_compatible_with_base_hasher(self):
+        """Хэш из пула проверяется обычным хэшером и наоборот"""
+        pooled = PooledPBKDF2PasswordHasher()
+        base = get_hasher('pbkdf2_sha256')
+        encoded = pooled.encode('StrongPassword123', pooled.salt())
+        self.assertTrue(base.verify('StrongPassword123', encoded))
+        encoded = base.encode('StrongPassword123', base.salt())
+        self.assertTrue(pooled.verify('StrongPassword123', encoded))
+        self.assertFalse(pooled.verify('wrong_password', encoded))
+
+    @override_settings(PASSWORD_HASHING_WORKERS=1)
+    def test_pooled_encode_keeps_arguments(self):
+        pooled = PooledPBKDF2PasswordHasher()
+        encoded = pooled.encode('StrongPassword123', 'salt', iterations=1000)
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$1000$salt$'))
+
+    @override_settings(PASSWORD_HASHING_WORKERS=1,
+                       PASSWORD_HASHING_QUEUE_TIMEOUT=0.01)
+    def test_full_queue_fails_fast(self):
+        pooled = PooledPBKDF2PasswordHasher()
+        _, slots = core_hashers.get_pool()
+        acquired = 0
+        while slots.acquire(blocking=False):
+            acquired += 1
+        try:
+            with mock.patch.object(core_hashers.get_pool()[0],
+                                   'submit') as submit, \
+                    mock.patch('django.contrib.auth.hashers.'
+                               'PBKDF2PasswordHasher.encode') as encode:
+                with self.assertRaises(PasswordHashingUnavailable):
+                    pooled.encode('StrongPassword123', 'salt', 1000)
+            submit.assert_not_called()
+            encode.assert_not_called()
+        finally:
+            for _ in range(acquired):
+                slots.release()
+
+    @override_settings(PASSWORD_HASHERS=ARGON2_FIRST)
+    def test_missing_library_fails_at_startup(self):
+        with mock.patch('importlib.import_module',
+                        side_effect=ImportError('No module named argon2')):
+            with self.assertRaises(ImproperlyConfigured):
+                check_password_hasher()
+
+    def test_installed_library_passes(self):
+        check_password_hasher()
+
+
+class PasswordUpgradeOnLoginTestCase(TestCase):
+    """Пароль перехэшируется основным алгоритмом при входе"""
+
+    def login_with_old_hash(self, old_algorithm):
+        user = User.objects.create(username='test_user',
+                                   email='test_user@gmail.com')
+        user.password = make_password('StrongPassword123',
+                                      hasher=old_algorithm)
+        user.save()
+        response = self.client.post(reverse('rest_login'), {
+            'username': 'test_user', 'password': 'StrongPassword123'})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        user.refresh_from_db()
+        return user.password
+
+    @override_settings(PASSWORD_HASHERS=POOLED, PASSWORD_HASHING_WORKERS=1)
+    def test_full_queue_returns_503(self):
+        User.objects.create_user(username='test_user',
+                                 email='test_user@gmail.com',
+                                 password='StrongPassword123')
+        with mock.patch.object(core_hashers.get_pool()[1], 'acquire',
+                               return_value=False):
+            response = self.client.post(reverse('rest_login'), {
+                'username': 'test_user', 'password': 'StrongPassword123'})
+        self.assertEqual(status.HTTP_503_SERVICE_UNAVAILABLE,
+                         response.status_code)
+
+    @override_settings(PASSWORD_HASHERS=PBKDF2_FIRST)
+    def test_upgrade_pbkdf2_sha1(self):
+        password = self.login_with_old_hash('pbkdf2_sha1')
+        self.assertTrue(password.startswith('pbkdf2_sha256$'))
+
+    @skipUnless(argon2, 'argon2-cffi is not installed')
+    @override_settings(PASSWORD_HASHERS=ARGON2_FIRST)
+    def test_upgrade_pbkdf2_to_argon2(self):
+        password = self.login_with_old_hash('pbkdf2_sha256')
+        self.assertTrue(password.startswith('argon2$'))
+        self.assertTrue(check_password('StrongPassword123', password))
+
+
+@skipUnless(os.getenv('BENCHMARKS'), 'set BENCHMARKS=1 to run benchmarks')
+class PasswordHashersBenchmark(SimpleTestCase):
+    """Время проверки пароля и пропускная способность по хэшерам"""
+    logins = 32
+    concurrency = 8
+
+    def measure(self, hasher):
+        encoded = hasher.encode('StrongPassword123', hasher.salt())
+        started = time.perf_counter()
+        hasher.verify('StrongPassword123', encoded)
+        latency = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            list(executor.map(
+                lambda _: hasher.verify('StrongPassword123', encoded),
+                range(self.logins)))
+        throughput = self.logins / (time.perf_counter() - started)
+        return latency, throughput
+
+    def test_benchmark_hashers(self):
+        print()
+        for algorithm in ('pbkdf2_sha256', 'argon2', 'bcrypt_sha256'):
+            with override_settings(PASSWORD_HASHERS=POOLED,
+                                   PASSWORD_HASHING_WORKERS=0):
+                try:
+                    hasher = get_hasher(algorithm)
+                    inline = self.measure(hasher)
+                except ValueError:
+                    print(f'{algorithm}: library is not installed')
+                    continue
+            with override_settings(PASSWORD_HASHING_WORKERS=4):
+                pooled = self.measure(hasher)
+            print(f'{algorithm}: inline {inline[0] * 1000:.1f}ms '
+                  f'{inline[1]:.1f}/s, pool {pooled[0] * 1000:.1f}ms '
+                  f'{pooled[1]:.1f}/s')
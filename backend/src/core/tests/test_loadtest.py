@@ -0,0 +1,105 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from core.loadtest import HTTPClient, LoadRunner, Stats, percentile
+
+
+class PercentileTestCase(SimpleTestCase):
+
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(50, percentile(values, 50))
+        self.assertEqual(99, percentile(values, 99))
+        self.assertEqual(1, percentile(values, 0))
+        self.assertIsNone(percentile([], 50))
+
+
+class StatsTestCase(SimpleTestCase):
+
+    def test_rows(self):
+        now = [0]
+        stats = Stats(clock=lambda: now[0])
+        for seconds in (0.1, 0.2, 0.3, 0.4):
+            stats.add('GET /a/', seconds, True)
+        stats.add('GET /b/', 1.0, False)
+        now[0] = 2
+        stats.finish()
+        rows = {row['name']: row for row in stats.rows()}
+        self.assertEqual(4, rows['GET /a/']['requests'])
+        self.assertEqual(2, rows['GET /a/']['rps'])
+        self.assertEqual(0, rows['GET /a/']['error_rate'])
+        self.assertEqual(0.2, rows['GET /a/']['p50'])
+        self.assertEqual(0.4, rows['GET /a/']['max'])
+        self.assertEqual(1, rows['GET /b/']['error_rate'])
+        self.assertEqual(5, rows['Total']['requests'])
+        self.assertEqual(0.2, rows['Total']['error_rate'])
+        self.assertIn('GET /b/', stats.report())
+
+
+class HTTPClientTestCase(SimpleTestCase):
+    """Клиент против простого asyncio сервера"""
+
+    RESPONSES = [
+        b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+        b'Content-Length: 11\r\n\r\n{"a": true}',
+        b'HTTP/1.1 201 Created\r\nTransfer-Encoding: chunked\r\n\r\n'
+        b'3\r\nabc\r\n2\r\nde\r\n0\r\n\r\n',
+        b'HTTP/1.1 404 Not Found\r\nConnection: close\r\n'
+        b'Content-Length: 0\r\n\r\n',
+    ]
+
+    def test_keep_alive_chunked_and_close(self):
+        connections = []
+        requests = []
+
+        async def handle(reader, writer):
+            connections.append(writer)
+            try:
+                while True:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                    length = int(head.split(b'Content-Length: ')[1]
+                                 .split(b'\r\n')[0])
+                    body = await reader.readexactly(length)
+                    requests.append((head.split(b'\r\n')[0], body))
+                    writer.write(self.RESPONSES[len(requests) - 1])
+                    await writer.drain()
+            except asyncio.IncompleteReadError:
+                writer.close()
+
+        async def main():
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            client = HTTPClient(f'http://127.0.0.1:{port}/api')
+            results = [
+                await client.request('GET', '/a/', params={'page': 2}),
+                await client.request('POST', '/b/', data={'x': 1}),
+                await client.request('GET', '/c/'),
+            ]
+            await client.close()
+            server.close()
+            await server.wait_closed()
+            return results
+
+        results = asyncio.run(main())
+        self.assertEqual([(200, {'a': True}), (201, b'abcde'), (404, b'')],
+                         results)
+        self.assertEqual((b'GET /api/a/?page=2 HTTP/1.1', b''), requests[0])
+        self.assertEqual((b'POST /api/b/ HTTP/1.1', b'{"x": 1}'),
+                         requests[1])
+        self.assertEqual(1, len(connections))
+
+
+class LoadRunnerTestCase(SimpleTestCase):
+
+    def test_users_and_iterations(self):
+        calls = []
+
+        async def scenario(session, number):
+            calls.append(number)
+            session.stats.add('noop', 0.001, True)
+
+        stats = LoadRunner('http://127.0.0.1:1', scenario, users=3,
+                           ramp_up=0.01, iterations=2).run()
+        self.assertEqual([0, 0, 1, 1, 2, 2], sorted(calls))
+        self.assertEqual(6, stats.rows()[0]['requests'])
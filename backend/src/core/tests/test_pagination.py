@@ -0,0 +1,126 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.pagination import EstimatedCountPagination, \
+    EstimatedCountPaginator, estimate_count
+
+User = get_user_model()
+
+
+class EstimatedCountPaginationTestCase(TestCase):
+    """Пагинация без COUNT(*) на каждой странице"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(username=f'test_user{i}', email=f'test_user{i}@gmail.com')
+            for i in range(25))
+
+    def setUp(self):
+        cache.clear()
+        self.queryset = User.objects.order_by('id')
+
+    def paginate(self, query='', paginator=None):
+        paginator = paginator or EstimatedCountPagination()
+        request = Request(APIRequestFactory().get(f'/users/{query}'))
+        rows = paginator.paginate_queryset(self.queryset, request)
+        return rows, paginator.get_paginated_response(rows).data
+
+    def test_first_page(self):
+        rows, data = self.paginate()
+        self.assertEqual(10, len(rows))
+        self.assertEqual(25, data['count'])
+        self.assertEqual('http://testserver/users/?page=2', data['next'])
+        self.assertIsNone(data['previous'])
+
+    def test_last_page_without_count_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            rows, data = self.paginate('?page=3')
+        self.assertEqual(1, len(queries))
+        self.assertEqual(5, len(rows))
+        self.assertEqual(25, data['count'])
+        self.assertIsNone(data['next'])
+        self.assertEqual('http://testserver/users/?page=2', data['previous'])
+
+    def test_second_page_previous_link_without_page(self):
+        _, data = self.paginate('?page=2')
+        self.assertEqual('http://testserver/users/', data['previous'])
+
+    def test_invalid_page(self):
+        for page in ('0', 'abc', '4', '99999999999999999999'):
+            with self.subTest(page), self.assertRaises(NotFound):
+                self.paginate(f'?page={page}')
+
+    def test_page_last(self):
+        rows, data = self.paginate('?page=last')
+        self.assertEqual(5, len(rows))
+        self.assertEqual(25, data['count'])
+        self.assertIsNone(data['next'])
+        self.assertEqual('http://testserver/users/?page=2', data['previous'])
+
+    def test_page_last_with_stale_count(self):
+        """Устаревшее количество не приводит к пустой странице"""
+        paginator = EstimatedCountPagination()
+        paginator.total_count(self.queryset)
+        User.objects.filter(username__in=[
+            f'test_user{i}' for i in range(10)]).delete()
+        rows, data = self.paginate('?page=last', paginator)
+        self.assertEqual(5, len(rows))
+        self.assertEqual(15, data['count'])
+
+    def test_exact_count_is_cached(self):
+        self.paginate()
+        with CaptureQueriesContext(connection) as queries:
+            _, data = self.paginate()
+        self.assertEqual(1, len(queries))
+        self.assertEqual(25, data['count'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'planner estimates')
+    def test_large_result_uses_cached_estimate(self):
+        """Для больших выборок count берется из оценки и кэшируется"""
+        paginator = EstimatedCountPagination()
+        paginator.exact_count_threshold = 0
+        estimate = estimate_count(self.queryset)
+        _, data = self.paginate(paginator=paginator)
+        self.assertEqual(max(estimate, 11), data['count'])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.paginate(paginator=paginator)
+        self.assertEqual(1, len(queries))
+        self.assertNotIn('COUNT', queries[0]['sql'])
+
+
+class EstimatedCountPaginatorTestCase(TestCase):
+    """Paginator админки без COUNT(*) для больших таблиц"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(username=f'test_user{i}', email=f'test_user{i}@gmail.com')
+            for i in range(25))
+
+    def test_small_table_counted_exactly(self):
+        paginator = EstimatedCountPaginator(User.objects.order_by('id'), 10)
+        self.assertEqual(25, paginator.count)
+        self.assertEqual(3, paginator.num_pages)
+
+    def test_list_counted_exactly(self):
+        paginator = EstimatedCountPaginator(list(range(25)), 10)
+        self.assertEqual(25, paginator.count)
+
+    @skipUnless(connection.vendor == 'postgresql', 'planner estimates')
+    def test_large_table_uses_estimate(self):
+        queryset = User.objects.order_by('id')
+        paginator = EstimatedCountPaginator(queryset, 10)
+        paginator.exact_count_threshold = 0
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(estimate_count(queryset), paginator.count)
+        self.assertNotIn('COUNT', queries[-1]['sql'])
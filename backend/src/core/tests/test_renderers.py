@@ -0,0 +1,148 @@
+import io
+import json
+import os
+import timeit
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from unittest import skipIf, skipUnless
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer, orjson
+
+PAYLOADS = {
+    'empty': {},
+    'scalars': {'int': 1, 'float': 1.5, 'bool': True, 'none': None,
+                'big': 2 ** 63 - 1, 'negative': -10},
+    'unicode': {'text': 'Привет, мир! 😀', 'separators': 'a b c',
+                'escapes': 'quote " slash \\ newline \n tab \t'},
+    'dates': {'date': date(2021, 1, 10),
+              'datetime': datetime(2021, 1, 10, 12, 30, 15, 123456),
+              'utc': datetime(2021, 1, 10, 12, 30, tzinfo=timezone.utc),
+              'moscow': datetime(2021, 1, 10, 12, 30,
+                                 tzinfo=timezone(timedelta(hours=3))),
+              'time': time(12, 30, 1), 'timedelta': timedelta(hours=1)},
+    'decimal': {'price': Decimal('10.25'), 'zero': Decimal('0')},
+    'lazy': {'lazy': gettext_lazy('This field may not be blank.')},
+    'uuid': {'uuid': uuid.UUID('12345678123456781234567812345678')},
+    'non_str_keys': {1: 'one', None: 'none', 2.5: 'float'},
+    'nested': {'results': ReturnList(
+        [OrderedDict([('id', 1), ('avatar', None)]),
+         ReturnDict({'id': 2, 'tags': ('a', 'b')}, serializer=None)],
+        serializer=None), 'next': None, 'count': 2},
+    'list': [1, 'two', [3, {'four': 4}]],
+}
+
+
+@skipIf(orjson is None, 'orjson is not installed')
+class FastJSONRendererTestCase(SimpleTestCase):
+    """Рендер на orjson совпадает со стандартным побайтно"""
+
+    def test_byte_equivalence(self):
+        for name, payload in PAYLOADS.items():
+            with self.subTest(name):
+                self.assertEqual(JSONRenderer().render(payload),
+                                 FastJSONRenderer().render(payload))
+
+    def test_none_data(self):
+        self.assertEqual(b'', FastJSONRenderer().render(None))
+
+    def test_indent_uses_standard_renderer(self):
+        payload = PAYLOADS['nested']
+        media_type = 'application/json; indent=4'
+        self.assertEqual(JSONRenderer().render(payload, media_type),
+                         FastJSONRenderer().render(payload, media_type))
+
+    def test_unsupported_data_falls_back(self):
+        payload = {'huge': 2 ** 70, 'set': {1}}
+        self.assertEqual(JSONRenderer().render(payload),
+                         FastJSONRenderer().render(payload))
+
+    def test_non_finite_floats_error_like_standard(self):
+        for value in (float('nan'), float('inf'), -float('inf')):
+            with self.subTest(value), self.assertRaises(ValueError):
+                FastJSONRenderer().render({'results': [{'value': value}]})
+
+    def test_exponent_floats_same_values(self):
+        """Экспонента записывается иначе, значения совпадают"""
+        payload = {'big': 1e16, 'small': 1e-7, 'tiny': 2.5e-05,
+                   'huge': 1.5e300, 'nested': [{'value': 1e22}],
+                   'plain': 1.5}
+        fast = FastJSONRenderer().render(payload)
+        self.assertIn(b'"big":1e16', fast)
+        self.assertIn(b'"small":1e-7', fast)
+        self.assertEqual(json.loads(JSONRenderer().render(payload)),
+                         json.loads(fast))
+
+    def test_non_finite_floats_with_none(self):
+        payload = {'results': [{'value': None}, {'value': float('nan')}]}
+        with self.assertRaises(ValueError):
+            FastJSONRenderer().render(payload)
+        with self.assertRaises(ValueError):
+            FastJSONRenderer().render({'set': {float('inf')}})
+
+    def test_aware_time_error_like_standard(self):
+        payload = {'time': time(12, 30, tzinfo=timezone.utc)}
+        with self.assertRaises(ValueError):
+            FastJSONRenderer().render(payload)
+
+
+@skipIf(orjson is None, 'orjson is not installed')
+class FastJSONParserTestCase(SimpleTestCase):
+    """Разбор JSON запроса"""
+
+    def parse(self, parser, body, encoding='utf-8'):
+        return parser.parse(io.BytesIO(body),
+                            parser_context={'encoding': encoding})
+
+    def test_same_result_as_standard(self):
+        body = '{"a": [1, 2.5, null, true], "text": "Привет"}'.encode()
+        self.assertEqual(self.parse(JSONParser(), body),
+                         self.parse(FastJSONParser(), body))
+
+    def test_big_integers_exact(self):
+        body = b'{"id": 123456789012345678901234567890, "max": ' \
+               b'18446744073709551615, "min": -9223372036854775808}'
+        data = self.parse(FastJSONParser(), body)
+        self.assertEqual(self.parse(JSONParser(), body), data)
+        self.assertEqual(123456789012345678901234567890, data['id'])
+
+    def test_other_encoding(self):
+        body = '{"text": "Привет"}'.encode('utf-16')
+        self.assertEqual({'text': 'Привет'},
+                         self.parse(FastJSONParser(), body, 'utf-16'))
+
+    def test_parse_error(self):
+        with self.assertRaises(ParseError):
+            self.parse(FastJSONParser(), b'{"a": ')
+
+
+@skipIf(orjson is None, 'orjson is not installed')
+@skipUnless(os.getenv('BENCHMARKS'), 'set BENCHMARKS=1 to run benchmarks')
+class FastJSONRendererBenchmark(SimpleTestCase):
+    """Скорость рендера страницы из 1000 пользователей"""
+
+    def test_benchmark_render_list(self):
+        payload = ReturnDict({
+            'count': 1000000, 'next': 'http://testserver/api/users/?page=2',
+            'previous': None,
+            'results': ReturnList([OrderedDict([
+                ('id', i), ('username', f'test_user{i}'),
+                ('name', f'Тестовый пользователь {i}'),
+                ('avatar', f'http://testserver/media/uploads/avatar/{i}.jpg'),
+            ]) for i in range(1000)], serializer=None)}, serializer=None)
+        standard = min(timeit.repeat(
+            lambda: JSONRenderer().render(payload), number=20, repeat=3))
+        fast = min(timeit.repeat(
+            lambda: FastJSONRenderer().render(payload), number=20, repeat=3))
+        print(f'\nstandard: {standard:.3f}s, fast: {fast:.3f}s, '
+              f'x{standard / fast:.1f}')
+        self.assertLess(fast, standard)
@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from io import StringIO
+
+from config.yasg import CachedSchemaView, code_version, \
+    schema_file_path, schema_source_files
+
+SCHEMA_URL = '/swagger/?format=openapi'
+
+
+class CachedSchemaViewTestCase(TestCase):
+    """Схема API строится один раз"""
+
+    def setUp(self):
+        CachedSchemaView._rendered.clear()
+        self.addCleanup(CachedSchemaView._rendered.clear)
+        schema_root = tempfile.TemporaryDirectory()
+        self.addCleanup(schema_root.cleanup)
+        settings_override = override_settings(SCHEMA_ROOT=schema_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_schema_generated_once(self):
+        generator_class = CachedSchemaView.generator_class
+        with mock.patch.object(generator_class, 'get_schema',
+                               autospec=True,
+                               side_effect=generator_class.get_schema) as get:
+            first = self.client.get(SCHEMA_URL)
+            second = self.client.get(SCHEMA_URL)
+        self.assertEqual(1, get.call_count)
+        self.assertEqual(200, second.status_code)
+        self.assertEqual(first.content, second.content)
+        self.assertIn('/users/', json.loads(second.content)['paths'])
+
+    def test_ui_page(self):
+        response = self.client.get('/swagger/')
+        self.assertEqual(200, response.status_code)
+
+    def test_prerendered_schema_used(self):
+        """Файл из render_schema отдается без построения схемы"""
+        call_command('render_schema', stdout=StringIO())
+        self.assertTrue(os.path.exists(schema_file_path('openapi')))
+        with mock.patch.object(CachedSchemaView.generator_class,
+                               'get_schema') as get:
+            response = self.client.get(SCHEMA_URL)
+        get.assert_not_called()
+        self.assertEqual(200, response.status_code)
+        with open(schema_file_path('openapi'), 'rb') as file:
+            self.assertEqual(file.read(), response.content)
+
+
+class CodeVersionTestCase(TestCase):
+    """Версия кода для имени файла схемы"""
+
+    def setUp(self):
+        code_version.cache_clear()
+        self.addCleanup(code_version.cache_clear)
+
+    def test_sources_are_project_modules(self):
+        files = [os.path.relpath(path, settings.BASE_DIR)
+                 for path in schema_source_files()]
+        self.assertIn(os.path.join('users', 'views.py'), files)
+        self.assertIn(os.path.join('config', 'urls.py'), files)
+        self.assertFalse([path for path in files
+                          if 'migrations' in path or 'tests' in path])
+
+    def versions_in(self, *directories):
+        versions = []
+        for directory in directories:
+            os.makedirs(os.path.join(directory, 'config'))
+            with open(os.path.join(directory, 'config', 'urls.py'), 'w') as f:
+                f.write('urlpatterns = []\n')
+            code_version.cache_clear()
+            with override_settings(BASE_DIR=directory), \
+                    mock.patch('config.yasg.apps.get_app_configs',
+                               return_value=[]):
+                versions.append(code_version())
+        return versions
+
+    def test_version_does_not_depend_on_base_dir(self):
+        with tempfile.TemporaryDirectory() as first, \
+                tempfile.TemporaryDirectory() as second:
+            self.assertEqual(*self.versions_in(first, second))
+
+    @override_settings(CODE_VERSION='abc123')
+    def test_version_from_settings(self):
+        self.assertEqual('abc123', code_version())
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from core.search import SearchIndex, tokenize, reindex
+
+User = get_user_model()
+NOW = datetime(2021, 1, 10, 12, 0, tzinfo=timezone.utc)
+
+
+class TokenizeTestCase(SimpleTestCase):
+    """Разбиение текста твита на токены"""
+
+    def test_hashtags_and_mentions(self):
+        """Хэштеги и упоминания индексируются с префиксом и без"""
+        tokens = tokenize('Hello @Bob, see #Django news!')
+        self.assertEqual(['hello', '@bob', 'bob', 'see', '#django',
+                          'django', 'news'], tokens)
+
+    def test_unicode_words(self):
+        self.assertEqual(['привет', '#мир', 'мир'], tokenize('Привет #мир'))
+
+
+class SearchIndexTestCase(SimpleTestCase):
+    """Поиск по инвертированному индексу"""
+
+    def setUp(self):
+        self.index = SearchIndex(half_life=3600)
+        self.index.add(1, 'Learning #django today', NOW - timedelta(hours=5))
+        self.index.add(2, 'django tips from @alice', NOW - timedelta(hours=1))
+        self.index.add(3, 'Nothing to see here', NOW)
+        self.index.add(4, '#django #django release', NOW - timedelta(hours=2))
+
+    def test_search_all_terms_required(self):
+        results, cursor = self.index.search('django alice', now=NOW)
+        self.assertEqual([2], [doc_id for doc_id, _ in results])
+        self.assertIsNone(cursor)
+
+    def test_search_hashtag_only(self):
+        """Поиск по хэштегу не находит твиты с простым словом"""
+        results, _ = self.index.search('#django', now=NOW)
+        self.assertEqual({1, 4}, {doc_id for doc_id, _ in results})
+
+    def test_recent_tweets_ranked_higher(self):
+        results, _ = self.index.search('django', now=NOW)
+        self.assertEqual([2, 4, 1], [doc_id for doc_id, _ in results])
+
+    def test_keyset_pagination(self):
+        """Страницы по курсору не пересекаются и сохраняют порядок"""
+        first, cursor = self.index.search('django', limit=2, now=NOW)
+        self.assertIsNotNone(cursor)
+        second, cursor = self.index.search('django', limit=2, cursor=cursor)
+        self.assertIsNone(cursor)
+        self.assertEqual([2, 4, 1],
+                         [doc_id for doc_id, _ in first + second])
+
+    def test_update_and_remove(self):
+        self.index.add(3, 'now about #django', NOW)
+        results, _ = self.index.search('#django', now=NOW)
+        self.assertEqual(3, results[0][0])
+        self.index.remove(3)
+        self.index.remove(3)
+        self.assertNotIn(3, self.index)
+        self.assertEqual(([], None), self.index.search('nothing', now=NOW))
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            self.index.search('django', cursor='not-a-cursor')
+
+
+class ReindexTestCase(TestCase):
+    """Переиндексация пачками"""
+
+    def test_reindex_in_batches_is_resumable(self):
+        users = [User.objects.create(username=f'user_{i}', name=f'user_{i}',
+                                     email=f'user_{i}@gmail.com')
+                 for i in range(5)]
+        index = SearchIndex()
+        queryset = User.objects.all()
+        last_pk = reindex(index, queryset, text_field='username',
+                          date_field='date_joined', batch_size=2)
+        self.assertEqual(users[-1].pk, last_pk)
+        self.assertEqual(5, len(index))
+
+        new_user = User.objects.create(username='user_new', name='user_new',
+                                       email='user_new@gmail.com')
+        last_pk = reindex(index, queryset, text_field='username',
+                          date_field='date_joined', start_after=last_pk)
+        self.assertEqual(new_user.pk, last_pk)
+        self.assertIn(new_user.pk, index)
+        self.assertEqual(6, len(index))
@@ -0,0 +1,107 @@
+import os
+import timeit
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import RequestFactory, TestCase
+from rest_framework import serializers
+
+from users.serializers import ShortUserInfoSerializer
+
+User = get_user_model()
+
+
+class GenericShortUserInfoSerializer(ShortUserInfoSerializer):
+    """Сериалайзер без быстрого пути, для сравнения"""
+
+    class Meta(ShortUserInfoSerializer.Meta):
+        list_serializer_class = serializers.ListSerializer
+
+
+class FastListSerializerTestCase(TestCase):
+    """Быстрая сериализация списков дает тот же результат"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            User.objects.create(
+                username=f'test_user{i}', email=f'test_user{i}@gmail.com',
+                avatar=f'/uploads/avatar/test {i}.jpg' if i % 2 else None)
+
+    def assertSameOutput(self, rows, context=None):
+        context = context or {}
+        expected = GenericShortUserInfoSerializer(
+            User.objects.order_by('id'), many=True, context=context).data
+        data = ShortUserInfoSerializer(rows, many=True, context=context).data
+        self.assertEqual(expected, data)
+
+    def test_instances(self):
+        self.assertSameOutput(User.objects.order_by('id'))
+
+    def test_values(self):
+        rows = User.objects.order_by('id').values(
+            'id', 'username', 'name', 'avatar')
+        self.assertSameOutput(rows)
+
+    def test_absolute_urls_with_request(self):
+        context = {'request': RequestFactory().get('/')}
+        rows = User.objects.order_by('id').values(
+            'id', 'username', 'name', 'avatar')
+        self.assertSameOutput(rows, context)
+
+    def test_empty_list(self):
+        self.assertEqual([], ShortUserInfoSerializer([], many=True).data)
+
+    def test_callable_source(self):
+        class FullNameSerializer(ShortUserInfoSerializer):
+            full_name = serializers.CharField(source='get_full_name')
+
+            class Meta(ShortUserInfoSerializer.Meta):
+                fields = ['id', 'full_name']
+
+        user = User.objects.order_by('id').first()
+        user.first_name, user.last_name = 'Ivan', 'Petrov'
+        data = FullNameSerializer([user], many=True).data
+        self.assertEqual('Ivan Petrov', data[0]['full_name'])
+
+    def test_values_alias_file_field(self):
+        class PictureSerializer(ShortUserInfoSerializer):
+            picture = serializers.ImageField(read_only=True)
+
+            class Meta(ShortUserInfoSerializer.Meta):
+                fields = ['id', 'picture']
+
+        rows = User.objects.order_by('id').values('id', picture=F('avatar'))
+        data = PictureSerializer(rows, many=True).data
+        expected = GenericShortUserInfoSerializer(
+            User.objects.order_by('id'), many=True).data
+        self.assertEqual([row['avatar'] for row in expected],
+                         [row['picture'] for row in data])
+
+
+@skipUnless(os.getenv('BENCHMARKS'), 'set BENCHMARKS=1 to run benchmarks')
+class FastListSerializerBenchmark(TestCase):
+    """Сравнение скорости на странице из 1000 пользователей"""
+
+    def test_benchmark_1000_rows(self):
+        User.objects.bulk_create(
+            User(username=f'test_user{i}', email=f'test_user{i}@gmail.com',
+                 avatar=f'uploads/avatar/{i}.jpg') for i in range(1000))
+        context = {'request': RequestFactory().get('/')}
+        queryset = User.objects.order_by('id')
+        values = queryset.values('id', 'username', 'name', 'avatar')
+
+        def generic():
+            GenericShortUserInfoSerializer(
+                list(queryset), many=True, context=context).data
+
+        def fast():
+            ShortUserInfoSerializer(
+                list(values), many=True, context=context).data
+
+        generic_time = min(timeit.repeat(generic, number=5, repeat=3))
+        fast_time = min(timeit.repeat(fast, number=5, repeat=3))
+        print(f'\ngeneric: {generic_time:.3f}s, fast: {fast_time:.3f}s, '
+              f'x{generic_time / fast_time:.1f}')
+        self.assertLess(fast_time, generic_time)
@@ -0,0 +1,35 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from core.management.commands.profile_startup import group_by_package, \
+    parse_importtime
+
+IMPORTTIME = '''\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     django.utils.version
+import time:       300 |        420 |   django.utils
+import time:       500 |        920 | django
+import time:        80 |         80 | users.models
+'''
+
+
+class ProfileStartupTestCase(SimpleTestCase):
+    """Профилирование импорта при старте воркера"""
+
+    def test_parse_importtime(self):
+        imports = parse_importtime(IMPORTTIME)
+        self.assertEqual(('django.utils.version', 120, 120), imports[0])
+        self.assertEqual(4, len(imports))
+
+    def test_group_by_package(self):
+        rows = group_by_package(parse_importtime(IMPORTTIME))
+        self.assertEqual([('django', 920, 3), ('users', 80, 1)], rows)
+
+    def test_command_reports_modules(self):
+        out = StringIO()
+        call_command('profile_startup', limit=2000, group='module', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('Startup: '))
+        self.assertIn('django.urls', out.getvalue())
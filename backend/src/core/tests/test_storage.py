@@ -0,0 +1,137 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import Storage
+from django.test import RequestFactory, SimpleTestCase, TestCase
+
+from core.storage import ExpiringLRUCache, FileURLResolver
+from core.tests.test_serializers import GenericShortUserInfoSerializer
+from users.serializers import ShortUserInfoSerializer
+
+User = get_user_model()
+
+
+class FakeRemoteStorage(Storage):
+    """Хранилище с подписанными URL, считает обращения"""
+    querystring_expire = 60
+
+    def __init__(self):
+        self.url_calls = 0
+
+    def url(self, name):
+        self.url_calls += 1
+        return f'https://cdn.example.com/{name}?signature={len(name)}'
+
+
+class FakeBatchStorage(FakeRemoteStorage):
+    """Хранилище, умеющее подписывать URL пачкой"""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def urls(self, names):
+        self.batches.append(names)
+        return {name: f'https://cdn.example.com/{name}?batch'
+                for name in names}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class ExpiringLRUCacheTestCase(SimpleTestCase):
+    """LRU кэш со сроком жизни записей"""
+
+    def test_expired_entries_not_returned(self):
+        clock = FakeClock()
+        cache = ExpiringLRUCache(clock=clock)
+        cache.set_many({'a': 1}, timeout=10)
+        clock.now = 9
+        self.assertEqual({'a': 1}, cache.get_many(['a', 'b']))
+        clock.now = 10
+        self.assertEqual({}, cache.get_many(['a']))
+        self.assertEqual(0, len(cache))
+
+    def test_least_recently_used_evicted(self):
+        cache = ExpiringLRUCache(maxsize=2)
+        cache.set_many({'a': 1, 'b': 2}, timeout=10)
+        cache.get_many(['a'])
+        cache.set_many({'c': 3}, timeout=10)
+        self.assertEqual({'a': 1, 'c': 3}, cache.get_many(['a', 'b', 'c']))
+
+
+class FileURLResolverTestCase(SimpleTestCase):
+    """URL файлов получаются пачкой и кэшируются"""
+
+    def test_batch_storage_called_once_per_page(self):
+        storage = FakeBatchStorage()
+        resolver = FileURLResolver(storage)
+        names = ['a.jpg', 'b.jpg', None, 'a.jpg']
+        urls = resolver.resolve(names)
+        self.assertEqual({'a.jpg', 'b.jpg'}, set(urls))
+        self.assertEqual([['a.jpg', 'b.jpg']], storage.batches)
+
+        resolver.resolve(['a.jpg', 'c.jpg'])
+        self.assertEqual([['a.jpg', 'b.jpg'], ['c.jpg']], storage.batches)
+        self.assertEqual(0, storage.url_calls)
+
+    def test_storage_without_batch_api(self):
+        storage = FakeRemoteStorage()
+        resolver = FileURLResolver(storage)
+        resolver.resolve(['a.jpg', 'b.jpg'])
+        resolver.resolve(['a.jpg', 'b.jpg'])
+        self.assertEqual(2, storage.url_calls)
+
+    def test_signed_urls_cached_less_than_expire(self):
+        resolver = FileURLResolver(FakeRemoteStorage(), timeout=300)
+        self.assertEqual(30, resolver.timeout)
+
+
+class FastListSerializerStorageTestCase(TestCase):
+    """Аватары в списках пользователей с удаленным хранилищем"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            User.objects.create(
+                username=f'test_user{i}', email=f'test_user{i}@gmail.com',
+                avatar=f'uploads/avatar/{i}.jpg' if i % 2 else None)
+
+    def use_storage(self, storage):
+        patcher = mock.patch.object(User._meta.get_field('avatar'),
+                                    'storage', storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def serialize(self, serializer_class, rows):
+        context = {'request': RequestFactory().get('/')}
+        return serializer_class(rows, many=True, context=context).data
+
+    def test_same_output_as_generic_serializer(self):
+        self.use_storage(FakeRemoteStorage())
+        rows = User.objects.order_by('id').values(
+            'id', 'username', 'name', 'avatar')
+        self.assertEqual(
+            self.serialize(GenericShortUserInfoSerializer,
+                           User.objects.order_by('id')),
+            self.serialize(ShortUserInfoSerializer, rows))
+
+    def test_page_resolved_in_one_batch(self):
+        storage = FakeBatchStorage()
+        self.use_storage(storage)
+        rows = User.objects.order_by('id').values(
+            'id', 'username', 'name', 'avatar')
+        data = self.serialize(ShortUserInfoSerializer, rows)
+        self.assertEqual(1, len(storage.batches))
+        self.assertEqual(2, len(storage.batches[0]))
+        self.assertEqual('https://cdn.example.com/uploads/avatar/1.jpg'
+                         '?batch', data[1]['avatar'])
+        self.assertIsNone(data[0]['avatar'])
+
+        self.serialize(ShortUserInfoSerializer, rows)
+        self.assertEqual(1, len(storage.batches))
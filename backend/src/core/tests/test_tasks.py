@@ -0,0 +1,137 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core.models import Task
+from core.tasks import DatabaseBackend, run_pending, task
+
+calls = []
+
+
+@task
+def remember(value):
+    calls.append(value)
+
+
+@task(batch_size=10)
+def remember_batch(payloads):
+    calls.append(sorted(payload['value'] for payload in payloads))
+
+
+@task(max_retries=1, retry_delay=10)
+def broken(value):
+    raise ValueError(value)
+
+
+class TaskQueueTestCase(TestCase):
+    """Очередь задач в базе и воркер"""
+
+    def setUp(self):
+        calls.clear()
+
+    def enqueue(self, function, **payload):
+        DatabaseBackend().enqueue([(function.name, payload, None)])
+
+    def test_task_executed_and_deleted(self):
+        self.enqueue(remember, value=1)
+        self.assertEqual(1, run_pending())
+        self.assertEqual([1], calls)
+        self.assertFalse(Task.objects.exists())
+
+    def test_identical_pending_tasks_deduplicated(self):
+        self.enqueue(remember, value=1)
+        self.enqueue(remember, value=1)
+        self.enqueue(remember, value=2)
+        self.assertEqual(2, Task.objects.count())
+
+    def test_batch_task_called_once(self):
+        for value in range(3):
+            self.enqueue(remember_batch, value=value)
+        run_pending()
+        self.assertEqual([[0, 1, 2]], calls)
+
+    def test_failed_task_retried_with_delay(self):
+        self.enqueue(broken, value=1)
+        run_pending()
+        task_row = Task.objects.get()
+        self.assertEqual(Task.PENDING, task_row.status)
+        self.assertEqual(1, task_row.attempts)
+        self.assertIn('ValueError', task_row.error)
+        self.assertGreater(task_row.run_at, timezone.now())
+        # Время повтора еще не пришло
+        self.assertEqual(0, run_pending())
+
+        Task.objects.update(run_at=timezone.now())
+        run_pending()
+        self.assertEqual(Task.FAILED, Task.objects.get().status)
+
+    def test_stale_running_task_claimed_again(self):
+        self.enqueue(remember, value=1)
+        Task.objects.update(status=Task.RUNNING,
+                            locked_at=timezone.now() - timedelta(hours=1))
+        run_pending()
+        self.assertEqual([1], calls)
+
+    def test_unknown_task_failed(self):
+        DatabaseBackend().enqueue([('core.tests.missing', {}, None)])
+        run_pending()
+        self.assertEqual(Task.FAILED, Task.objects.get().status)
+
+    def test_run_tasks_command(self):
+        for value in range(5):
+            self.enqueue(remember, value=value)
+        out = StringIO()
+        call_command('run_tasks', once=True, batch_size=2, stdout=out)
+        self.assertEqual([0, 1, 2, 3, 4], sorted(calls))
+        self.assertIn('Tasks processed: 5', out.getvalue())
+
+
+class TaskDelayTestCase(TransactionTestCase):
+    """Задачи ставятся в очередь только после коммита"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueued_on_commit(self):
+        with transaction.atomic():
+            remember.delay(value=1)
+            self.assertFalse(Task.objects.exists())
+        self.assertEqual({'value': 1}, Task.objects.get().payload)
+
+    def test_not_enqueued_on_rollback(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                remember.delay(value=1)
+                raise RuntimeError
+        self.assertFalse(Task.objects.exists())
+
+    def test_schedule_with_countdown(self):
+        remember.schedule(60, value=1)
+        self.assertGreater(Task.objects.get().run_at,
+                           timezone.now() + timedelta(seconds=50))
+        self.assertEqual(0, run_pending())
+
+    @override_settings(TASKS_BACKEND='core.tasks.ImmediateBackend')
+    def test_immediate_backend(self):
+        with transaction.atomic():
+            remember.delay(value=1)
+            self.assertEqual([], calls)
+        self.assertEqual([1], calls)
+
+    @override_settings(TASKS_BACKEND='core.tasks.ImmediateBackend')
+    def test_immediate_backend_logs_errors(self):
+        """Ошибка задачи не попадает в код, закоммитивший транзакцию"""
+        with self.assertLogs('apps', 'ERROR') as logs:
+            with transaction.atomic():
+                broken.delay(value=1)
+        self.assertIn('failed', logs.output[0])
+
+    def test_run_tasks_command_processes_exit(self):
+        """Pool.terminate() завершает процессы, команда не зависает"""
+        out = StringIO()
+        call_command('run_tasks', once=True, processes=2, stdout=out)
+        self.assertIn('Tasks processed: 0', out.getvalue())
@@ -0,0 +1,80 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from core.testing import UPDATE_ENV, QueryBudgetMixin, normalize_sql
+
+User = get_user_model()
+
+
+class NormalizeSQLTestCase(SimpleTestCase):
+
+    def test_values_replaced(self):
+        self.assertEqual(
+            'SELECT "a"."id" FROM "users_user" "a" WHERE "a"."id" IN (...) '
+            'AND "a"."name" = ? LIMIT ?',
+            normalize_sql('SELECT "a"."id" FROM "users_user" "a" WHERE '
+                          '"a"."id" IN (1, 25, 3) AND "a"."name" = '
+                          '\'it\'\'s 2\' LIMIT 21'))
+
+
+class QueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    """Проверка бюджета запросов и запись файла бюджетов"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.query_budget_file = os.path.join(cls.directory.name,
+                                             'budgets.json')
+        with open(cls.query_budget_file, 'w') as file:
+            json.dump({'one query': {'queries': 1, 'sql': [
+                'SELECT COUNT(*) AS "__count" FROM "users_user"']}}, file)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.directory.cleanup()
+
+    def test_within_budget(self):
+        with self.assertQueryBudget('one query'):
+            User.objects.count()
+
+    def test_exceeded_shows_diff(self):
+        with self.assertRaises(AssertionError) as raised:
+            with self.assertQueryBudget('one query'):
+                User.objects.count()
+                list(User.objects.filter(id=1))
+        message = str(raised.exception)
+        self.assertIn('one query: 2 queries, budget 1', message)
+        self.assertIn('+SELECT "users_user"."id"', message)
+        self.assertIn('WHERE "users_user"."id" = ?', message)
+
+    def test_missing_budget(self):
+        with self.assertRaises(AssertionError) as raised:
+            with self.assertQueryBudget('unknown'):
+                pass
+        self.assertIn(UPDATE_ENV, str(raised.exception))
+
+    def test_explicit_limits(self):
+        with self.assertQueryBudget('unknown', max_queries=0):
+            pass
+        with self.assertRaises(AssertionError):
+            with self.assertQueryBudget('unknown', max_queries=5,
+                                        max_seconds=0.000001):
+                User.objects.count()
+
+    def test_update_records_budgets(self):
+        with mock.patch.dict(os.environ, {UPDATE_ENV: '1'}):
+            with self.assertQueryBudget('two queries'):
+                User.objects.count()
+                User.objects.exists()
+        self.query_budgets.save()
+        with open(self.query_budget_file) as file:
+            budgets = json.load(file)
+        self.assertEqual(2, budgets['two queries']['queries'])
+        self.assertEqual(1, budgets['one query']['queries'])
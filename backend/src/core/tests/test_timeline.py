@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core.timeline import merge_sorted, merge_timeline, queryset_source
+from users.models import Following
+
+User = get_user_model()
+
+
+def counting(rows, log):
+    """Источник, который запоминает сколько записей из него прочитали"""
+    for row in rows:
+        log.append(row['pk'])
+        yield row
+
+
+class MergeTimelineTestCase(SimpleTestCase):
+    """Слияние лент нескольких авторов"""
+
+    def setUp(self):
+        self.author1 = [{'pk': 6, 'created_at': 60},
+                        {'pk': 3, 'created_at': 30, 'original_id': 1},
+                        {'pk': 2, 'created_at': 20}]
+        self.author2 = [{'pk': 5, 'created_at': 50, 'original_id': 1},
+                        {'pk': 4, 'created_at': 40},
+                        {'pk': 1, 'created_at': 10}]
+
+    def test_merge_sorted(self):
+        rows = list(merge_sorted([self.author1, self.author2, []]))
+        self.assertEqual([6, 5, 4, 3, 2, 1], [row['pk'] for row in rows])
+
+    def test_retweets_deduplicated(self):
+        """Ретвиты одного твита показываются один раз, самый свежий"""
+        rows = merge_timeline([self.author1, self.author2], limit=10)
+        self.assertEqual([6, 5, 4, 2], [row['pk'] for row in rows])
+
+    def test_sources_read_lazily(self):
+        read1, read2 = [], []
+        rows = merge_timeline([counting(self.author1, read1),
+                               counting(self.author2, read2)], limit=2)
+        self.assertEqual([6, 5], [row['pk'] for row in rows])
+        self.assertEqual([6, 3], read1)
+        self.assertEqual([5], read2)
+
+
+class QuerysetSourceTestCase(TestCase):
+    """Ленивая загрузка пачками из базы"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create(username=f'test_user{i}',
+                                         email=f'test_user{i}@gmail.com')
+                     for i in range(30)]
+        now = timezone.now()
+        for author in cls.users[:2]:
+            for target in cls.users[2:]:
+                Following.objects.create(user=author, following_user=target)
+        # одинаковое время у всех записей проверяет keyset по pk
+        Following.objects.update(created_at=now - timedelta(days=1))
+
+    def source(self, user, **kwargs):
+        queryset = Following.objects.filter(user=user).values(
+            'pk', 'created_at', 'following_user_id')
+        return queryset_source(queryset, **kwargs)
+
+    def test_source_reads_all_rows_in_chunks(self):
+        with self.assertNumQueries(3):
+            rows = list(self.source(self.users[0], first_chunk=5))
+        self.assertEqual(28, len(rows))
+        self.assertEqual(28, len({row['pk'] for row in rows}))
+
+    def test_page_loads_only_needed_chunks(self):
+        """Для страницы из 5 записей хватает первой пачки источников"""
+        with self.assertNumQueries(2):
+            rows = merge_timeline(
+                [self.source(user, first_chunk=5) for user in self.users[:2]],
+                limit=5, dedup_key=lambda row: row['following_user_id'])
+        self.assertEqual(5, len(rows))
+        self.assertEqual(5, len({row['following_user_id'] for row in rows}))
@@ -0,0 +1,93 @@
+import json
+import random
+from collections import Counter
+
+from django.test import SimpleTestCase
+
+from core.trends import CountMinSketch, SlidingTopK, TrendsEngine, \
+    extract_hashtags
+
+START = 1610000000
+
+
+def synthetic_tweets(count, seed=42, tags=200, period=10):
+    """
+    Поток твитов с хэштегами, распределенными по закону Ципфа.
+    Твиты идут каждые period секунд.
+    """
+    rnd = random.Random(seed)
+    weights = [1 / rank for rank in range(1, tags + 1)]
+    names = [f'tag{i}' for i in range(tags)]
+    for i in range(count):
+        chosen = rnd.choices(names, weights=weights, k=2)
+        text = 'hello ' + ' '.join(f'#{name}' for name in chosen)
+        yield text, START + i * period
+
+
+class CountMinSketchTestCase(SimpleTestCase):
+    """Приближенный счетчик"""
+
+    def test_estimate_never_below_real_count(self):
+        sketch = CountMinSketch(width=64, depth=3)
+        real = Counter()
+        rnd = random.Random(1)
+        for _ in range(2000):
+            key = f'key{rnd.randint(0, 300)}'
+            sketch.add(key)
+            real[key] += 1
+        for key, count in real.items():
+            self.assertGreaterEqual(sketch.estimate(key), count)
+
+
+class SlidingTopKTestCase(SimpleTestCase):
+    """Top-K в скользящем окне"""
+
+    def test_old_buckets_expire(self):
+        counter = SlidingTopK(window=60, buckets=6, k=3)
+        counter.add({'#old'}, START)
+        counter.add({'#old'}, START + 1)
+        self.assertEqual([('#old', 2)], counter.top())
+        counter.add({'#new'}, START + 120)
+        self.assertEqual([('#new', 1)], counter.top())
+        counter.add({'#old'}, START)
+        self.assertEqual([('#new', 1)], counter.top())
+
+    def test_advance_without_tweets(self):
+        counter = SlidingTopK(window=60, buckets=6, k=3)
+        counter.add({'#tag'}, START)
+        counter.advance_to(START + 600)
+        self.assertEqual([], counter.top())
+
+
+class TrendsEngineReplayTestCase(SimpleTestCase):
+    """Проигрываем синтетический поток твитов"""
+
+    def test_top_matches_exact_counts(self):
+        tweets = list(synthetic_tweets(5000))
+        engine = TrendsEngine(windows={'hour': 3600}, k=5)
+        engine.consume_stream(tweets)
+
+        last = tweets[-1][1]
+        exact = Counter()
+        for text, created_at in tweets:
+            if created_at // 60 > last // 60 - 60:
+                exact.update(extract_hashtags(text))
+        expected = [tag for tag, _ in exact.most_common(3)]
+        trends = engine.trends('hour')
+        self.assertEqual(expected, [tag for tag, _ in trends[:3]])
+        for tag, count in trends:
+            self.assertGreaterEqual(count, exact[tag])
+
+    def test_snapshot_restore(self):
+        tweets = synthetic_tweets(3000, seed=7)
+        engine = TrendsEngine(windows={'hour': 3600, 'day': 86400}, k=5)
+        engine.consume_stream(tweets)
+        state = json.loads(json.dumps(engine.snapshot()))
+        restored = TrendsEngine.restore(state)
+        self.assertEqual(engine.trends('day'), restored.trends('day'))
+
+        more = list(synthetic_tweets(500, seed=8))
+        more = [(text, created_at + 30000) for text, created_at in more]
+        engine.consume_stream(more)
+        restored.consume_stream(more)
+        self.assertEqual(engine.trends('hour'), restored.trends('hour'))
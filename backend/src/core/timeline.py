@@ -0,0 +1,89 @@
+import heapq
+from itertools import islice
+from operator import itemgetter
+
+from django.db.models import Q
+
+
+def queryset_source(queryset, order_field='created_at', first_chunk=10,
+                    max_chunk=200):
+    """
+    Ленивый поток записей одного автора от новых к старым.
+    Записи загружаются keyset пачками, размер пачки удваивается,
+    пока источник продолжают читать. queryset должен возвращать
+    словари (.values()) с полями order_field и pk.
+    """
+    chunk = first_chunk
+    position = None
+    while True:
+        page = queryset.order_by(f'-{order_field}', '-pk')
+        if position is not None:
+            value, pk = position
+            page = page.filter(Q(**{f'{order_field}__lt': value}) |
+                               Q(**{order_field: value, 'pk__lt': pk}))
+        rows = list(page[:chunk])
+        yield from rows
+        if len(rows) < chunk:
+            return
+        position = (rows[-1][order_field], rows[-1]['pk'])
+        chunk = min(chunk * 2, max_chunk)
+
+
+def merge_sorted(sources, key=itemgetter('created_at')):
+    """
+    k-way слияние потоков, каждый из которых отсортирован по key
+    по убыванию. Следующая запись источника читается только тогда,
+    когда предыдущая ушла в результат.
+    """
+    heap = []
+    for index, source in enumerate(map(iter, sources)):
+        for row in source:
+            heap.append((_Desc(key(row)), index, row, source))
+            break
+    heapq.heapify(heap)
+    while heap:
+        _, index, row, source = heap[0]
+        yield row
+        for next_row in source:
+            heapq.heapreplace(heap, (_Desc(key(next_row)), index,
+                                     next_row, source))
+            break
+        else:
+            heapq.heappop(heap)
+
+
+def unique_by(rows, key):
+    """Пропускаем повторы, например ретвиты одного и того же твита"""
+    seen = set()
+    for row in rows:
+        value = key(row)
+        if value in seen:
+            continue
+        seen.add(value)
+        yield row
+
+
+def original_id(row):
+    """Для ретвита - id исходного твита, иначе id самой записи"""
+    return row.get('original_id') or row['pk']
+
+
+def merge_timeline(sources, limit, key=itemgetter('created_at'),
+                   dedup_key=original_id):
+    """Страница ленты: слияние, удаление повторов и обрезка по limit"""
+    return list(islice(unique_by(merge_sorted(sources, key), dedup_key),
+                       limit))
+
+
+class _Desc:
+    """Обертка для сортировки по убыванию в heapq"""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return self.value > other.value
+
+    def __eq__(self, other):
+        return self.value == other.value
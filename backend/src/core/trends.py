@@ -0,0 +1,192 @@
+import hashlib
+from array import array
+
+from core.search import tokenize
+
+
+def extract_hashtags(text):
+    """Хэштеги из текста твита без повторов"""
+    return {token for token in tokenize(text) if token.startswith('#')}
+
+
+class CountMinSketch:
+    """
+    Приближенный счетчик частот.
+    Оценка никогда не меньше реального значения,
+    ошибка ограничена размером width.
+    """
+
+    def __init__(self, width=2048, depth=4, table=None):
+        self.width = width
+        self.depth = depth
+        self.table = table if table is not None else \
+            array('q', bytes(8 * width * depth))
+
+    def _cells(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [row * self.width + (h1 + row * h2) % self.width
+                for row in range(self.depth)]
+
+    def add(self, key, count=1):
+        for cell in self._cells(key):
+            self.table[cell] += count
+
+    def estimate(self, key):
+        return min(self.table[cell] for cell in self._cells(key))
+
+    def merge(self, other, sign=1):
+        """Поячеечно прибавляем (или вычитаем) другой скетч"""
+        table = self.table
+        for i, value in enumerate(other.table):
+            if value:
+                table[i] += sign * value
+
+
+class SlidingTopK:
+    """
+    Top-K хэштегов в скользящем окне времени.
+    Окно разбито на buckets корзин, для каждой корзины
+    ведется свой скетч, суммарный скетч окна обновляется при
+    добавлении твитов и вычитании устаревших корзин.
+    """
+
+    def __init__(self, window=3600, buckets=60, k=10, width=2048, depth=4):
+        assert window % buckets == 0, 'window must be a multiple of buckets'
+        self.window = window
+        self.bucket_count = buckets
+        self.bucket_seconds = window // buckets
+        self.k = k
+        self.width = width
+        self.depth = depth
+        self._total = CountMinSketch(width, depth)
+        self._buckets = {}
+        self._candidates = {}
+        self._current = None
+        self._top = []
+
+    def add(self, hashtags, timestamp):
+        bucket_id = int(timestamp // self.bucket_seconds)
+        if self._current is None or bucket_id > self._current:
+            self._advance(bucket_id)
+        elif bucket_id <= self._current - self.bucket_count:
+            # Твит старше окна
+            return
+
+        bucket = self._buckets.get(bucket_id)
+        if bucket is None:
+            bucket = self._buckets[bucket_id] = CountMinSketch(
+                self.width, self.depth)
+        for tag in hashtags:
+            bucket.add(tag)
+            self._total.add(tag)
+            self._offer(tag, self._total.estimate(tag))
+        if hashtags:
+            self._refresh_top()
+
+    def _offer(self, tag, count):
+        candidates = self._candidates
+        if tag in candidates or len(candidates) < self.k:
+            candidates[tag] = count
+            return
+        weakest = min(candidates, key=candidates.get)
+        if count > candidates[weakest]:
+            del candidates[weakest]
+            candidates[tag] = count
+
+    def _advance(self, bucket_id):
+        self._current = bucket_id
+        oldest = bucket_id - self.bucket_count
+        expired = [b for b in self._buckets if b <= oldest]
+        if not expired:
+            return
+        for b in expired:
+            self._total.merge(self._buckets.pop(b), sign=-1)
+        for tag in list(self._candidates):
+            count = self._total.estimate(tag)
+            if count > 0:
+                self._candidates[tag] = count
+            else:
+                del self._candidates[tag]
+        self._refresh_top()
+
+    def _refresh_top(self):
+        self._top = sorted(self._candidates.items(),
+                           key=lambda item: (-item[1], item[0]))
+
+    def advance_to(self, timestamp):
+        """Сдвигаем окно, даже если новых твитов не было"""
+        bucket_id = int(timestamp // self.bucket_seconds)
+        if self._current is None or bucket_id > self._current:
+            self._advance(bucket_id)
+
+    def top(self):
+        """Текущий top-K в виде списка (hashtag, count), без пересчета"""
+        return self._top
+
+    def snapshot(self):
+        return {
+            'window': self.window,
+            'buckets': self.bucket_count,
+            'k': self.k,
+            'width': self.width,
+            'depth': self.depth,
+            'current': self._current,
+            'sketches': {str(b): list(sketch.table)
+                         for b, sketch in self._buckets.items()},
+            'candidates': self._candidates,
+        }
+
+    @classmethod
+    def restore(cls, state):
+        obj = cls(window=state['window'], buckets=state['buckets'],
+                  k=state['k'], width=state['width'], depth=state['depth'])
+        obj._current = state['current']
+        for b, table in state['sketches'].items():
+            sketch = CountMinSketch(obj.width, obj.depth, array('q', table))
+            obj._buckets[int(b)] = sketch
+            obj._total.merge(sketch)
+        obj._candidates = dict(state['candidates'])
+        obj._refresh_top()
+        return obj
+
+
+class TrendsEngine:
+    """
+    Тренды по хэштегам для нескольких окон (например час и сутки).
+    Получает поток твитов и отдает тренды из памяти.
+    """
+
+    def __init__(self, windows=None, **options):
+        windows = windows or {'hour': 3600, 'day': 86400}
+        self.windows = {
+            name: SlidingTopK(window=seconds, **options)
+            for name, seconds in windows.items()
+        }
+
+    def consume(self, text, created_at):
+        hashtags = extract_hashtags(text)
+        timestamp = created_at.timestamp() \
+            if hasattr(created_at, 'timestamp') else created_at
+        for counter in self.windows.values():
+            counter.add(hashtags, timestamp)
+
+    def consume_stream(self, tweets):
+        """tweets - итерируемый объект из пар (text, created_at)"""
+        for text, created_at in tweets:
+            self.consume(text, created_at)
+
+    def trends(self, window='hour'):
+        return self.windows[window].top()
+
+    def snapshot(self):
+        return {name: counter.snapshot()
+                for name, counter in self.windows.items()}
+
+    @classmethod
+    def restore(cls, state):
+        obj = cls.__new__(cls)
+        obj.windows = {name: SlidingTopK.restore(counter_state)
+                       for name, counter_state in state.items()}
+        return obj
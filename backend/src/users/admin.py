@@ -1,18 +1,40 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ObjectDoesNotExist
 
+from core.pagination import EstimatedCountPaginator
 from users.forms import CustomUserCreationForm, CustomUserChangeForm
+from users.tasks import deactivate_user
 
 User = get_user_model()
 
 
+class UserChangeList(ChangeList):
+    """Список пользователей загружает только показываемые колонки"""
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).only(
+            'username', 'name', 'email', 'is_staff', 'is_active',
+            'stats__followers_count', 'stats__following_count')
+
+
 class CustomUserAdmin(UserAdmin):
     """Редактирование основных данных пользователя в админке"""
     add_form = CustomUserCreationForm
     form = CustomUserChangeForm
     model = User
-    list_display = ['username', 'name', 'email', 'is_staff']
+    list_display = ['username', 'name', 'email', 'is_staff', 'is_active',
+                    'followers_count', 'following_count']
+    list_select_related = ['stats']
+    # Поиск по префиксу использует индексы UPPER(...) text_pattern_ops,
+    # см. миграцию 0007_user_stats
+    search_fields = ['^username', '^email']
+    # На миллионах строк COUNT(*) слишком долгий
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = ['followers_count', 'following_count']
     fieldsets = (
         ('User', {'fields': ('username', 'name', 'email')}),
         ('Info', {'fields': ('avatar', 'header', 'description', 'location',
@@ -20,8 +42,38 @@ class CustomUserAdmin(UserAdmin):
         ('Personal info', {'fields': ('first_name', 'last_name',
                                       'phone_number', 'date_of_birth',
                                       'gender', 'country',)}),
+        ('Following', {'fields': ('followers_count', 'following_count')}),
         ('Permissions', {'fields': ('is_staff',)}),
     )
 
+    def get_changelist(self, request, **kwargs):
+        return UserChangeList
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('stats')
+
+    @staticmethod
+    def _stats(obj):
+        try:
+            return obj.stats
+        except ObjectDoesNotExist:
+            return None
+
+    def followers_count(self, obj):
+        stats = self._stats(obj)
+        return stats.followers_count if stats else None
+
+    def following_count(self, obj):
+        stats = self._stats(obj)
+        return stats.following_count if stats else None
+
+    def delete_model(self, request, obj):
+        # Подписки удаляются в фоне пачками, см. users.tasks
+        deactivate_user(obj, delete=True)
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            deactivate_user(user, delete=True)
+
 
 admin.site.register(User, CustomUserAdmin)
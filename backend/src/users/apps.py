@@ -1,5 +1,65 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class UsersConfig(AppConfig):
     name = 'users'
+
+    def ready(self):
+        from users.cache import following_changed, following_purged, \
+            profile_changed, user_deleted
+        from users.cache import user_saved as response_cache_user_saved
+        from users.graph import following_deleted, following_saved
+        from users.graph import following_purged as graph_following_purged
+        from users.models import Following, User
+        from users.profiles import invalidate_profile, user_saved
+        from users.signals import following_removed, profile_updated
+        from users.stats import count_follow, count_removed, \
+            count_unfollow, create_user_stats
+        from users.tasks import mirror_follow, mirror_removed, \
+            mirror_unfollow
+
+        # Подписки и отписки сразу попадают в снимок графа процесса
+        post_save.connect(following_saved, sender=Following,
+                          dispatch_uid='follow_graph_saved')
+        post_delete.connect(following_deleted, sender=Following,
+                            dispatch_uid='follow_graph_deleted')
+        # Закэшированные профили сбрасываются при изменении их полей
+        profile_updated.connect(invalidate_profile, sender=User,
+                                dispatch_uid='user_profile_updated')
+        post_save.connect(user_saved, sender=User,
+                          dispatch_uid='user_profile_saved')
+        post_delete.connect(invalidate_profile, sender=User,
+                            dispatch_uid='user_profile_deleted')
+        # Денормализованные счетчики подписок
+        post_save.connect(create_user_stats, sender=User,
+                          dispatch_uid='user_stats_created')
+        post_save.connect(count_follow, sender=Following,
+                          dispatch_uid='user_stats_follow')
+        post_delete.connect(count_unfollow, sender=Following,
+                            dispatch_uid='user_stats_unfollow')
+        # Закэшированные ответы API, см. core.cache.cache_response
+        profile_updated.connect(profile_changed, sender=User,
+                                dispatch_uid='response_cache_profile')
+        post_save.connect(response_cache_user_saved, sender=User,
+                          dispatch_uid='response_cache_user_saved')
+        post_delete.connect(user_deleted, sender=User,
+                            dispatch_uid='response_cache_user_deleted')
+        post_save.connect(following_changed, sender=Following,
+                          dispatch_uid='response_cache_follow')
+        post_delete.connect(following_changed, sender=Following,
+                            dispatch_uid='response_cache_unfollow')
+        # Копия ребер в шардах FOLLOW_SHARDS через очередь задач
+        post_save.connect(mirror_follow, sender=Following,
+                          dispatch_uid='follow_shards_saved')
+        post_delete.connect(mirror_unfollow, sender=Following,
+                            dispatch_uid='follow_shards_deleted')
+        # Пачки подписок, удаленные очисткой без сигналов на каждую строку
+        following_removed.connect(count_removed, sender=Following,
+                                  dispatch_uid='user_stats_removed')
+        following_removed.connect(graph_following_purged, sender=Following,
+                                  dispatch_uid='follow_graph_removed')
+        following_removed.connect(following_purged, sender=Following,
+                                  dispatch_uid='response_cache_removed')
+        following_removed.connect(mirror_removed, sender=Following,
+                                  dispatch_uid='follow_shards_removed')
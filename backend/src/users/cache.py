@@ -0,0 +1,61 @@
+from django.db import transaction
+
+from core.cache import get_response_cache
+from users.serializers import UserPersonalInfoDetailSerializer
+
+
+def profile_tag(user_id):
+    return f'user:{user_id}'
+
+
+def following_tag(user_id):
+    return f'following:{user_id}'
+
+
+def followers_tag(user_id):
+    return f'followers:{user_id}'
+
+
+def _invalidate(tags):
+    response_cache = get_response_cache()
+    response_cache.invalidate(tags)
+    # Повторно после коммита: ответ, вычисленный параллельно
+    # до коммита, мог попасть в кэш уже с новой версией
+    transaction.on_commit(lambda: response_cache.invalidate(tags))
+
+
+def profile_changed(sender, instance, changed_fields=None, **kwargs):
+    """
+    Закэшированный профиль сбрасывается, только если изменились
+    его поля. Списки с деактивированным пользователем сбрасываются
+    пачками по мере удаления его подписок, см. following_purged.
+    """
+    changed = None if changed_fields is None else set(changed_fields)
+    if changed is None or 'is_active' in changed or \
+            changed.intersection(UserPersonalInfoDetailSerializer.Meta.fields):
+        _invalidate([profile_tag(instance.id)])
+
+
+def user_saved(sender, instance, created, update_fields=None, raw=False,
+               **kwargs):
+    """
+    Полное сохранение пользователя (админка). Сохранение отдельных
+    полей, например last_login при входе, кэш не сбрасывает.
+    """
+    if not created and not raw and update_fields is None:
+        _invalidate([profile_tag(instance.id)])
+
+
+def user_deleted(sender, instance, **kwargs):
+    _invalidate([profile_tag(instance.id)])
+
+
+def following_changed(sender, instance, **kwargs):
+    _invalidate([following_tag(instance.user_id),
+                 followers_tag(instance.following_user_id)])
+
+
+def following_purged(sender, edges, **kwargs):
+    _invalidate({tag for user_id, following_user_id in edges
+                 for tag in (following_tag(user_id),
+                             followers_tag(following_user_id))})
@@ -0,0 +1,37 @@
+from functools import lru_cache
+
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+
+
+@lru_cache(maxsize=None)
+def country_names():
+    """
+    Код страны -> название.
+    Справочник загружается при первом обращении, названия остаются
+    ленивыми строками и переводятся на языке текущего запроса.
+    """
+    from django_countries.data import COUNTRIES
+    return dict(COUNTRIES)
+
+
+@lru_cache(maxsize=None)
+def country_codes():
+    """Множество допустимых двухбуквенных кодов ISO 3166-1"""
+    return frozenset(country_names())
+
+
+def country_name(code):
+    return country_names().get(code)
+
+
+def country_choices():
+    """Варианты для форм, отсортированные по коду"""
+    return sorted(country_names().items())
+
+
+def validate_country(value):
+    if value not in country_codes():
+        raise ValidationError(_('"%(value)s" is not a valid country code.'),
+                              code='invalid_country',
+                              params={'value': value})
@@ -2,6 +2,8 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from django.contrib.auth import get_user_model
 
+from users.countries import country_choices
+
 User = get_user_model()
 
 
@@ -14,6 +16,10 @@ class CustomUserCreationForm(UserCreationForm):
 
 class CustomUserChangeForm(UserChangeForm):
     """Форма для редактирования данных пользователя"""
+    country = forms.TypedChoiceField(
+        choices=lambda: [('', '---------')] + country_choices(),
+        required=False, empty_value=None)
+
     class Meta:
         model = User
         # fields = UserChangeForm.Meta.fields
@@ -0,0 +1,430 @@
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Sum
+from django.utils import timezone
+
+from core.cache import TieredCache
+from core.graph import CSRGraph, DeltaCSRGraph
+from users.models import Following, UserStats
+from users.repository import get_follow_repository
+
+# Заголовок файла снимка: метка и время, на которое он построен
+SNAPSHOT_HEADER = struct.Struct('<8sd')
+SNAPSHOT_MAGIC = b'FOLLOWS1'
+
+User = get_user_model()
+
+
+class DatabaseAdjacency:
+    """
+    Соседи вершин графа подписок из хранилища ребер,
+    одним IN запросом на пачку (в каждый шард).
+    limit - сколько ребер на пачку нужно поиску, больше не читается.
+    Степени вершин берутся из счетчиков UserStats.
+    """
+
+    def following(self, user_ids, limit=None):
+        return get_follow_repository().following(user_ids, limit)
+
+    def followers(self, user_ids, limit=None):
+        return get_follow_repository().followers(user_ids, limit)
+
+    def following_degree(self, user_ids):
+        """Сумма числа подписок вершин"""
+        return self._degree(user_ids, 'following_count')
+
+    def followers_degree(self, user_ids):
+        return self._degree(user_ids, 'followers_count')
+
+    @staticmethod
+    def _degree(user_ids, field):
+        return UserStats.objects.filter(user_id__in=user_ids) \
+            .aggregate(degree=Sum(field))['degree'] or 0
+
+
+class HotUsersAdjacency(DatabaseAdjacency):
+    """
+    Подписчики самых популярных пользователей держатся в памяти
+    в виде CSR массивов, остальные вершины читаются из базы.
+    Снимок перестраивается не чаще раза в ttl секунд. Список популярных
+    пользователей общий для всех процессов и хранится в кэше,
+    GROUP BY по всей таблице подписок выполняет один процесс за ttl.
+    """
+
+    def __init__(self, limit, ttl=300):
+        self.limit = limit
+        self.ttl = ttl
+        self._snapshot = CSRGraph()
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._cache = TieredCache(prefix='graph', timeout=ttl)
+
+    def followers(self, user_ids, limit=None):
+        snapshot = self.snapshot()
+        edges = {}
+        missing = []
+        loaded = 0
+        for user_id in user_ids:
+            if user_id in snapshot:
+                edges[user_id] = snapshot.neighbours(user_id)
+                loaded += len(edges[user_id])
+            else:
+                missing.append(user_id)
+        if missing and (limit is None or loaded < limit):
+            edges.update(super().followers(
+                missing, None if limit is None else limit - loaded))
+        return edges
+
+    def snapshot(self):
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at > self.ttl:
+            with self._lock:
+                if self._loaded_at is None or \
+                        now - self._loaded_at > self.ttl:
+                    self._snapshot = self._build()
+                    self._loaded_at = now
+        return self._snapshot
+
+    def hot_user_ids(self):
+        def compute():
+            return get_follow_repository().most_followed(self.limit), True
+        return self._cache.get_or_set(f'hot_users:{self.limit}', compute)
+
+    def _build(self):
+        edges = get_follow_repository().follower_edges(self.hot_user_ids())
+        return CSRGraph.from_sorted_edges(edges)
+
+
+class FollowGraphSnapshot:
+    """
+    Граф подписок в памяти: подписки и подписчики в CSR массивах
+    и изменения, сделанные после построения снимка.
+    Снимок строится командой build_graph_snapshot и сохраняется в файл,
+    воркеры открывают его через mmap, поэтому страницы памяти
+    общие для всех процессов на машине.
+    """
+
+    def __init__(self, following, followers, created_at, buffer=None):
+        self.following = DeltaCSRGraph(following)
+        self.followers = DeltaCSRGraph(followers)
+        self.created_at = created_at
+        # Последний учтенный created_at подписки, см. catch_up()
+        self.seen_at = created_at
+        self._buffer = buffer
+
+    @classmethod
+    def build(cls):
+        # Время берем до чтения, подписки во время построения
+        # будут учтены в catch_up()
+        created_at = timezone.now()
+        edges = Following.objects.values_list('user_id', 'following_user_id')
+        following = CSRGraph.from_sorted_edges(
+            edges.order_by('user_id', 'following_user_id')
+            .iterator(chunk_size=10000))
+        edges = Following.objects.values_list('following_user_id', 'user_id')
+        followers = CSRGraph.from_sorted_edges(
+            edges.order_by('following_user_id', 'user_id')
+            .iterator(chunk_size=10000))
+        return cls(following, followers, created_at)
+
+    def save(self, path):
+        """Атомарная запись: открытые воркерами файлы не меняются"""
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC,
+                                            self.created_at.timestamp()))
+            self.following.base.write(file)
+            self.followers.base.write(file)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, created_at = SNAPSHOT_HEADER.unpack_from(buffer)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f'{path} is not a follow graph snapshot')
+        following, offset = CSRGraph.from_buffer(buffer,
+                                                 SNAPSHOT_HEADER.size)
+        followers, _ = CSRGraph.from_buffer(buffer, offset)
+        created_at = datetime.fromtimestamp(created_at, timezone.utc)
+        return cls(following, followers, created_at, buffer)
+
+    def follow(self, user_id, following_user_id):
+        self.following.add_edge(user_id, following_user_id)
+        self.followers.add_edge(following_user_id, user_id)
+
+    def unfollow(self, user_id, following_user_id):
+        self.following.remove_edge(user_id, following_user_id)
+        self.followers.remove_edge(following_user_id, user_id)
+
+    def catch_up(self, overlap=None):
+        """
+        Добавляем подписки, созданные после снимка в других процессах.
+        Транзакция может закоммитить подписку позже, чем более новую,
+        поэтому подписки перечитываются с запасом overlap секунд
+        (GRAPH_CATCH_UP_OVERLAP) до последнего учтенного created_at,
+        повторное добавление ребра ничего не меняет.
+        Отписки из других процессов появятся со следующим снимком.
+        """
+        if overlap is None:
+            overlap = getattr(settings, 'GRAPH_CATCH_UP_OVERLAP', 60)
+        rows = Following.objects.filter(
+            created_at__gt=self.seen_at - timedelta(seconds=overlap))
+        seen_at = self.seen_at
+        for user_id, following_user_id, created_at in rows.values_list(
+                'user_id', 'following_user_id', 'created_at'):
+            self.follow(user_id, following_user_id)
+            seen_at = max(seen_at, created_at)
+        self.seen_at = seen_at
+
+    def is_following(self, user_id, following_user_id):
+        return self.following.has_edge(user_id, following_user_id)
+
+    def common_followers(self, user_id, other_user_id):
+        return self.followers.intersection(user_id, other_user_id)
+
+    def common_following(self, user_id, other_user_id):
+        return self.following.intersection(user_id, other_user_id)
+
+    def memory_usage(self):
+        """Размер массивов снимка в байтах и число изменений после него"""
+        return {
+            'following_bytes': self.following.base.nbytes,
+            'followers_bytes': self.followers.base.nbytes,
+            'edges': self.following.base.edge_count,
+            'deltas': self.following.delta_count,
+            'mapped': self._buffer is not None,
+        }
+
+
+class SnapshotAdjacency:
+    """
+    Соседи вершин из снимка графа, без запросов к базе.
+    Соседи уже в памяти, поэтому limit не ограничивает чтение.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def following(self, user_ids, limit=None):
+        return {user_id: self.snapshot.following.neighbours(user_id)
+                for user_id in user_ids}
+
+    def followers(self, user_ids, limit=None):
+        return {user_id: self.snapshot.followers.neighbours(user_id)
+                for user_id in user_ids}
+
+    def following_degree(self, user_ids):
+        return sum(self.snapshot.following.degree(user_id)
+                   for user_id in user_ids)
+
+    def followers_degree(self, user_ids):
+        return sum(self.snapshot.followers.degree(user_id)
+                   for user_id in user_ids)
+
+
+_snapshot = None
+_snapshot_mtime = None
+_snapshot_checked_at = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    """
+    Снимок графа для текущего процесса или None, если GRAPH_SNAPSHOT_PATH
+    не задан или файла еще нет. Не чаще раза в GRAPH_SNAPSHOT_CHECK_INTERVAL
+    секунд проверяем, не появился ли новый файл, и догоняем подписки.
+    """
+    global _snapshot, _snapshot_mtime, _snapshot_checked_at
+    path = getattr(settings, 'GRAPH_SNAPSHOT_PATH', None)
+    if not path:
+        return None
+    interval = getattr(settings, 'GRAPH_SNAPSHOT_CHECK_INTERVAL', 10)
+    now = time.monotonic()
+    if _snapshot_checked_at is not None and \
+            now - _snapshot_checked_at < interval:
+        return _snapshot
+    with _snapshot_lock:
+        if _snapshot_checked_at is None or \
+                now - _snapshot_checked_at >= interval:
+            try:
+                mtime = os.stat(path).st_mtime
+            except FileNotFoundError:
+                mtime = None
+            if mtime is None:
+                _snapshot = None
+            elif mtime != _snapshot_mtime:
+                _snapshot = FollowGraphSnapshot.load(path)
+            if _snapshot is not None:
+                _snapshot.catch_up()
+            _snapshot_mtime = mtime
+            _snapshot_checked_at = now
+    return _snapshot
+
+
+def reset_snapshot():
+    global _snapshot, _snapshot_mtime, _snapshot_checked_at
+    with _snapshot_lock:
+        _snapshot = _snapshot_mtime = _snapshot_checked_at = None
+
+
+def following_saved(sender, instance, created, **kwargs):
+    if created and _snapshot is not None:
+        _snapshot.follow(instance.user_id, instance.following_user_id)
+
+
+def following_deleted(sender, instance, **kwargs):
+    if _snapshot is not None:
+        _snapshot.unfollow(instance.user_id, instance.following_user_id)
+
+
+def following_purged(sender, edges, **kwargs):
+    if _snapshot is not None:
+        for user_id, following_user_id in edges:
+            _snapshot.unfollow(user_id, following_user_id)
+
+
+_adjacency = None
+
+
+def get_adjacency():
+    """Источник ребер графа для текущего процесса"""
+    global _adjacency
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return SnapshotAdjacency(snapshot)
+    if _adjacency is None:
+        hot_users = getattr(settings, 'GRAPH_HOT_USERS', 0)
+        if hot_users:
+            _adjacency = HotUsersAdjacency(
+                hot_users, getattr(settings, 'GRAPH_SNAPSHOT_TTL', 300))
+        else:
+            _adjacency = DatabaseAdjacency()
+    return _adjacency
+
+
+class PathResult:
+    """
+    Результат поиска пути.
+    complete=False, если поиск остановлен по бюджету времени или вершин,
+    тогда отсутствие пути не означает, что его нет.
+    """
+
+    def __init__(self, path, complete=True):
+        self.path = path
+        self.complete = complete
+
+    @property
+    def degrees(self):
+        return len(self.path) - 1 if self.path else None
+
+
+def active_user_ids(user_ids):
+    """Активные пользователи из списка, одним запросом"""
+    return set(User.objects.filter(id__in=user_ids, is_active=True)
+               .values_list('id', flat=True))
+
+
+def shortest_path(source, target, adjacency=None, max_depth=None,
+                  timeout=None, max_visited=None, chunk_size=1000,
+                  allowed=None):
+    """
+    Кратчайшая цепочка подписок source -> ... -> target.
+    Двунаправленный поиск в ширину: вперед по подпискам от source,
+    назад по подписчикам от target, на каждом шаге расширяется фронт
+    с меньшей суммой степеней вершин, а не с меньшим числом вершин:
+    одна популярная вершина может дать миллионы соседей.
+    Соседи фронта загружаются пачками по chunk_size и не больше
+    оставшегося бюджета вершин max_visited, бюджеты проверяются
+    на каждой вершине. allowed(ids) -> set отбирает вершины, через
+    которые можно пройти, например active_user_ids.
+    """
+    adjacency = adjacency or get_adjacency()
+    if max_depth is None:
+        max_depth = getattr(settings, 'GRAPH_MAX_DEPTH', 6)
+    if timeout is None:
+        timeout = getattr(settings, 'GRAPH_SEARCH_TIMEOUT', 0.5)
+    if max_visited is None:
+        max_visited = getattr(settings, 'GRAPH_MAX_VISITED', 100000)
+    if allowed is not None and \
+            len(allowed({source, target})) < len({source, target}):
+        return PathResult(None)
+    if source == target:
+        return PathResult([source])
+
+    deadline = time.monotonic() + timeout
+    forward_parents, backward_parents = {source: None}, {target: None}
+    forward, backward = [source], [target]
+    forward_degree = backward_degree = None
+    depth = 0
+    while forward and backward and depth < max_depth:
+        depth += 1
+        if forward_degree is None:
+            forward_degree = adjacency.following_degree(forward)
+        if backward_degree is None:
+            backward_degree = adjacency.followers_degree(backward)
+        if forward_degree <= backward_degree:
+            frontier, parents, others = forward, forward_parents, \
+                backward_parents
+            load = adjacency.following
+        else:
+            frontier, parents, others = backward, backward_parents, \
+                forward_parents
+            load = adjacency.followers
+
+        next_frontier = []
+        for start in range(0, len(frontier), chunk_size):
+            # Соседей больше оставшегося бюджета не читаем: поиск
+            # все равно остановится на них
+            remaining = max_visited - len(forward_parents) - \
+                len(backward_parents)
+            if time.monotonic() > deadline or remaining < 0:
+                return PathResult(None, complete=False)
+            chunk = frontier[start:start + chunk_size]
+            edges = load(chunk, limit=remaining + 1)
+            if sum(len(edges.get(node, ())) for node in chunk) > remaining:
+                return PathResult(None, complete=False)
+            candidates = {neighbour for node in chunk
+                          for neighbour in edges.get(node, ())
+                          if neighbour not in parents}
+            if allowed is not None and candidates:
+                candidates = allowed(candidates)
+            for node in chunk:
+                if time.monotonic() > deadline:
+                    return PathResult(None, complete=False)
+                for neighbour in edges.get(node, ()):
+                    if neighbour in parents or neighbour not in candidates:
+                        continue
+                    parents[neighbour] = node
+                    if neighbour in others:
+                        return PathResult(_join(
+                            neighbour, forward_parents, backward_parents))
+                    next_frontier.append(neighbour)
+        if frontier is forward:
+            forward, forward_degree = next_frontier, None
+        else:
+            backward, backward_degree = next_frontier, None
+    return PathResult(None)
+
+
+def _join(meeting, forward_parents, backward_parents):
+    path = []
+    node = meeting
+    while node is not None:
+        path.append(node)
+        node = forward_parents[node]
+    path.reverse()
+    node = backward_parents[meeting]
+    while node is not None:
+        path.append(node)
+        node = backward_parents[node]
+    return path
+
@@ -0,0 +1,130 @@
+import random
+import time
+from urllib.parse import urlsplit
+
+PASSWORD = 'StrongPassword123'
+
+# Доли сценариев в смеси запросов по умолчанию
+DEFAULT_WEIGHTS = {'browse': 5, 'profile': 3, 'follow': 1, 'followers': 2}
+
+
+class SocialFlows:
+    """
+    Сценарии пользователя API: при первом запуске регистрация
+    и вход по JWT, дальше случайный по весам сценарий:
+    browse - страницы списка пользователей,
+    profile - профиль и подписки случайного пользователя,
+    follow - подписка и отписка,
+    followers - листание подписчиков по курсору.
+    """
+
+    def __init__(self, weights=None, seed=None, prefix=None):
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        unknown = set(self.weights).difference(DEFAULT_WEIGHTS)
+        if unknown:
+            raise ValueError(f'Unknown scenarios: {", ".join(unknown)}')
+        self.seed = seed if seed is not None else int(time.time())
+        # Уникальные имена для каждого запуска
+        self.prefix = prefix or f'lt{self.seed:x}'
+
+    async def __call__(self, session, number):
+        state = session.state
+        if 'random' not in state:
+            state['random'] = random.Random(self.seed * 1000 + number)
+            state['user_ids'] = []
+            state['user_id'] = None
+            # Без входа сценарии продолжаются и получают 401,
+            # такие ответы попадут в статистику как ошибки
+            await self.register(session, number)
+        names = list(self.weights)
+        flow = state['random'].choices(
+            names, weights=[self.weights[name] for name in names])[0]
+        await getattr(self, flow)(session)
+
+    async def register(self, session, number):
+        username = f'{self.prefix}_{number}'
+        await session.post('POST /api/auth/registration/',
+                           '/api/auth/registration/', {
+                               'username': username,
+                               'email': f'{username}@example.com',
+                               'password1': PASSWORD,
+                               'password2': PASSWORD,
+                           }, expect=(201,))
+        status, content = await session.post(
+            'POST /api/auth/login/', '/api/auth/login/',
+            {'username': username, 'password': PASSWORD})
+        if status == 200:
+            session.headers['Authorization'] = f'JWT {content["token"]}'
+            session.state['user_id'] = content['user']['id']
+
+    def _pick_user(self, session):
+        state = session.state
+        if state['user_ids']:
+            return state['random'].choice(state['user_ids'])
+        return state['user_id']
+
+    async def browse(self, session):
+        state = session.state
+        for page in range(1, state['random'].randint(1, 3) + 1):
+            status, content = await session.get(
+                'GET /api/users/', '/api/users/', {'page': page})
+            if status != 200:
+                return
+            ids = [row['id'] for row in content['results']]
+            state['user_ids'] = (state['user_ids'] + ids)[-500:]
+            if not content['next']:
+                return
+
+    async def profile(self, session):
+        user_id = self._pick_user(session)
+        if user_id is None:
+            return
+        await session.get('GET /api/user/{id}/', f'/api/user/{user_id}/')
+        await session.get('GET /api/user/{id}/following/',
+                          f'/api/user/{user_id}/following/')
+
+    async def follow(self, session):
+        user_id = self._pick_user(session)
+        if user_id in (None, session.state['user_id']):
+            return
+        await session.post('POST /api/user/follow/', '/api/user/follow/',
+                           {'following_user_id': user_id})
+        await session.get('GET /api/user/{id}/followers/',
+                          f'/api/user/{user_id}/followers/')
+        if session.state['random'].random() < 0.5:
+            await session.post('POST /api/user/unfollow/',
+                               '/api/user/unfollow/',
+                               {'unfollowing_user_id': user_id})
+
+    async def followers(self, session, max_pages=5):
+        user_id = self._pick_user(session)
+        if user_id is None:
+            return
+        path = f'/api/user/{user_id}/followers/recent/'
+        for _ in range(max_pages):
+            status, content = await session.get(
+                'GET /api/user/{id}/followers/recent/', path)
+            if status != 200 or not content['next']:
+                return
+            path = next_path(content['next'], session.client.prefix)
+
+
+def next_path(url, prefix=''):
+    """
+    Путь абсолютной ссылки next с курсором. HTTPClient сам добавляет
+    префикс из --url (API за прокси по /backend/), поэтому он убирается.
+    """
+    parts = urlsplit(url)
+    path = parts.path
+    if prefix and path.startswith(prefix + '/'):
+        path = path[len(prefix):]
+    return f'{path}?{parts.query}' if parts.query else path
+
+
+def parse_weights(value):
+    """'browse=5,follow=1' -> {'browse': 5, 'follow': 1}"""
+    weights = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        weights[name.strip()] = float(weight)
+    return weights
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.models import Following
+from users.repository import ShardedFollowRepository, get_shards
+
+
+class Command(BaseCommand):
+    help = 'Копирует подписки из users_following в шарды FOLLOW_SHARDS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--start-id', type=int, default=0,
+                            help='Продолжить с подписки с этим id')
+
+    def handle(self, *args, **options):
+        shards = get_shards()
+        if not shards:
+            raise CommandError('FOLLOW_SHARDS is not set')
+        repository = ShardedFollowRepository(shards)
+        # Запись идемпотентна, команду можно прервать и продолжить
+        last_id = options['start_id']
+        total = 0
+        while True:
+            rows = list(Following.objects.filter(id__gt=last_id)
+                        .order_by('id')
+                        .values_list('id', 'user_id', 'following_user_id',
+                                      'created_at')[:options['batch_size']])
+            if not rows:
+                break
+            repository.follow_many([row[1:] for row in rows])
+            total += len(rows)
+            last_id = rows[-1][0]
+            self.stdout.write(f'Copied {total} edges, last id {last_id}')
+        self.stdout.write(f'Edges copied: {total}')
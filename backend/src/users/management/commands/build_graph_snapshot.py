@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from users.graph import FollowGraphSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Строит снимок графа подписок для воркеров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=settings.GRAPH_SNAPSHOT_PATH,
+                            help='По умолчанию GRAPH_SNAPSHOT_PATH')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Перестраивать снимок каждые N секунд')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not path:
+            raise CommandError('Snapshot path is not set, '
+                               'use --path or GRAPH_SNAPSHOT_PATH')
+        while True:
+            started = time.monotonic()
+            snapshot = FollowGraphSnapshot.build()
+            snapshot.save(path)
+            usage = snapshot.memory_usage()
+            size = usage['following_bytes'] + usage['followers_bytes']
+            self.stdout.write(
+                f'Snapshot saved to {path}: {usage["edges"]} edges, '
+                f'{size / 2 ** 20:.1f} MB, '
+                f'{time.monotonic() - started:.2f} s')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
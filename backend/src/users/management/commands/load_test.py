@@ -0,0 +1,91 @@
+import json
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import LoadRunner
+from users.loadtest import DEFAULT_WEIGHTS, SocialFlows, parse_weights
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест API: регистрация, вход, списки, профили, ' \
+           'подписки. Выводит rps, ошибки и перцентили по эндпоинтам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Адрес запущенного сервера, '
+                                          'по умолчанию запускается '
+                                          'runserver на --port')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--users', type=int, default=10,
+                            help='Число одновременных пользователей')
+        parser.add_argument('--ramp-up', type=float, default=0,
+                            help='За сколько секунд стартуют все '
+                                 'пользователи')
+        parser.add_argument('--duration', type=float, default=30)
+        parser.add_argument('--iterations', type=int,
+                            help='Повторов сценария на пользователя')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--weights',
+                            default=','.join(f'{name}={weight}' for
+                                             name, weight in
+                                             DEFAULT_WEIGHTS.items()),
+                            help='Доли сценариев, например browse=5,follow=1')
+        parser.add_argument('--json', dest='json_path',
+                            help='Сохранить результаты в JSON '
+                                 'для сравнения запусков')
+
+    def handle(self, *args, **options):
+        try:
+            flows = SocialFlows(parse_weights(options['weights']),
+                                seed=options['seed'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        server = None
+        url = options['url']
+        if not url:
+            server = self._start_server(options['port'])
+            url = f'http://127.0.0.1:{options["port"]}'
+        try:
+            stats = LoadRunner(url, flows, users=options['users'],
+                               ramp_up=options['ramp_up'],
+                               duration=options['duration'],
+                               iterations=options['iterations'],
+                               timeout=options['timeout']).run()
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+        self.stdout.write(f'{options["users"]} users, '
+                          f'{stats.elapsed:.1f} s, url {url}')
+        self.stdout.write(stats.report())
+        if options['json_path']:
+            with open(options['json_path'], 'w') as file:
+                json.dump({'users': options['users'],
+                           'elapsed': stats.elapsed,
+                           'endpoints': stats.rows()}, file, indent=2)
+
+    def _start_server(self, port, wait=30):
+        """runserver без автоперезагрузки, ждем, пока откроется порт"""
+        server = subprocess.Popen(
+            [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}',
+             '--noreload'],
+            cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('Server exited, check runserver output')
+            try:
+                socket.create_connection(('127.0.0.1', port), 1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f'Server did not start on port {port}')
@@ -0,0 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef, Q
+
+from users.models import Following
+from users.tasks import purge_following
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Ставит в очередь очистку подписок неактивных пользователей'
+
+    def handle(self, *args, **options):
+        # Продолжение прерванных очисток: у неактивных пользователей
+        # не должно оставаться подписок, пользователи с запрошенным
+        # удалением удаляются, даже если подписок уже нет
+        users = User.objects.filter(is_active=False).filter(
+            Exists(Following.objects.filter(user_id=OuterRef('pk'))) |
+            Exists(Following.objects.filter(
+                following_user_id=OuterRef('pk'))) |
+            Q(deletion_requested_at__isnull=False)
+        ).values_list('pk', 'deletion_requested_at')
+        count = 0
+        for user_id, deletion_requested_at in users.iterator():
+            purge_following.delay(
+                user_id=user_id, delete=deletion_requested_at is not None)
+            count += 1
+        self.stdout.write(f'Users queued: {count}')
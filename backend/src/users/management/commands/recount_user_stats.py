@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users.stats import recount_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики подписок пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = recount_stats(options['batch_size'])
+        self.stdout.write(f'Users recounted: {total}')
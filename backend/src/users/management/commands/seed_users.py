@@ -0,0 +1,215 @@
+import csv
+import io
+import random
+from datetime import timedelta
+from multiprocessing import Pool
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from users.models import Following
+from users.stats import recount_stats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Создает тестовых пользователей и граф подписок между ними'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--avg-following', type=int, default=20,
+                            help='Среднее число подписок пользователя')
+        parser.add_argument('--alpha', type=float, default=1.0,
+                            help='Показатель степенного распределения '
+                                 'популярности')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней до запуска регистрируются '
+                                 'пользователи и появляются подписки')
+        parser.add_argument('--prefix', default='seed_user')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--copy', action='store_true',
+                            help='Загружать данные через COPY (PostgreSQL)')
+
+    def handle(self, *args, **options):
+        if options['copy'] and connection.vendor != 'postgresql':
+            self.stderr.write('COPY is available only for PostgreSQL, '
+                              'falling back to bulk_create')
+            options['copy'] = False
+
+        total = options['users']
+        batch_size = options['batch_size']
+        workers = options['workers']
+        password = make_password('StrongPassword123')
+        timeline = _Timeline(timezone.now(), options['days'], total)
+        ranges = _ranges(total, batch_size)
+        self._run(_create_users, ranges, workers,
+                  context=(options['prefix'], password, timeline,
+                           options['copy']))
+        self.stdout.write(f'Users created: {total}')
+
+        user_ids = _user_ids(options['prefix'], total, batch_size)
+        graph = _FollowingGraph(user_ids, options['avg_following'],
+                                options['alpha'], options['seed'], timeline)
+        created = sum(self._run(_create_following,
+                                _ranges(len(user_ids), batch_size), workers,
+                                context=(graph, options['copy'])))
+        self.stdout.write(f'Following created: {created}')
+        # Подписки загружены без сигналов, счетчики пересчитываются отдельно
+        recount_stats(batch_size)
+
+    @staticmethod
+    def _run(func, ranges, workers, context):
+        if workers <= 1:
+            _init_worker(context)
+            return [func(start, end) for start, end in ranges]
+        # Дочерние процессы не должны использовать соединения родителя
+        connections.close_all()
+        with Pool(workers, initializer=_init_worker,
+                  initargs=(context,)) as pool:
+            return pool.starmap(func, ranges)
+
+
+# Общие данные для пачек, передаются в процесс один раз
+_context = None
+
+
+def _init_worker(context):
+    global _context
+    _context = context
+
+
+def _user_ids(prefix, total, batch_size):
+    """
+    id пользователей по номеру в имени: пачки, созданные параллельно,
+    получают id не по порядку, а от номера зависит граф подписок.
+    Пользователи с таким же префиксом, но другими именами не попадают.
+    """
+    usernames = [f'{prefix}{i}' for i in range(total)]
+    ids = {}
+    for start, end in _ranges(total, batch_size):
+        ids.update(User.objects.filter(username__in=usernames[start:end])
+                   .values_list('username', 'id'))
+    return [ids[username] for username in usernames]
+
+
+def _ranges(total, batch_size):
+    return [(start, min(start + batch_size, total))
+            for start in range(0, total, batch_size)]
+
+
+class _Timeline:
+    """
+    Время регистрации пользователей и подписок: пользователи
+    регистрируются равномерно за days дней до now, подписка появляется
+    в случайный момент после регистрации обоих пользователей.
+    Одинаковое время у всех строк ломало бы сортировку по created_at.
+    """
+
+    def __init__(self, now, days, total):
+        self.now = now
+        self.span = timedelta(days=days)
+        self.total = max(total, 1)
+
+    def joined_at(self, index):
+        return self.now - self.span * (1 - index / self.total)
+
+    def followed_at(self, rnd, index, other_index):
+        joined_at = self.joined_at(max(index, other_index))
+        return joined_at + (self.now - joined_at) * rnd.random()
+
+
+class _FollowingGraph:
+    """
+    Граф подписок со степенным распределением популярности:
+    вероятность подписаться на пользователя с рангом r ~ 1 / r^alpha.
+    Подписки пользователя зависят только от seed и его номера,
+    поэтому результат не зависит от числа процессов.
+    """
+
+    def __init__(self, user_ids, avg_following, alpha, seed, timeline):
+        self.user_ids = user_ids
+        self.avg_following = avg_following
+        self.seed = seed
+        self.timeline = timeline
+        cum_weights, total = [], 0.0
+        for rank in range(1, len(user_ids) + 1):
+            total += 1 / rank ** alpha
+            cum_weights.append(total)
+        self.cum_weights = cum_weights
+
+    def following(self, index):
+        rnd = random.Random(self.seed * 1000003 + index)
+        count = min(int(rnd.expovariate(1 / self.avg_following)),
+                    len(self.user_ids) - 1)
+        targets = set(rnd.choices(range(len(self.user_ids)),
+                                  cum_weights=self.cum_weights, k=count))
+        targets.discard(index)
+        return self.user_ids[index], [
+            (self.user_ids[target],
+             self.timeline.followed_at(rnd, index, target))
+            for target in sorted(targets)]
+
+
+def _create_users(start, end):
+    prefix, password, timeline, use_copy = _context
+    users = []
+    for i in range(start, end):
+        username = f'{prefix}{i}'
+        users.append(User(username=username, name=username,
+                          email=f'{username}@example.com',
+                          password=password,
+                          date_joined=timeline.joined_at(i)))
+    if use_copy:
+        _copy(User, ['username', 'name', 'email', 'password', 'date_joined',
+                     'is_superuser', 'is_staff', 'is_active'], users)
+    else:
+        User.objects.bulk_create(users, ignore_conflicts=True)
+    return len(users)
+
+
+def _create_following(start, end):
+    graph, use_copy = _context
+    rows = []
+    for index in range(start, end):
+        user_id, targets = graph.following(index)
+        rows.extend(Following(user_id=user_id, following_user_id=target,
+                              created_at=created_at)
+                    for target, created_at in targets)
+    if use_copy:
+        _copy(Following, ['user_id', 'following_user_id', 'created_at'],
+              rows)
+    else:
+        Following.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+def _copy(model, fields, objects):
+    """
+    Загрузка пачки через COPY ... FROM STDIN во временную таблицу
+    и INSERT ... ON CONFLICT DO NOTHING, как bulk_create(ignore_conflicts),
+    поэтому повторный запуск не падает на уникальных индексах
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for obj in objects:
+        writer.writerow([getattr(obj, field) for field in fields])
+    buffer.seek(0)
+    table = model._meta.db_table
+    columns = ', '.join(model._meta.get_field(field).column
+                        for field in fields)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TEMP TABLE seed_copy AS '
+                       f'SELECT {columns} FROM {table} WITH NO DATA')
+        cursor.copy_expert(
+            f'COPY seed_copy ({columns}) FROM STDIN WITH (FORMAT csv)',
+            buffer)
+        cursor.execute(f'INSERT INTO {table} ({columns}) '
+                       f'SELECT {columns} FROM seed_copy '
+                       f'ON CONFLICT DO NOTHING')
+        cursor.execute('DROP TABLE seed_copy')
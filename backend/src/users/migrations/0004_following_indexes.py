@@ -0,0 +1,21 @@
+# Generated by Django 3.1.4 on 2026-10-19 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_following'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='following',
+            index=models.Index(fields=['user', '-created_at'], name='following_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='following',
+            index=models.Index(fields=['following_user', '-created_at'], name='followers_user_created_idx'),
+        ),
+    ]
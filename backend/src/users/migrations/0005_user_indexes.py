@@ -0,0 +1,40 @@
+# Generated by Django 3.1.4 on 2026-10-19 12:15
+
+from django.db import migrations, models
+
+
+def postgresql_only(sql):
+    """Выражения с UPPER(...::text) есть только в PostgreSQL"""
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_following_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(is_active=True), fields=['id'], name='user_active_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(is_active=True), fields=['username'], name='user_active_username_idx'),
+        ),
+        # Поиск username__iexact/email__iexact (регистрация через allauth)
+        migrations.RunPython(
+            postgresql_only('CREATE INDEX user_username_upper_idx '
+                            'ON users_user (UPPER(username::text));'),
+            postgresql_only('DROP INDEX user_username_upper_idx;'),
+        ),
+        migrations.RunPython(
+            postgresql_only('CREATE INDEX user_email_upper_idx '
+                            'ON users_user (UPPER(email::text));'),
+            postgresql_only('DROP INDEX user_email_upper_idx;'),
+        ),
+    ]
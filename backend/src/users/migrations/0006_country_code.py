@@ -0,0 +1,58 @@
+# Generated by Django 3.1.4 on 2026-10-19 12:33
+
+from django.db import migrations, models
+import users.countries
+
+BATCH_SIZE = 1000
+
+
+def country_lookup():
+    """Код или название страны (без учета регистра) -> код"""
+    from django_countries.data import COUNTRIES
+    lookup = {}
+    for code, name in COUNTRIES.items():
+        lookup[code.lower()] = code
+        lookup[str(name).lower()] = code
+    return lookup
+
+
+def countries_to_codes(apps, schema_editor):
+    """
+    Приводим сохраненные значения к двухбуквенному коду.
+    Неизвестные значения сбрасываются в NULL.
+    Пользователи обрабатываются пачками по первичному ключу.
+    """
+    User = apps.get_model('users', 'User')
+    lookup = country_lookup()
+    last_pk = 0
+    while True:
+        batch = list(User.objects.filter(pk__gt=last_pk,
+                                         country__isnull=False)
+                     .order_by('pk')
+                     .values_list('pk', 'country')[:BATCH_SIZE])
+        if not batch:
+            return
+        updates = {}
+        for pk, country in batch:
+            code = lookup.get(country.strip().lower())
+            if code != country:
+                updates.setdefault(code, []).append(pk)
+        for code, pks in updates.items():
+            User.objects.filter(pk__in=pks).update(country=code)
+        last_pk = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_user_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(countries_to_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='user',
+            name='country',
+            field=models.CharField(blank=True, max_length=2, null=True, validators=[users.countries.validate_country]),
+        ),
+    ]
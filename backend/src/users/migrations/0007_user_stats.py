@@ -0,0 +1,83 @@
+# Generated by Django 3.1.4 on 2026-10-19 12:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def postgresql_only(sql):
+    """text_pattern_ops и UPPER(...::text) есть только в PostgreSQL"""
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(sql)
+    return run
+
+
+def create_stats(apps, schema_editor):
+    """Заполняем счетчики подписок пачками по первичному ключу"""
+    User = apps.get_model('users', 'User')
+    Following = apps.get_model('users', 'Following')
+    UserStats = apps.get_model('users', 'UserStats')
+
+    def counts(user_ids, field):
+        rows = Following.objects.filter(**{f'{field}__in': user_ids}) \
+            .values(field).annotate(count=models.Count('id')).order_by()
+        return {row[field]: row['count'] for row in rows}
+
+    last_pk = 0
+    while True:
+        user_ids = list(User.objects.filter(pk__gt=last_pk).order_by('pk')
+                        .values_list('pk', flat=True)[:BATCH_SIZE])
+        if not user_ids:
+            return
+        followers = counts(user_ids, 'following_user_id')
+        following = counts(user_ids, 'user_id')
+        UserStats.objects.bulk_create(
+            UserStats(user_id=user_id,
+                      followers_count=followers.get(user_id, 0),
+                      following_count=following.get(user_id, 0))
+            for user_id in user_ids)
+        last_pk = user_ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_country_code'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='users.user')),
+                ('followers_count', models.PositiveIntegerField(default=0)),
+                ('following_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_stats, migrations.RunPython.noop),
+        # Поиск в админке по префиксу: UPPER(...) LIKE 'ABC%'.
+        # Индексы text_pattern_ops подходят и для iexact (=),
+        # поэтому заменяют индексы из 0005_user_indexes
+        migrations.RunPython(
+            postgresql_only(
+                'CREATE INDEX user_username_upper_like_idx '
+                'ON users_user (UPPER(username::text) text_pattern_ops);'
+                'DROP INDEX user_username_upper_idx;'),
+            postgresql_only(
+                'CREATE INDEX user_username_upper_idx '
+                'ON users_user (UPPER(username::text));'
+                'DROP INDEX user_username_upper_like_idx;'),
+        ),
+        migrations.RunPython(
+            postgresql_only(
+                'CREATE INDEX user_email_upper_like_idx '
+                'ON users_user (UPPER(email::text) text_pattern_ops);'
+                'DROP INDEX user_email_upper_idx;'),
+            postgresql_only(
+                'CREATE INDEX user_email_upper_idx '
+                'ON users_user (UPPER(email::text));'
+                'DROP INDEX user_email_upper_like_idx;'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 3.1.4 on 2026-10-19 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_user_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowerEdge',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner_id', models.BigIntegerField()),
+                ('other_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='FollowingEdge',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner_id', models.BigIntegerField()),
+                ('other_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='followingedge',
+            index=models.Index(fields=['owner_id', '-created_at'], name='followingedge_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='followingedge',
+            constraint=models.UniqueConstraint(fields=('owner_id', 'other_id'), name='followingedge_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='followeredge',
+            index=models.Index(fields=['owner_id', '-created_at'], name='followeredge_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='followeredge',
+            constraint=models.UniqueConstraint(fields=('owner_id', 'other_id'), name='followeredge_unique'),
+        ),
+    ]
@@ -1,9 +1,9 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.db.models import F, Q
-from django_countries.data import COUNTRIES
 
 from config import settings
+from users.countries import country_name, validate_country
 
 
 class User(AbstractUser):
@@ -29,15 +29,29 @@ class User(AbstractUser):
     date_of_birth = models.DateField(blank=True, null=True)
     gender = models.CharField(max_length=6, choices=GENDER_CHOICES,
                               null=True, blank=True)
-    country = models.CharField(max_length=30,
-                               choices=sorted(COUNTRIES.items()),
+    # Код страны ISO 3166-1 alpha-2
+    country = models.CharField(max_length=2, validators=[validate_country],
                                null=True, blank=True)
     location = models.CharField(max_length=20, blank=True, null=True)
     site = models.URLField(max_length=100, blank=True, null=True)
+    # Пользователь будет удален после очистки подписок, см. users.tasks
+    deletion_requested_at = models.DateTimeField(null=True, blank=True,
+                                                 editable=False)
 
     USERNAME_FIELD = 'username'
     REQUIRED_FIELDS = ['name']
 
+    class Meta(AbstractUser.Meta):
+        # Индексы UPPER(username) и UPPER(email) для поиска без учета
+        # регистра (iexact и istartswith) создаются в миграции
+        # 0007_user_stats
+        indexes = [
+            models.Index(fields=['id'], condition=Q(is_active=True),
+                         name='user_active_id_idx'),
+            models.Index(fields=['username'], condition=Q(is_active=True),
+                         name='user_active_username_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         is_creating = not self.pk
 
@@ -46,6 +60,9 @@ class User(AbstractUser):
             self.name = self.username
         super().save(*args, **kwargs)
 
+    def get_country_display(self):
+        return country_name(self.country)
+
     def __str__(self):
         return f'@{self.username}'
 
@@ -67,6 +84,60 @@ class Following(models.Model):
             models.CheckConstraint(check=~Q(user_id=F('following_user_id')),
                                    name='self_not_follow')
         ]
+        indexes = [
+            # Вкладки профиля "подписки" и "подписчики" по дате подписки
+            models.Index(fields=['user', '-created_at'],
+                         name='following_user_created_idx'),
+            models.Index(fields=['following_user', '-created_at'],
+                         name='followers_user_created_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user_id} follows {self.following_user_id}'
+
+
+class UserStats(models.Model):
+    """
+    Денормализованные счетчики подписок пользователя.
+    Хранятся отдельно от User, чтобы сохранение профиля
+    не перезаписывало их устаревшими значениями.
+    Обновляются сигналами подписок, см. users.stats
+    """
+    user = models.OneToOneField(User, primary_key=True, related_name='stats',
+                                on_delete=models.CASCADE)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.user_id}: {self.followers_count} followers, ' \
+               f'{self.following_count} following'
+
+
+class FollowEdge(models.Model):
+    """
+    Ребро графа подписок в шарде, см. users.repository.
+    owner_id - ключ шардирования, все ребра пользователя лежат
+    в одной базе. Внешних ключей нет: пользователи в другой базе.
+    """
+    owner_id = models.BigIntegerField()
+    other_id = models.BigIntegerField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        abstract = True
+        constraints = [
+            models.UniqueConstraint(fields=['owner_id', 'other_id'],
+                                    name='%(class)s_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['owner_id', '-created_at'],
+                         name='%(class)s_created_idx'),
+        ]
+
+
+class FollowingEdge(FollowEdge):
+    """Подписки: owner_id подписан на other_id"""
+
+
+class FollowerEdge(FollowEdge):
+    """Зеркальные ребра для подписчиков: other_id подписан на owner_id"""
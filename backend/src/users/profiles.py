@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework import serializers
+
+from users.serializers import ShortUserInfoSerializer, \
+    UserPersonalInfoDetailSerializer
+
+User = get_user_model()
+
+PROFILE_SERIALIZERS = {
+    'short': ShortUserInfoSerializer,
+    'detail': UserPersonalInfoDetailSerializer,
+}
+
+
+def profile_cache_key(kind, user_id):
+    return f'users:profile:{kind}:{user_id}'
+
+
+def get_profiles(user_ids, kind='short', request=None):
+    """
+    Профили пользователей по списку id в порядке запроса.
+    Профили берутся из кэша, недостающие загружаются одним запросом.
+    Возвращает (profiles, missing, inactive).
+    """
+    serializer_class = PROFILE_SERIALIZERS[kind]
+    user_ids = list(dict.fromkeys(user_ids))
+    keys = {user_id: profile_cache_key(kind, user_id) for user_id in user_ids}
+    cached = cache.get_many(keys.values())
+    profiles = {user_id: cached[key] for user_id, key in keys.items()
+                if key in cached}
+
+    inactive = set()
+    misses = [user_id for user_id in user_ids if user_id not in profiles]
+    if misses:
+        fields = serializer_class.Meta.fields
+        users = User.objects.filter(id__in=misses).only('is_active', *fields)
+        active = []
+        for user in users:
+            if user.is_active:
+                active.append(user)
+            else:
+                inactive.add(user.id)
+        # Кэшируем без request: URL файлов относительные
+        data = serializer_class(active, many=True).data
+        loaded = {row['id']: row for row in data}
+        cache.set_many({keys[user_id]: row
+                        for user_id, row in loaded.items()},
+                       getattr(settings, 'USER_PROFILE_CACHE_TIMEOUT', 300))
+        profiles.update(loaded)
+
+    file_fields = [name for name, field in serializer_class().fields.items()
+                   if isinstance(field, serializers.FileField)]
+    results = [_absolute_urls(profiles[user_id], file_fields, request)
+               for user_id in user_ids if user_id in profiles]
+    missing = [user_id for user_id in user_ids
+               if user_id not in profiles and user_id not in inactive]
+    return results, missing, [user_id for user_id in user_ids
+                              if user_id in inactive]
+
+
+def _absolute_urls(profile, file_fields, request):
+    profile = dict(profile)
+    if request is not None:
+        for name in file_fields:
+            if profile.get(name):
+                profile[name] = request.build_absolute_uri(profile[name])
+    return profile
+
+
+def invalidate_profile(sender, instance, changed_fields=None, **kwargs):
+    """
+    Сбрасываем закэшированные профили, в которых есть изменившиеся поля.
+    changed_fields=None - измениться могло что угодно.
+    """
+    changed = None if changed_fields is None else set(changed_fields)
+    cache.delete_many([
+        profile_cache_key(kind, instance.id)
+        for kind, serializer_class in PROFILE_SERIALIZERS.items()
+        # is_active определяет, попадет ли профиль в inactive
+        if changed is None or 'is_active' in changed or
+        changed.intersection(serializer_class.Meta.fields)])
+
+
+def user_saved(sender, instance, created, update_fields=None, raw=False,
+               **kwargs):
+    """
+    Полное сохранение пользователя (админка, set_password).
+    Сохранения отдельных полей (last_login при входе) профиль
+    не меняют, профили и деактивация сообщают об изменениях
+    через users.signals.profile_updated.
+    """
+    if not created and not raw and update_fields is None:
+        invalidate_profile(sender, instance)
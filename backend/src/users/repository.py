@@ -0,0 +1,404 @@
+import heapq
+import struct
+import zlib
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from users.models import Following, FollowerEdge, FollowingEdge, User
+
+_ID = struct.Struct('<q')
+
+
+def shard_index(user_id, count):
+    """
+    Номер шарда пользователя. Хэш не зависит от процесса
+    и версии Python, поэтому его можно считать в любом сервисе.
+    """
+    return zlib.crc32(_ID.pack(user_id)) % count
+
+
+def _delete_without_signals(queryset):
+    """
+    DELETE без выборки строк, pre_delete/post_delete и каскадов.
+    QuerySet._raw_delete - приватный API Django, проверен на 3.1:
+    при обновлении Django проверить, что метод есть и принимает alias.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+def get_shards():
+    return list(getattr(settings, 'FOLLOW_SHARDS', ()))
+
+
+class FollowRepository:
+    """
+    Хранилище ребер графа подписок.
+    По умолчанию таблица users_following основной базы.
+    Списки подписок и подписчиков - строки .values() с id пользователя
+    (following_user_id или user_id) и created_at, здесь сразу
+    с данными активных пользователей, см. attach_users.
+    """
+
+    def follow(self, user_id, following_user_id):
+        """True, если подписка создана"""
+        _, created = Following.objects.get_or_create(
+            user_id=user_id, following_user_id=following_user_id)
+        return created
+
+    def unfollow(self, user_id, following_user_id):
+        """True, если подписка была"""
+        deleted, _ = Following.objects.filter(
+            user_id=user_id, following_user_id=following_user_id).delete()
+        return bool(deleted)
+
+    def purge(self, user_id, limit):
+        """
+        Удаляет до limit подписок пользователя и на пользователя
+        одним DELETE без post_delete на каждую строку.
+        Возвращает пары (user_id, following_user_id) удаленных подписок.
+        """
+        edges = list(Following.objects.filter(
+            Q(user_id=user_id) | Q(following_user_id=user_id))
+            .values_list('pk', 'user_id', 'following_user_id')[:limit])
+        if edges:
+            _delete_without_signals(Following.objects.filter(
+                pk__in=[pk for pk, _, _ in edges]))
+        return [(source, target) for _, source, target in edges]
+
+    def is_following(self, user_id, following_user_id):
+        return Following.objects.filter(
+            user_id=user_id, following_user_id=following_user_id).exists()
+
+    def following(self, user_ids, limit=None):
+        """
+        {user_id: [id, ...]} для пачки пользователей,
+        не больше limit ребер на всю пачку
+        """
+        return self._load(user_ids, 'user_id', 'following_user_id', limit)
+
+    def followers(self, user_ids, limit=None):
+        return self._load(user_ids, 'following_user_id', 'user_id', limit)
+
+    def recent_following(self, user_id, limit):
+        """id подписок пользователя от новых к старым"""
+        return list(Following.objects.filter(user_id=user_id)
+                    .order_by('-created_at')
+                    .values_list('following_user_id', flat=True)[:limit])
+
+    def recent_followers(self, user_id, limit):
+        return list(Following.objects.filter(following_user_id=user_id)
+                    .order_by('-created_at')
+                    .values_list('user_id', flat=True)[:limit])
+
+    def following_list(self, user_id):
+        """Подписки пользователя по username"""
+        return Following.objects.filter(
+            user_id=user_id, following_user__is_active=True).values(
+            'following_user_id', 'created_at',
+            username=F('following_user__username'),
+            name=F('following_user__name'),
+            avatar=F('following_user__avatar')
+        ).order_by('following_user__username')
+
+    def followers_list(self, user_id):
+        """Подписчики пользователя по username"""
+        return self._followers_list(
+            Following.objects.filter(following_user_id=user_id))
+
+    def common_followers(self, user_id, other_user_id):
+        """Подписчики user_id, подписанные и на other_user_id"""
+        return self._followers_list(Following.objects.filter(
+            following_user_id=user_id,
+            user_id__in=Following.objects.filter(
+                following_user_id=other_user_id).values('user_id')))
+
+    @staticmethod
+    def _followers_list(queryset):
+        return queryset.filter(user__is_active=True).values(
+            'user_id', 'created_at', username=F('user__username'),
+            name=F('user__name'), avatar=F('user__avatar')
+        ).order_by('user__username')
+
+    def most_followed(self, limit):
+        """id пользователей с наибольшим числом подписчиков"""
+        rows = Following.objects.values('following_user_id') \
+            .annotate(followers=Count('id')) \
+            .order_by('-followers')[:limit]
+        return [row['following_user_id'] for row in rows]
+
+    def follower_edges(self, user_ids):
+        """
+        Пары (user_id, id подписчика) по возрастанию, итератором:
+        у популярных пользователей подписчиков слишком много для списка
+        """
+        return Following.objects.filter(following_user_id__in=user_ids) \
+            .order_by('following_user_id', 'user_id') \
+            .values_list('following_user_id', 'user_id') \
+            .iterator(chunk_size=10000)
+
+    @staticmethod
+    def _load(user_ids, key_field, value_field, limit=None):
+        edges = defaultdict(list)
+        rows = Following.objects.filter(**{f'{key_field}__in': user_ids}) \
+            .values_list(key_field, value_field)
+        if limit is not None:
+            rows = rows[:limit]
+        for key, value in rows:
+            edges[key].append(value)
+        return edges
+
+
+class ShardedFollowRepository(FollowRepository):
+    """
+    Ребра графа подписок, распределенные по базам-шардам по хэшу user_id.
+    Подписки хранятся в шарде подписчика (FollowingEdge), зеркальные
+    ребра - в шарде того, на кого подписались (FollowerEdge), поэтому
+    списки подписок и подписчиков читаются из одного шарда.
+    Шарды - алиасы DATABASES, таблицы создаются командой
+    migrate --database <alias>, см. users.routers.
+    """
+
+    def __init__(self, shards):
+        if not shards:
+            raise ValueError('At least one shard is required')
+        self.shards = list(shards)
+
+    def shard_for(self, user_id):
+        return self.shards[shard_index(user_id, len(self.shards))]
+
+    def follow(self, user_id, following_user_id):
+        self.follow_many([(user_id, following_user_id, timezone.now())])
+
+    def follow_many(self, edges):
+        """edges - тройки (user_id, following_user_id, created_at)"""
+        forward, backward = defaultdict(list), defaultdict(list)
+        for user_id, following_user_id, created_at in edges:
+            forward[self.shard_for(user_id)].append(FollowingEdge(
+                owner_id=user_id, other_id=following_user_id,
+                created_at=created_at))
+            backward[self.shard_for(following_user_id)].append(FollowerEdge(
+                owner_id=following_user_id, other_id=user_id,
+                created_at=created_at))
+        # Сначала зеркальные ребра: прерванная запись оставит лишнего
+        # подписчика, а не подписку без подписчика. Повтор безопасен.
+        for model, groups in ((FollowerEdge, backward),
+                              (FollowingEdge, forward)):
+            for shard, rows in groups.items():
+                model.objects.using(shard).bulk_create(
+                    rows, ignore_conflicts=True)
+
+    def unfollow(self, user_id, following_user_id):
+        self.unfollow_many([(user_id, following_user_id)])
+
+    def unfollow_many(self, edges):
+        """
+        edges - пары (user_id, following_user_id). Один DELETE на каждого
+        владельца ребер: при очистке пользователя их немного.
+        """
+        forward, backward = defaultdict(list), defaultdict(list)
+        for user_id, following_user_id in edges:
+            forward[user_id].append(following_user_id)
+            backward[following_user_id].append(user_id)
+        for model, groups in ((FollowingEdge, forward),
+                              (FollowerEdge, backward)):
+            for owner_id, other_ids in groups.items():
+                model.objects.using(self.shard_for(owner_id)).filter(
+                    owner_id=owner_id, other_id__in=other_ids).delete()
+
+    def sync(self, pairs):
+        """
+        Приводит ребра пар (user_id, following_user_id) в шардах
+        к состоянию users_following: повтор и устаревшие вызовы
+        дают тот же результат, что и последний.
+        """
+        pairs = set(pairs)
+        if not pairs:
+            return
+        rows = Following.objects.filter(
+            user_id__in={user_id for user_id, _ in pairs},
+            following_user_id__in={target for _, target in pairs}) \
+            .values_list('user_id', 'following_user_id', 'created_at')
+        existing = [row for row in rows if row[:2] in pairs]
+        self.follow_many(existing)
+        self.unfollow_many(pairs - {row[:2] for row in existing})
+
+    def is_following(self, user_id, following_user_id):
+        return FollowingEdge.objects.using(self.shard_for(user_id)).filter(
+            owner_id=user_id, other_id=following_user_id).exists()
+
+    def following(self, user_ids, limit=None):
+        return self._load(FollowingEdge, user_ids, limit)
+
+    def followers(self, user_ids, limit=None):
+        return self._load(FollowerEdge, user_ids, limit)
+
+    def recent_following(self, user_id, limit):
+        return self._recent(FollowingEdge, user_id, limit)
+
+    def recent_followers(self, user_id, limit):
+        return self._recent(FollowerEdge, user_id, limit)
+
+    def following_list(self, user_id):
+        """
+        Ребра без данных пользователей от новых к старым: пользователи
+        в другой базе, сортировка по username потребовала бы читать
+        весь список, а порядок по created_at берется из индекса
+        """
+        return FollowingEdge.objects.using(self.shard_for(user_id)).filter(
+            owner_id=user_id).values(
+            'created_at', following_user_id=F('other_id')
+        ).order_by('-created_at')
+
+    def followers_list(self, user_id):
+        """Подписчики от новых к старым, см. following_list"""
+        return FollowerEdge.objects.using(self.shard_for(user_id)).filter(
+            owner_id=user_id).values(
+            'created_at', user_id=F('other_id')).order_by('-created_at')
+
+    def common_followers(self, user_id, other_user_id, chunk_size=1000):
+        """
+        Подписчики лежат в разных шардах, поэтому читаются подписчики
+        пользователя, у которого их меньше, и пачками по chunk_size
+        проверяются в шарде другого. Результат по возрастанию id.
+        """
+        counts = {owner_id: FollowerEdge.objects.using(
+            self.shard_for(owner_id)).filter(owner_id=owner_id).count()
+            for owner_id in (user_id, other_user_id)}
+        smaller, larger = sorted((user_id, other_user_id), key=counts.get)
+        followers = FollowerEdge.objects.using(self.shard_for(smaller)) \
+            .filter(owner_id=smaller).order_by('other_id') \
+            .values_list('other_id', flat=True).iterator(chunk_size)
+        common = []
+        while True:
+            chunk = list(islice(followers, chunk_size))
+            if not chunk:
+                break
+            common.extend(sorted(
+                FollowerEdge.objects.using(self.shard_for(larger))
+                .filter(owner_id=larger, other_id__in=chunk)
+                .values_list('other_id', flat=True)))
+        return [{'user_id': follower_id} for follower_id in common]
+
+    def follower_edges(self, user_ids):
+        """Слияние отсортированных выборок всех шардов"""
+        groups = defaultdict(list)
+        for user_id in user_ids:
+            groups[self.shard_for(user_id)].append(user_id)
+        return heapq.merge(*[
+            FollowerEdge.objects.using(shard).filter(owner_id__in=ids)
+            .order_by('owner_id', 'other_id')
+            .values_list('owner_id', 'other_id').iterator(chunk_size=10000)
+            for shard, ids in groups.items()])
+
+    def _recent(self, model, user_id, limit):
+        return list(model.objects.using(self.shard_for(user_id))
+                    .filter(owner_id=user_id).order_by('-created_at')
+                    .values_list('other_id', flat=True)[:limit])
+
+    def _load(self, model, user_ids, limit=None):
+        """
+        Один IN запрос на каждый шард, в котором есть пользователи,
+        с limit шарды читаются, пока не набрано limit ребер
+        """
+        groups = defaultdict(list)
+        for user_id in user_ids:
+            groups[self.shard_for(user_id)].append(user_id)
+        edges = defaultdict(list)
+        loaded = 0
+        for shard, ids in groups.items():
+            rows = model.objects.using(shard).filter(owner_id__in=ids) \
+                .values_list('owner_id', 'other_id')
+            if limit is not None:
+                if loaded >= limit:
+                    break
+                rows = rows[:limit - loaded]
+            for owner_id, other_id in rows:
+                edges[owner_id].append(other_id)
+                loaded += 1
+        return edges
+
+
+class ShardReadFollowRepository(FollowRepository):
+    """
+    Подписки пишутся в users_following, которая остается источником
+    данных, а читаются из шардов. Шарды догоняют запись через задачу
+    users.tasks.sync_follow_shards.
+    Списки подписок и подписчиков в этом режиме идут от новых к старым,
+    а не по username, см. ShardedFollowRepository.following_list.
+    """
+
+    def __init__(self, shards):
+        self.shards = ShardedFollowRepository(shards)
+
+    def is_following(self, user_id, following_user_id):
+        return self.shards.is_following(user_id, following_user_id)
+
+    def following(self, user_ids, limit=None):
+        return self.shards.following(user_ids, limit)
+
+    def followers(self, user_ids, limit=None):
+        return self.shards.followers(user_ids, limit)
+
+    def recent_following(self, user_id, limit):
+        return self.shards.recent_following(user_id, limit)
+
+    def recent_followers(self, user_id, limit):
+        return self.shards.recent_followers(user_id, limit)
+
+    def following_list(self, user_id):
+        return self.shards.following_list(user_id)
+
+    def followers_list(self, user_id):
+        return self.shards.followers_list(user_id)
+
+    def common_followers(self, user_id, other_user_id):
+        return self.shards.common_followers(user_id, other_user_id)
+
+    def follower_edges(self, user_ids):
+        return self.shards.follower_edges(user_ids)
+
+
+def get_follow_repository():
+    """
+    Хранилище графа подписок для чтения и записи.
+    Шарды используются для чтения только с FOLLOW_SHARDS_READ:
+    сначала включается запись в шарды и выполняется
+    backfill_follow_shards, затем переключается чтение.
+    """
+    shards = get_shards()
+    if shards and getattr(settings, 'FOLLOW_SHARDS_READ', False):
+        return ShardReadFollowRepository(shards)
+    return FollowRepository()
+
+
+def _row_user_id(row):
+    if 'following_user_id' in row:
+        return row['following_user_id']
+    return row['user_id']
+
+
+def attach_users(rows):
+    """
+    Данные пользователей для строк списков, прочитанных из шардов.
+    Неактивные пользователи убираются, как и в выборке из основной базы.
+    """
+    missing = {_row_user_id(row) for row in rows if 'username' not in row}
+    if not missing:
+        return rows
+    users = {user['id']: user for user in User.objects.filter(
+        id__in=missing, is_active=True).values(
+        'id', 'username', 'name', 'avatar')}
+    result = []
+    for row in rows:
+        if 'username' not in row:
+            user = users.get(_row_user_id(row))
+            if user is None:
+                continue
+            row = dict(row, username=user['username'], name=user['name'],
+                       avatar=user['avatar'])
+        result.append(row)
+    return result
@@ -0,0 +1,21 @@
+from django.db import DEFAULT_DB_ALIAS
+
+from users.repository import get_shards
+
+EDGE_MODELS = {'followingedge', 'followeredge'}
+
+
+class FollowShardRouter:
+    """
+    Таблицы ребер графа подписок создаются только в базах FOLLOW_SHARDS,
+    в шардах не создается ничего, кроме них.
+    Запросы к шардам явно указывают базу, см. users.repository
+    """
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        shards = get_shards()
+        if app_label == 'users' and model_name in EDGE_MODELS:
+            return db in shards
+        if db in shards and db != DEFAULT_DB_ALIAS:
+            return False
+        return None
@@ -2,9 +2,13 @@ from django.contrib.auth import get_user_model
 from django.db import transaction
 from rest_framework import serializers
 from rest_auth.serializers import LoginSerializer as RestAuthLoginSerializer
+from rest_framework.exceptions import NotFound
 from rest_framework.generics import get_object_or_404
 
+from core.serializers import FastListSerializer, UpdateChangedFieldsMixin
 from users.models import Following
+from users.repository import get_follow_repository
+from users.signals import profile_updated
 
 User = get_user_model()
 
@@ -14,7 +18,15 @@ class UserLoginSerializer(RestAuthLoginSerializer):
     email = None
 
 
-class UserDetailSerializer(serializers.ModelSerializer):
+class ProfileUpdateMixin(UpdateChangedFieldsMixin):
+    """Сохраняем только измененные поля и сообщаем, какие поля изменились"""
+
+    def fields_changed(self, instance, changed_fields):
+        profile_updated.send(sender=instance.__class__, instance=instance,
+                             changed_fields=changed_fields)
+
+
+class UserDetailSerializer(ProfileUpdateMixin, serializers.ModelSerializer):
     """Личные данные пользователя"""
 
     class Meta:
@@ -23,7 +35,8 @@ class UserDetailSerializer(serializers.ModelSerializer):
                   'phone_number', 'date_of_birth', 'gender', 'country', ]
 
 
-class UserPersonalInfoDetailSerializer(serializers.ModelSerializer):
+class UserPersonalInfoDetailSerializer(ProfileUpdateMixin,
+                                       serializers.ModelSerializer):
     """Персональная информация для отображения в профиле пользователя"""
 
     class Meta:
@@ -40,6 +53,7 @@ class ShortUserInfoSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'username', 'name', 'avatar']
         read_only_fields = ['id', 'username', 'name', 'avatar']
+        list_serializer_class = FastListSerializer
 
 
 class UserFollowingListSerializer(ShortUserInfoSerializer):
@@ -64,11 +78,14 @@ class FollowSerializer(serializers.ModelSerializer):
     def save(self):
         user = self.context['request'].user
         following_user_id = self.validated_data['following_user_id']
-        following_user_obj = get_object_or_404(User, id=following_user_id)
+        # На неактивных пользователей подписаться нельзя: их подписки
+        # удаляются в фоне, см. users.tasks
+        following_user_obj = get_object_or_404(User, id=following_user_id,
+                                               is_active=True)
         if user == following_user_obj:
             return
-        following = Following.objects.get_or_create(
-            user=user, following_user=following_user_obj)
+        following = get_follow_repository().follow(user.id,
+                                                   following_user_obj.id)
         # todo: add signal that user start following
         return following
 
@@ -86,7 +103,9 @@ class UnfollowSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         unfollowing_user_id = self.validated_data['following_user_id']
         unfollowing_user_obj = get_object_or_404(User, id=unfollowing_user_id)
-        unfollowing = get_object_or_404(
-            Following, user=user, following_user=unfollowing_user_obj).delete()
+        unfollowing = get_follow_repository().unfollow(
+            user.id, unfollowing_user_obj.id)
+        if not unfollowing:
+            raise NotFound()
         # todo: add signal that user unfollowing
         return unfollowing
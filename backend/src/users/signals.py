@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+# Профиль пользователя обновлен, аргументы: instance, changed_fields
+profile_updated = Signal()
+
+# Пачка подписок удалена при очистке неактивного пользователя
+# без сигналов post_delete для каждой строки, аргументы: user_id,
+# affected_user_ids, edges - пары (user_id, following_user_id)
+following_removed = Signal()
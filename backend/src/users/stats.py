@@ -0,0 +1,90 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db.models import Case, Count, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+
+from users.models import Following, UserStats
+
+User = get_user_model()
+
+
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user_id=instance.id)
+
+
+def count_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        _add(instance, 1)
+
+
+def count_unfollow(sender, instance, **kwargs):
+    _add(instance, -1)
+
+
+def _add(following, delta):
+    # Счетчики не уходят в минус, если строки еще не пересчитаны
+    UserStats.objects.filter(user_id=following.user_id).update(
+        following_count=Greatest(F('following_count') + delta, 0))
+    UserStats.objects.filter(user_id=following.following_user_id).update(
+        followers_count=Greatest(F('followers_count') + delta, 0))
+
+
+def count_removed(sender, edges, **kwargs):
+    """
+    Пачка удаленных подписок (users.signals.following_removed):
+    счетчики всех затронутых пользователей обновляются одним UPDATE
+    """
+    if not edges:
+        return
+    following = Counter(user_id for user_id, _ in edges)
+    followers = Counter(following_user_id for _, following_user_id in edges)
+    UserStats.objects.filter(user_id__in=set(following) | set(followers)) \
+        .update(following_count=_subtract('following_count', following),
+                followers_count=_subtract('followers_count', followers))
+
+
+def _subtract(field, deltas):
+    if not deltas:
+        return F(field)
+    delta = Case(*[When(user_id=user_id, then=Value(count))
+                   for user_id, count in deltas.items()],
+                 default=Value(0), output_field=IntegerField())
+    return Greatest(F(field) - delta, 0)
+
+
+def recount_stats(batch_size=1000):
+    """
+    Пересчитываем счетчики всех пользователей пачками по первичному ключу.
+    Нужен после массовой загрузки подписок в обход сигналов
+    (seed_users, COPY). Возвращает число обработанных пользователей.
+    """
+    last_pk = 0
+    total = 0
+    while True:
+        user_ids = list(User.objects.filter(pk__gt=last_pk).order_by('pk')
+                        .values_list('pk', flat=True)[:batch_size])
+        if not user_ids:
+            return total
+        followers = _counts(user_ids, 'following_user_id')
+        following = _counts(user_ids, 'user_id')
+        stats = [UserStats(user_id=user_id,
+                           followers_count=followers.get(user_id, 0),
+                           following_count=following.get(user_id, 0))
+                 for user_id in user_ids]
+        existing = set(UserStats.objects.filter(user_id__in=user_ids)
+                       .values_list('user_id', flat=True))
+        UserStats.objects.bulk_create(
+            [row for row in stats if row.user_id not in existing])
+        UserStats.objects.bulk_update(
+            [row for row in stats if row.user_id in existing],
+            ['followers_count', 'following_count'])
+        total += len(user_ids)
+        last_pk = user_ids[-1]
+
+
+def _counts(user_ids, field):
+    rows = Following.objects.filter(**{f'{field}__in': user_ids}) \
+        .values(field).annotate(count=Count('id')).order_by()
+    return {row[field]: row['count'] for row in rows}
@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from core.tasks import task
+from users.models import Following
+from users.repository import ShardedFollowRepository, \
+    get_follow_repository, get_shards
+from users.signals import following_removed, profile_updated
+
+User = get_user_model()
+
+
+def deactivate_user(user, delete=False):
+    """
+    Пользователь сразу становится неактивным, подписки удаляются
+    в фоне пачками, с delete=True после них удаляется и сам пользователь.
+    Намерение удалить сохраняется в deletion_requested_at, поэтому
+    прерванную очистку продолжит manage.py purge_inactive_following.
+    """
+    with transaction.atomic():
+        update_fields = []
+        if user.is_active:
+            user.is_active = False
+            update_fields.append('is_active')
+        if delete and user.deletion_requested_at is None:
+            user.deletion_requested_at = timezone.now()
+            update_fields.append('deletion_requested_at')
+        if update_fields:
+            user.save(update_fields=update_fields)
+        if 'is_active' in update_fields:
+            profile_updated.send(sender=user.__class__, instance=user,
+                                 changed_fields=['is_active'])
+        purge_following.delay(user_id=user.id, delete=delete)
+
+
+@task(max_retries=5, retry_delay=30)
+def purge_following(user_id, delete=False):
+    """
+    Удаляет одну пачку подписок неактивного пользователя и ставит
+    себя в очередь снова через FOLLOWING_PURGE_INTERVAL секунд,
+    пока подписки не закончатся. Состояние хранится только в базе,
+    поэтому задачу можно прервать и запустить заново.
+    """
+    row = User.objects.filter(pk=user_id) \
+        .values_list('is_active', 'deletion_requested_at').first()
+    if row is None or row[0]:
+        # Пользователь уже удален или снова активен
+        return
+    delete = delete or row[1] is not None
+    batch_size = getattr(settings, 'FOLLOWING_PURGE_BATCH_SIZE', 1000)
+    with transaction.atomic():
+        # Одним DELETE без post_delete на каждую строку: счетчики,
+        # кэши и снимок графа обновляются по following_removed
+        edges = get_follow_repository().purge(user_id, batch_size)
+        if edges:
+            affected = {other for source, target in edges
+                        for other in (source, target) if other != user_id}
+            following_removed.send(
+                sender=Following, user_id=user_id,
+                affected_user_ids=sorted(affected), edges=edges)
+    if len(edges) == batch_size:
+        purge_following.schedule(
+            getattr(settings, 'FOLLOWING_PURGE_INTERVAL', 1),
+            user_id=user_id, delete=delete)
+    elif delete:
+        User.objects.filter(pk=user_id, is_active=False).delete()
+
+
+@task(max_retries=5, retry_delay=30, batch_size=100)
+def sync_follow_shards(payloads):
+    """
+    Копия подписок в шардах FOLLOW_SHARDS. Задача сверяет ребра
+    с users_following, поэтому повторы после ошибок шарда
+    и склеенные очередью одинаковые задачи безопасны.
+    """
+    shards = get_shards()
+    if shards:
+        ShardedFollowRepository(shards).sync(
+            [(payload['user_id'], payload['following_user_id'])
+             for payload in payloads])
+
+
+def mirror_follow(sender, instance, created, raw=False, **kwargs):
+    """Пока источник данных users_following, копируем ребра в шарды"""
+    if created and not raw and get_shards():
+        sync_follow_shards.delay(
+            user_id=instance.user_id,
+            following_user_id=instance.following_user_id)
+
+
+def mirror_unfollow(sender, instance, **kwargs):
+    if get_shards():
+        sync_follow_shards.delay(
+            user_id=instance.user_id,
+            following_user_id=instance.following_user_id)
+
+
+def mirror_removed(sender, edges, **kwargs):
+    """Пачка подписок, удаленная очисткой неактивного пользователя"""
+    if get_shards():
+        sync_follow_shards.delay_many(
+            [{'user_id': user_id, 'following_user_id': following_user_id}
+             for user_id, following_user_id in edges])
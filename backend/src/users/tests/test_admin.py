@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.models import Following, UserStats
+from users.stats import recount_stats
+
+User = get_user_model()
+
+
+class UserStatsTestCase(TestCase):
+    """Денормализованные счетчики подписок"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create(username=f'test_user{i}',
+                                         email=f'test_user{i}@gmail.com')
+                     for i in range(3)]
+
+    def stats(self, user):
+        stats = UserStats.objects.get(user=user)
+        return stats.followers_count, stats.following_count
+
+    def test_created_with_user(self):
+        self.assertEqual((0, 0), self.stats(self.users[0]))
+
+    def test_follow_and_unfollow(self):
+        Following.objects.create(user=self.users[0],
+                                 following_user=self.users[1])
+        Following.objects.create(user=self.users[2],
+                                 following_user=self.users[1])
+        self.assertEqual((0, 1), self.stats(self.users[0]))
+        self.assertEqual((2, 0), self.stats(self.users[1]))
+
+        Following.objects.filter(user=self.users[2]).delete()
+        self.assertEqual((1, 0), self.stats(self.users[1]))
+        self.assertEqual((0, 0), self.stats(self.users[2]))
+
+    def test_recount(self):
+        Following.objects.bulk_create([
+            Following(user=self.users[0], following_user=self.users[1]),
+            Following(user=self.users[0], following_user=self.users[2]),
+        ])
+        UserStats.objects.filter(user=self.users[2]).delete()
+        self.assertEqual(3, recount_stats(batch_size=2))
+        self.assertEqual((0, 2), self.stats(self.users[0]))
+        self.assertEqual((1, 0), self.stats(self.users[1]))
+        self.assertEqual((1, 0), self.stats(self.users[2]))
+
+
+class UserAdminTestCase(TestCase):
+    """Список пользователей в админке"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@gmail.com', password='password')
+        cls.users = [User.objects.create(username=f'test_user{i}',
+                                         email=f'user{i}@gmail.com')
+                     for i in range(12)]
+        for user in cls.users[1:]:
+            Following.objects.create(user=user, following_user=cls.users[0])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:users_user_changelist')
+
+    def test_changelist_without_count_and_per_row_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(200, response.status_code)
+        self.assertContains(response, 'test_user0')
+        sql = [query['sql'] for query in queries]
+        # Полный COUNT(*) не нужен при show_full_result_count = False
+        self.assertEqual(1, sum('COUNT(*)' in query for query in sql))
+        # Пользователь сессии и страница списка одним запросом
+        user_queries = [query for query in sql
+                        if query.startswith('SELECT "users_user"."id"')]
+        self.assertEqual(2, len(user_queries))
+        self.assertIn('users_userstats', user_queries[-1])
+        self.assertNotIn('"users_user"."description"', user_queries[-1])
+
+    def test_followers_count_column(self):
+        response = self.client.get(self.url, {'q': 'test_user0'})
+        self.assertContains(response, 'test_user0')
+        self.assertNotContains(response, 'test_user1<')
+        self.assertContains(response, '<td class="field-followers_count">'
+                                      '11</td>', html=False)
+
+    def test_prefix_search(self):
+        response = self.client.get(self.url, {'q': 'USER1'})
+        self.assertContains(response, 'user1@gmail.com')
+        self.assertContains(response, 'user10@gmail.com')
+        self.assertNotContains(response, 'user2@gmail.com')
+        # Поиск только по началу строки
+        response = self.client.get(self.url, {'q': 'er1'})
+        self.assertNotContains(response, 'user1@gmail.com')
+
+    def test_change_view_shows_counts(self):
+        url = reverse('admin:users_user_change', args=(self.users[0].pk,))
+        response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        self.assertContains(response, 'Followers count')
@@ -1,13 +1,16 @@
 import json
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from datetime import date
 from rest_framework import status
 from rest_framework.reverse import reverse
 from rest_framework.test import APITestCase
 
 from users.models import Following
+from users.signals import profile_updated
 from users.serializers import UserPersonalInfoDetailSerializer, \
     UserDetailSerializer
 
@@ -190,6 +193,16 @@ class UserEditTestCase(APITestCase):
         self.user_info['username'] = fields_for_edit['username']
         self.assertEqual(self.user_info, response.data)
 
+    def test_patch_failure_user_data_for_edit_unknown_country(self):
+        """Страна принимается только в виде кода ISO 3166-1"""
+        for country in ('XX', 'Russia', 'ru'):
+            response = self.client.patch(USER_URL,
+                                         json.dumps({'country': country}),
+                                         content_type='application/json')
+            self.assertEqual(status.HTTP_400_BAD_REQUEST,
+                             response.status_code)
+            self.assertIn('country', response.data)
+
     def test_patch_success_user_data_for_edit_not_logged_in(self):
         """Ошибка обновления данных пользователя,
         пользователь не авторизован"""
@@ -303,6 +316,40 @@ class UserPersonalInfoDetailTestCase(APITestCase):
         self.personal_info['description'] = fields_for_edit['description']
         self.assertEqual(self.personal_info, response.data)
 
+    def test_patch_personal_info_updates_only_changed_fields(self):
+        """В UPDATE попадают только измененные поля"""
+        changed = []
+        profile_updated.connect(
+            lambda changed_fields, **kwargs: changed.append(changed_fields),
+            sender=User, weak=False, dispatch_uid='test_changed_fields')
+        self.addCleanup(profile_updated.disconnect, sender=User,
+                        dispatch_uid='test_changed_fields')
+        fields_for_edit = {'description': 'New test user description',
+                           'location': self.user_data['location']}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.personal_info_url,
+                                         json.dumps(fields_for_edit),
+                                         content_type='application/json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        updates = [query['sql'] for query in queries
+                   if query['sql'].startswith('UPDATE "users_user"')]
+        self.assertEqual(1, len(updates))
+        self.assertIn('"description"', updates[0])
+        self.assertNotIn('"location"', updates[0])
+        self.assertNotIn('"password"', updates[0])
+        self.assertEqual([['description']], changed)
+
+    def test_patch_personal_info_without_changes_skips_write(self):
+        """Если данные не изменились, запись в базу не выполняется"""
+        fields_for_edit = {'description': self.user_data['description']}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.personal_info_url,
+                                         json.dumps(fields_for_edit),
+                                         content_type='application/json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertFalse([query for query in queries
+                          if query['sql'].startswith('UPDATE "users_user"')])
+
     def test_patch_failure_personal_info_username_name_not_changed(self):
         """Успешное обновление данных пользователя"""
         fields_for_edit = {'username': 'new_test_user_username',
@@ -520,3 +567,45 @@ class UserListFollowingFollowsTestCase(APITestCase):
         responce = self.client.get(reverse('user-info-followers',
                                            args=(self.user1.id,)))
         self.assertEqual(len(self.user_list), responce.data['count'])
+
+
+class UserProfileRecentFollowingTestCase(APITestCase):
+    """Вкладки профиля с подписками от новых к старым"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='test_user',
+                                        email='test_user@gmail.com')
+        self.other_users = [
+            User.objects.create(username=f'test_user{i}',
+                                email=f'test_user{i}@gmail.com')
+            for i in range(1, 4)
+        ]
+        for other_user in self.other_users:
+            Following.objects.create(user=self.user,
+                                     following_user=other_user)
+            Following.objects.create(user=other_user,
+                                     following_user=self.user)
+        self.client.force_authenticate(self.user)
+
+    def test_success_get_recent_following(self):
+        """Подписки отсортированы от новых к старым, без count"""
+        response = self.client.get(
+            reverse('user-info-following-recent', args=(self.user.id,)))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertNotIn('count', response.data)
+        self.assertEqual([user.id for user in reversed(self.other_users)],
+                         [row['id'] for row in response.data['results']])
+
+    def test_success_get_recent_followers_by_cursor(self):
+        """Подписчики постранично по курсору"""
+        url = reverse('user-info-followers-recent', args=(self.user.id,))
+        response = self.client.get(url, {'page_size': 2})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        ids = [row['id'] for row in response.data['results']]
+        self.assertEqual(2, len(ids))
+
+        response = self.client.get(response.data['next'])
+        ids += [row['id'] for row in response.data['results']]
+        self.assertIsNone(response.data['next'])
+        self.assertEqual([user.id for user in reversed(self.other_users)],
+                         ids)
@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+
+from users.models import Following
+
+User = get_user_model()
+
+
+def seed(**options):
+    call_command('seed_users', stdout=StringIO(), stderr=StringIO(),
+                 **options)
+    return set(Following.objects.values_list(
+        'user__username', 'following_user__username'))
+
+
+class SeedUsersCommandTestCase(TestCase):
+    """Генерация тестовых данных"""
+
+    def seed(self, **options):
+        return seed(**options)
+
+    def test_seed_users_and_following(self):
+        edges = self.seed(users=50, avg_following=5, batch_size=7)
+        self.assertEqual(50, User.objects.filter(
+            username__startswith='seed_user').count())
+        self.assertTrue(edges)
+        self.assertFalse(any(user == target for user, target in edges))
+
+    def test_seed_is_deterministic(self):
+        """Один и тот же seed дает один и тот же граф подписок"""
+        edges = self.seed(users=40, avg_following=5, seed=3)
+        User.objects.all().delete()
+        self.assertEqual(edges, self.seed(users=40, avg_following=5, seed=3,
+                                          batch_size=9))
+        User.objects.all().delete()
+        self.assertNotEqual(edges, self.seed(users=40, avg_following=5,
+                                             seed=4))
+
+    def test_other_users_with_prefix_ignored(self):
+        """Чужие пользователи с тем же префиксом не сдвигают номера"""
+        edges = self.seed(users=30, avg_following=5)
+        User.objects.all().delete()
+        User.objects.create(username='seed_user_admin',
+                            email='seed_user_admin@example.com')
+        self.assertEqual(edges, self.seed(users=30, avg_following=5))
+
+    def test_seed_with_copy(self):
+        edges = self.seed(users=20, avg_following=3, copy=True)
+        self.assertEqual(20, User.objects.count())
+        self.assertEqual(len(edges), Following.objects.count())
+        user = User.objects.get(username='seed_user0')
+        self.assertTrue(user.check_password('StrongPassword123'))
+
+    def test_seed_with_copy_is_idempotent(self):
+        edges = self.seed(users=20, avg_following=3, copy=True)
+        self.assertEqual(edges, self.seed(users=20, avg_following=3,
+                                          copy=True))
+        self.assertEqual(20, User.objects.count())
+
+    def test_timestamps_are_spread(self):
+        self.seed(users=30, avg_following=5, days=10)
+        joined = list(User.objects.order_by('id')
+                      .values_list('date_joined', flat=True))
+        self.assertEqual(len(joined), len(set(joined)))
+        self.assertEqual(joined, sorted(joined))
+        rows = Following.objects.values_list(
+            'created_at', 'user__date_joined', 'following_user__date_joined')
+        self.assertEqual(len(rows), len({row[0] for row in rows}))
+        for created_at, *date_joined in rows:
+            self.assertGreaterEqual(created_at, max(date_joined))
+
+
+class SeedUsersWorkersTestCase(TransactionTestCase):
+    """Пачки в нескольких процессах создают те же подписки"""
+
+    def test_same_graph_with_workers(self):
+        edges = seed(users=60, avg_following=5, batch_size=5)
+        User.objects.all().delete()
+        self.assertEqual(edges, seed(users=60, avg_following=5,
+                                     batch_size=5, workers=4))
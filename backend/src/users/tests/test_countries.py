@@ -0,0 +1,56 @@
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase
+
+from users.countries import country_codes, country_name, validate_country
+
+User = get_user_model()
+migration = import_module('users.migrations.0006_country_code')
+
+
+class CountryCodeTestCase(SimpleTestCase):
+    """Справочник стран"""
+
+    def test_validate_country(self):
+        validate_country('RU')
+        for value in ('XX', 'ru', 'Russia', ''):
+            with self.assertRaises(ValidationError):
+                validate_country(value)
+
+    def test_country_codes_cached(self):
+        self.assertIs(country_codes(), country_codes())
+        self.assertIsInstance(country_codes(), frozenset)
+        self.assertTrue(all(len(code) == 2 for code in country_codes()))
+
+    def test_country_display(self):
+        self.assertEqual('France', str(country_name('FR')))
+        self.assertEqual('France', str(User(country='FR')
+                                       .get_country_display()))
+        self.assertIsNone(User().get_country_display())
+
+
+class CountryDataMigrationTestCase(TestCase):
+    """Перевод сохраненных стран в коды"""
+
+    def test_country_lookup(self):
+        lookup = migration.country_lookup()
+        self.assertEqual('RU', lookup['ru'])
+        self.assertEqual('RU', lookup['russian federation'])
+
+    def test_countries_to_codes(self):
+        values = {'code': 'RU', 'lower': 'de', 'mixed': 'Fr',
+                  'unknown': 'ZZ', 'empty': None}
+        for username, country in values.items():
+            User.objects.create(username=username, email=f'{username}@a.ru',
+                                country=country)
+
+        with mock.patch.object(migration, 'BATCH_SIZE', 2):
+            migration.countries_to_codes(apps, None)
+
+        countries = dict(User.objects.values_list('username', 'country'))
+        self.assertEqual({'code': 'RU', 'lower': 'DE', 'mixed': 'FR',
+                          'unknown': None, 'empty': None}, countries)
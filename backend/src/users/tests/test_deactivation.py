@@ -0,0 +1,162 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from core.models import Task
+from core.tasks import run_pending
+from users.models import Following, UserStats
+from users.signals import following_removed
+from users.tasks import deactivate_user, purge_following
+
+User = get_user_model()
+
+
+@override_settings(FOLLOWING_PURGE_BATCH_SIZE=2)
+class UserDeactivationTestCase(TransactionTestCase):
+    """Удаление пользователя и его подписок пачками в фоне"""
+
+    def setUp(self):
+        self.user, *self.others = [
+            User.objects.create(username=f'test_user{i}',
+                                email=f'test_user{i}@gmail.com')
+            for i in range(5)]
+        for other in self.others:
+            Following.objects.create(user=other, following_user=self.user)
+        for other in self.others[:3]:
+            Following.objects.create(user=self.user, following_user=other)
+        Following.objects.create(user=self.others[0],
+                                 following_user=self.others[1])
+
+    def user_edges(self):
+        return Following.objects.filter(user=self.user).count() + \
+            Following.objects.filter(following_user=self.user).count()
+
+    def run_tasks(self):
+        """Выполняем задачи, не дожидаясь паузы между пачками"""
+        while Task.objects.filter(status=Task.PENDING).exists():
+            Task.objects.update(run_at=timezone.now())
+            run_pending()
+
+    def test_deactivate_and_delete(self):
+        batches = []
+        following_removed.connect(
+            lambda affected_user_ids, **kwargs: batches.append(
+                affected_user_ids),
+            weak=False, dispatch_uid='test_following_removed')
+        self.addCleanup(following_removed.disconnect,
+                        dispatch_uid='test_following_removed')
+
+        deactivate_user(self.user, delete=True)
+        self.assertFalse(User.objects.get(pk=self.user.pk).is_active)
+        self.assertEqual(7, self.user_edges())
+
+        run_pending()
+        self.assertEqual(5, self.user_edges())
+        # Следующая пачка отложена на FOLLOWING_PURGE_INTERVAL
+        self.assertGreater(Task.objects.get().run_at, timezone.now())
+
+        self.run_tasks()
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(1, Following.objects.count())
+        self.assertEqual(4, len(batches))
+        self.assertTrue(all(len(batch) <= 2 for batch in batches))
+
+    def test_purge_batch_updates_stats_at_once(self):
+        """Счетчики пачки обновляются одним UPDATE, а не на каждую строку"""
+        deactivate_user(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            run_pending()
+        updates = [query for query in queries if query['sql'].startswith(
+            'UPDATE "users_userstats"')]
+        self.assertEqual(1, len(updates))
+        self.assertFalse([query for query in queries if query['sql']
+                          .startswith('DELETE FROM "users_following"')
+                          and 'IN' not in query['sql']])
+
+        self.run_tasks()
+        for user in [self.user, *self.others]:
+            stats = UserStats.objects.get(user=user)
+            self.assertEqual(
+                Following.objects.filter(following_user=user).count(),
+                stats.followers_count)
+            self.assertEqual(Following.objects.filter(user=user).count(),
+                             stats.following_count)
+
+    def test_reactivated_user_keeps_following(self):
+        deactivate_user(self.user)
+        User.objects.filter(pk=self.user.pk).update(is_active=True)
+        self.run_tasks()
+        self.assertEqual(7, self.user_edges())
+
+    def test_resume_command(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        out = StringIO()
+        call_command('purge_inactive_following', stdout=out)
+        self.assertIn('Users queued: 1', out.getvalue())
+        self.run_tasks()
+        self.assertEqual(0, self.user_edges())
+        self.assertTrue(User.objects.filter(pk=self.user.pk).exists())
+
+    def test_resume_command_keeps_delete_intent(self):
+        """Прерванное удаление продолжается и без оставшихся подписок"""
+        deactivate_user(self.user, delete=True)
+        Task.objects.all().delete()
+        out = StringIO()
+        call_command('purge_inactive_following', stdout=out)
+        self.assertIn('Users queued: 1', out.getvalue())
+        self.assertTrue(Task.objects.get().payload['delete'])
+
+        # Подписки удалены, но сам пользователь остался
+        Task.objects.all().delete()
+        Following.objects.filter(user=self.user).delete()
+        Following.objects.filter(following_user=self.user).delete()
+        call_command('purge_inactive_following', stdout=StringIO())
+        self.run_tasks()
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+
+    def test_follow_inactive_user(self):
+        deactivate_user(self.others[0])
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(reverse('user-info-follow'),
+                               {'following_user_id': self.others[0].id})
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    @override_settings(TASKS_BACKEND='core.tasks.ImmediateBackend')
+    def test_delete_profile_api(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('user-info-detail', args=(self.user.id,))
+        response = client.delete(url)
+        self.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(1, Following.objects.count())
+
+    def test_delete_profile_of_other_user_forbidden(self):
+        client = APIClient()
+        client.force_authenticate(self.others[0])
+        url = reverse('user-info-detail', args=(self.user.id,))
+        response = client.delete(url)
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
+        self.assertTrue(User.objects.get(pk=self.user.pk).is_active)
+
+    def test_inactive_users_hidden_from_lists(self):
+        deactivate_user(self.others[0])
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(reverse('user-info-followers',
+                                      args=(self.user.id,)))
+        self.assertEqual(
+            [other.id for other in self.others[1:]],
+            [row['id'] for row in response.data['results']])
+
+    def test_purge_unknown_user(self):
+        purge_following(user_id=0)
@@ -0,0 +1,303 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from users.graph import DatabaseAdjacency, FollowGraphSnapshot, \
+    HotUsersAdjacency, SnapshotAdjacency, active_user_ids, \
+    get_adjacency, get_snapshot, reset_snapshot, shortest_path
+from users.models import Following
+from users.repository import FollowRepository
+from users.stats import recount_stats
+
+User = get_user_model()
+
+
+def create_users(count, prefix='user'):
+    return [User.objects.create(username=f'{prefix}{i}',
+                                email=f'{prefix}{i}@a.ru')
+            for i in range(count)]
+
+
+def follow(*edges):
+    Following.objects.bulk_create(
+        Following(user=user, following_user=target) for user, target in edges)
+    # Поиск пути выбирает направление по счетчикам подписок
+    recount_stats()
+
+
+class RecordingAdjacency(DatabaseAdjacency):
+    """Запоминает, сколько ребер прочитано каждой загрузкой"""
+
+    def __init__(self):
+        self.loads = []
+
+    def following(self, user_ids, limit=None):
+        return self._record(super().following(user_ids, limit))
+
+    def followers(self, user_ids, limit=None):
+        return self._record(super().followers(user_ids, limit))
+
+    def _record(self, edges):
+        self.loads.append(sum(map(len, edges.values())))
+        return edges
+
+
+class ShortestPathTestCase(TestCase):
+    """Поиск цепочки подписок между пользователями"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = u = create_users(7)
+        # 0 -> 1 -> 2 -> 3 -> 4, короткий путь 0 -> 5 -> 3, 6 без связей
+        follow((u[0], u[1]), (u[1], u[2]), (u[2], u[3]), (u[3], u[4]),
+               (u[0], u[5]), (u[5], u[3]), (u[4], u[0]))
+
+    def setUp(self):
+        cache.clear()
+
+    def ids(self, *indexes):
+        return [self.users[i].id for i in indexes]
+
+    def path(self, source, target, **options):
+        return shortest_path(self.users[source].id, self.users[target].id,
+                             adjacency=DatabaseAdjacency(), **options)
+
+    def test_shortest_path(self):
+        result = self.path(0, 4)
+        self.assertEqual(self.ids(0, 5, 3, 4), result.path)
+        self.assertEqual(3, result.degrees)
+        self.assertTrue(result.complete)
+
+    def test_direction_matters(self):
+        self.assertEqual(self.ids(4, 0), self.path(4, 0).path)
+        self.assertEqual(self.ids(3, 4, 0, 1), self.path(3, 1).path)
+
+    def test_same_user(self):
+        self.assertEqual(0, self.path(2, 2).degrees)
+
+    def test_no_path(self):
+        result = self.path(0, 6)
+        self.assertIsNone(result.path)
+        self.assertTrue(result.complete)
+
+    def test_depth_budget(self):
+        self.assertIsNone(self.path(0, 4, max_depth=2).path)
+
+    def test_time_budget(self):
+        result = self.path(0, 4, timeout=0)
+        self.assertIsNone(result.path)
+        self.assertFalse(result.complete)
+
+    def test_batched_frontier_queries(self):
+        # Степени обоих фронтов, затем на каждом уровне загрузка соседей
+        # и степень нового фронта
+        with self.assertNumQueries(7):
+            self.path(0, 4, chunk_size=1000)
+
+    def test_hot_users_snapshot(self):
+        adjacency = HotUsersAdjacency(limit=2)
+        snapshot = adjacency.snapshot()
+        self.assertEqual(2, len(snapshot))
+        self.assertIn(self.users[3].id, snapshot)
+        result = shortest_path(self.users[0].id, self.users[4].id,
+                               adjacency=adjacency)
+        self.assertEqual(self.ids(0, 5, 3, 4), result.path)
+        # Подписчики популярных пользователей берутся из памяти
+        with self.assertNumQueries(0):
+            adjacency.followers([self.users[3].id])
+
+    def test_hot_users_shared_between_processes(self):
+        """Другой процесс берет популярных пользователей из кэша"""
+        HotUsersAdjacency(limit=2).snapshot()
+        other = HotUsersAdjacency(limit=2)
+        with self.assertNumQueries(1):
+            self.assertEqual(2, len(other.snapshot()))
+
+    def test_high_degree_side_not_expanded(self):
+        """Фронт выбирается по степени, а не по числу вершин"""
+        hub = create_users(1, prefix='hub')[0]
+        fans = create_users(50, prefix='fan')
+        follow(*[(fan, hub) for fan in fans], (self.users[1], hub),
+               (self.users[0], self.users[6]))
+        adjacency = RecordingAdjacency()
+        result = shortest_path(self.users[0].id, hub.id,
+                               adjacency=adjacency, max_visited=20)
+        self.assertEqual([self.users[0].id, self.users[1].id, hub.id],
+                         result.path)
+        self.assertLessEqual(max(adjacency.loads), 21)
+
+    def test_rows_per_load_capped(self):
+        """Соседи популярной вершины не читаются сверх бюджета"""
+        hub = create_users(1, prefix='hub')[0]
+        fans = create_users(50, prefix='fan')
+        others = create_users(50, prefix='other')
+        follow(*[(hub, fan) for fan in fans],
+               *[(other, self.users[6]) for other in others])
+        adjacency = RecordingAdjacency()
+        result = shortest_path(hub.id, self.users[6].id,
+                               adjacency=adjacency, max_visited=20)
+        self.assertIsNone(result.path)
+        self.assertFalse(result.complete)
+        self.assertEqual([19], adjacency.loads)
+
+    def test_inactive_users_skipped(self):
+        User.objects.filter(pk=self.users[5].pk).update(is_active=False)
+        result = self.path(0, 4, allowed=active_user_ids)
+        self.assertEqual(self.ids(0, 1, 2, 3, 4), result.path)
+        self.assertIsNone(self.path(0, 5, allowed=active_user_ids).path)
+
+
+class GraphApiTestCase(APITestCase):
+    """Общие подписчики и цепочка подписок через API"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = u = create_users(5)
+        follow((u[0], u[1]), (u[1], u[2]), (u[3], u[1]), (u[3], u[2]),
+               (u[4], u[1]), (u[4], u[2]), (u[4], u[0]))
+
+    def setUp(self):
+        self.client.force_authenticate(self.users[0])
+
+    def test_common_followers(self):
+        url = reverse('user-info-followers-common',
+                      args=(self.users[1].id, self.users[2].id))
+        response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(['user3', 'user4'],
+                         [row['username'] for row in response.data['results']])
+        self.assertEqual(2, response.data['count'])
+
+    def test_path(self):
+        url = reverse('user-info-path',
+                      args=(self.users[0].id, self.users[2].id))
+        response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(2, response.data['degrees'])
+        self.assertTrue(response.data['complete'])
+        self.assertEqual(['user0', 'user1', 'user2'],
+                         [row['username'] for row in response.data['path']])
+
+    def test_path_skips_inactive_users(self):
+        User.objects.filter(pk=self.users[1].pk).update(is_active=False)
+        url = reverse('user-info-path',
+                      args=(self.users[0].id, self.users[2].id))
+        response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertIsNone(response.data['degrees'])
+        self.assertEqual([], response.data['path'])
+
+    def test_path_not_found(self):
+        url = reverse('user-info-path',
+                      args=(self.users[2].id, self.users[0].id))
+        response = self.client.get(url, {'max_depth': 3})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertIsNone(response.data['degrees'])
+        self.assertEqual([], response.data['path'])
+
+    def test_path_invalid_depth(self):
+        url = reverse('user-info-path',
+                      args=(self.users[0].id, self.users[2].id))
+        response = self.client.get(url, {'max_depth': 'x'})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+
+class FollowGraphSnapshotTestCase(TestCase):
+    """Снимок графа подписок в памяти"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = u = create_users(5)
+        follow((u[0], u[1]), (u[1], u[2]), (u[3], u[1]), (u[3], u[2]),
+               (u[4], u[1]), (u[4], u[2]), (u[4], u[0]))
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'follows.bin')
+        settings_override = override_settings(GRAPH_SNAPSHOT_PATH=self.path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_snapshot()
+        self.addCleanup(reset_snapshot)
+
+    def id(self, index):
+        return self.users[index].id
+
+    def assertSnapshotMatchesDatabase(self, snapshot):
+        u = self.id
+        self.assertTrue(snapshot.is_following(u(4), u(0)))
+        self.assertFalse(snapshot.is_following(u(0), u(4)))
+        expected = sorted(row['user_id'] for row in
+                          FollowRepository().common_followers(u(1), u(2)))
+        self.assertEqual(expected,
+                         list(snapshot.common_followers(u(1), u(2))))
+        self.assertEqual([u(1)], list(snapshot.common_following(u(0), u(3))))
+
+    def test_build(self):
+        self.assertSnapshotMatchesDatabase(FollowGraphSnapshot.build())
+
+    def test_save_and_load(self):
+        FollowGraphSnapshot.build().save(self.path)
+        snapshot = FollowGraphSnapshot.load(self.path)
+        self.assertSnapshotMatchesDatabase(snapshot)
+        usage = snapshot.memory_usage()
+        self.assertTrue(usage['mapped'])
+        self.assertEqual(7, usage['edges'])
+        self.assertGreater(usage['followers_bytes'], 0)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('build_graph_snapshot', stdout=out)
+        self.assertIn('7 edges', out.getvalue())
+        self.assertSnapshotMatchesDatabase(get_snapshot())
+
+    def test_follow_and_unfollow_applied(self):
+        FollowGraphSnapshot.build().save(self.path)
+        snapshot = get_snapshot()
+        Following.objects.create(user=self.users[0],
+                                 following_user=self.users[4])
+        Following.objects.get(user=self.users[4],
+                              following_user=self.users[0]).delete()
+        self.assertTrue(snapshot.is_following(self.id(0), self.id(4)))
+        self.assertFalse(snapshot.is_following(self.id(4), self.id(0)))
+        self.assertEqual([self.id(0)],
+                         list(snapshot.followers.neighbours(self.id(4))))
+        self.assertEqual([], list(snapshot.followers.neighbours(self.id(0))))
+
+    def test_catch_up(self):
+        """Подписки из других процессов (без сигналов) догоняются"""
+        snapshot = FollowGraphSnapshot.build()
+        follow((self.users[2], self.users[0]))
+        self.assertFalse(snapshot.is_following(self.id(2), self.id(0)))
+        snapshot.catch_up()
+        self.assertTrue(snapshot.is_following(self.id(2), self.id(0)))
+
+    def test_catch_up_late_commit(self):
+        """Подписка с ранним created_at, закоммиченная позже, не теряется"""
+        snapshot = FollowGraphSnapshot.build()
+        follow((self.users[2], self.users[0]))
+        snapshot.catch_up()
+        follow((self.users[2], self.users[1]))
+        Following.objects.filter(following_user=self.users[1]).update(
+            created_at=snapshot.seen_at - timedelta(seconds=5))
+        snapshot.catch_up()
+        self.assertTrue(snapshot.is_following(self.id(2), self.id(1)))
+
+    def test_path_without_queries(self):
+        FollowGraphSnapshot.build().save(self.path)
+        adjacency = get_adjacency()
+        self.assertIsInstance(adjacency, SnapshotAdjacency)
+        with self.assertNumQueries(0):
+            result = shortest_path(self.id(4), self.id(2),
+                                   adjacency=adjacency)
+        self.assertEqual(1, result.degrees)
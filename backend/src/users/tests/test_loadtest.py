@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.test import LiveServerTestCase, SimpleTestCase
+
+from core.loadtest import HTTPClient, LoadRunner
+from users.loadtest import SocialFlows, next_path, parse_weights
+
+User = get_user_model()
+
+
+class SocialFlowsTestCase(LiveServerTestCase):
+    """Сценарии нагрузочного теста против живого сервера"""
+
+    def setUp(self):
+        for i in range(3):
+            User.objects.create(username=f'test_user{i}',
+                                email=f'test_user{i}@gmail.com')
+
+    def test_all_flows_without_errors(self):
+        flows = SocialFlows({'browse': 1, 'profile': 1, 'follow': 1,
+                             'followers': 1}, seed=1, prefix='load')
+        stats = LoadRunner(self.live_server_url, flows, users=2,
+                           iterations=12, duration=60).run()
+        rows = {row['name']: row for row in stats.rows()}
+        self.assertEqual(0, rows['Total']['error_rate'], stats.report())
+        self.assertEqual(2, rows['POST /api/auth/login/']['requests'])
+        self.assertIn('GET /api/users/', rows)
+        self.assertTrue(User.objects.filter(username='load_1').exists())
+        self.assertIn('POST /api/user/follow/', rows)
+        self.assertIn('GET /api/user/{id}/followers/recent/', rows)
+
+    def test_parse_weights(self):
+        self.assertEqual({'browse': 5.0, 'follow': 1.0},
+                         parse_weights('browse=5, follow=1'))
+        with self.assertRaises(ValueError):
+            SocialFlows({'unknown': 1})
+
+
+class NextPathTestCase(SimpleTestCase):
+    """Ссылки next при --url с префиксом"""
+
+    def test_prefix_not_doubled(self):
+        client = HTTPClient('http://example.com:8000/backend/')
+        path = next_path('http://example.com:8000/backend/api/user/1/'
+                         'followers/recent/?cursor=cD0y', client.prefix)
+        self.assertEqual('/api/user/1/followers/recent/?cursor=cD0y', path)
+        self.assertEqual('/backend/api/user/1/followers/recent/'
+                         '?cursor=cD0y', client.prefix + path)
+
+    def test_without_prefix(self):
+        self.assertEqual('/api/users/?page=2',
+                         next_path('http://example.com/api/users/?page=2'))
+        self.assertEqual('/backend-v2/api/users/',
+                         next_path('http://example.com/backend-v2/api/users/',
+                                   '/backend'))
@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from users.tasks import deactivate_user
+
+User = get_user_model()
+BATCH_URL = reverse('user-info-batch')
+
+
+class UserProfilesBatchTestCase(APITestCase):
+    """Профили нескольких пользователей одним запросом"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create(username=f'test_user{i}',
+                                email=f'test_user{i}@gmail.com',
+                                avatar=f'uploads/avatar/{i}.jpg')
+            for i in range(4)
+        ]
+        cls.users[3].is_active = False
+        cls.users[3].save()
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client.force_authenticate(self.users[0])
+
+    def get(self, ids, **params):
+        return self.client.get(BATCH_URL, {
+            'ids': ','.join(map(str, ids)), **params})
+
+    def test_profiles_in_request_order(self):
+        u = self.users
+        response = self.get([u[2].id, 0, u[0].id, u[3].id, u[2].id])
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([u[2].id, u[0].id],
+                         [row['id'] for row in response.data['results']])
+        self.assertEqual([0], response.data['missing'])
+        self.assertEqual([u[3].id], response.data['inactive'])
+        self.assertEqual({'id', 'username', 'name', 'avatar'},
+                         set(response.data['results'][0]))
+
+    def test_detail_profile_same_as_detail_view(self):
+        user = self.users[1]
+        response = self.get([user.id], profile='detail')
+        detail = self.client.get(reverse('user-info-detail',
+                                         args=(user.id,)))
+        self.assertEqual([detail.data], response.data['results'])
+        self.assertTrue(response.data['results'][0]['avatar']
+                        .startswith('http://testserver/'))
+
+    def test_cached_profiles(self):
+        ids = [user.id for user in self.users[:3]]
+        with self.assertNumQueries(1):
+            first = self.get(ids)
+        with self.assertNumQueries(0):
+            second = self.get(ids)
+        self.assertEqual(first.data, second.data)
+
+    def test_cache_invalidated_on_save(self):
+        user = self.users[1]
+        self.get([user.id])
+        user.name = 'New name'
+        user.save()
+        response = self.get([user.id])
+        self.assertEqual('New name', response.data['results'][0]['name'])
+
+        user.is_active = False
+        user.save()
+        response = self.get([user.id])
+        self.assertEqual([user.id], response.data['inactive'])
+
+    def test_cache_invalidated_on_profile_update(self):
+        user = self.users[0]
+        self.get([user.id], profile='detail')
+        response = self.client.patch(
+            reverse('user-info-detail', args=(user.id,)),
+            {'description': 'New description'})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        response = self.get([user.id], profile='detail')
+        self.assertEqual('New description',
+                         response.data['results'][0]['description'])
+
+    def test_login_keeps_cache(self):
+        """Сохранение last_login при входе не сбрасывает профили"""
+        user = self.users[1]
+        self.get([user.id])
+        user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.get([user.id])
+
+    def test_cache_invalidated_on_deactivation(self):
+        user = User.objects.get(pk=self.users[1].pk)
+        self.get([user.id])
+        deactivate_user(user)
+        self.assertEqual([user.id], self.get([user.id]).data['inactive'])
+
+    @override_settings(USER_PROFILE_BATCH_SIZE=2)
+    def test_too_many_ids(self):
+        response = self.get([1, 2, 3])
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_invalid_params(self):
+        for params in ({'ids': ''}, {'ids': '1,a'},
+                       {'ids': '1', 'profile': 'full'}):
+            response = self.client.get(BATCH_URL, params)
+            self.assertEqual(status.HTTP_400_BAD_REQUEST,
+                             response.status_code)
@@ -0,0 +1,128 @@
+import os
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from core.cache import reset_response_cache
+from core.testing import UPDATE_ENV, QueryBudgetFile, QueryBudgetMixin
+from users.models import Following
+from users.urls import router
+
+User = get_user_model()
+
+BUDGET_FILE = os.path.join(os.path.dirname(__file__), 'query_budgets.json')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SQL recorded on Postgres')
+class UsersQueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+    """
+    Бюджет запросов для каждого эндпоинта users.views.
+    После осознанного изменения запросов бюджеты обновляются:
+    UPDATE_QUERY_BUDGETS=1 python manage.py test users.tests
+    Записанный SQL - запросы PostgreSQL, включая EXPLAIN для оценки
+    количества, на других базах тесты пропускаются.
+    """
+    query_budget_file = BUDGET_FILE
+    # Защита от явных деградаций, а не замер производительности
+    query_budget_seconds = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create(
+            username=f'test_user{i}', email=f'test_user{i}@gmail.com',
+            avatar=f'uploads/avatar/{i}.png') for i in range(6)]
+        # Списков больше страницы: проходят пути с next и оценкой count
+        cls.users += [User.objects.create(
+            username=f'test_follower{i}', email=f'test_follower{i}@gmail.com')
+            for i in range(settings.REST_FRAMEWORK['PAGE_SIZE'] + 5)]
+        for user in cls.users[1:5] + cls.users[6:]:
+            Following.objects.create(user=user, following_user=cls.users[0])
+            Following.objects.create(user=user, following_user=cls.users[5])
+            Following.objects.create(user=cls.users[0], following_user=user)
+
+    def setUp(self):
+        # Ответы из кэшей не должны влиять на число запросов
+        cache.clear()
+        reset_response_cache()
+        self.addCleanup(reset_response_cache)
+        self.user = self.users[0]
+        self.client.force_authenticate(self.user)
+
+    def request(self, method, name, args=(), data=None, params=None,
+                expected=status.HTTP_200_OK):
+        url = reverse(name, args=args)
+        with self.assertQueryBudget(f'{method.upper()} {name}'):
+            if method == 'get':
+                response = self.client.get(url, params)
+            else:
+                response = getattr(self.client, method)(url, data)
+        self.assertEqual(expected, response.status_code, response.data)
+        return response
+
+    def test_users_list(self):
+        self.request('get', 'user-info-list')
+
+    def test_users_batch(self):
+        ids = ','.join(str(user.id) for user in self.users)
+        self.request('get', 'user-info-batch', params={'ids': ids})
+
+    def test_profile_retrieve(self):
+        self.request('get', 'user-info-detail', args=(self.user.id,))
+
+    def test_profile_update(self):
+        self.request('put', 'user-info-detail', args=(self.user.id,),
+                     data={'description': 'put'})
+
+    def test_profile_partial_update(self):
+        self.request('patch', 'user-info-detail', args=(self.user.id,),
+                     data={'description': 'patch'})
+
+    def test_profile_destroy(self):
+        self.request('delete', 'user-info-detail', args=(self.user.id,),
+                     expected=status.HTTP_204_NO_CONTENT)
+
+    def test_following(self):
+        self.request('get', 'user-info-following', args=(self.user.id,))
+
+    def test_followers(self):
+        self.request('get', 'user-info-followers', args=(self.user.id,))
+
+    def test_following_recent(self):
+        self.request('get', 'user-info-following-recent',
+                     args=(self.user.id,))
+
+    def test_followers_recent(self):
+        self.request('get', 'user-info-followers-recent',
+                     args=(self.user.id,))
+
+    def test_followers_common(self):
+        self.request('get', 'user-info-followers-common',
+                     args=(self.user.id, self.users[5].id))
+
+    def test_path(self):
+        self.request('get', 'user-info-path',
+                     args=(self.users[2].id, self.users[1].id))
+
+    def test_follow(self):
+        self.request('post', 'user-info-follow',
+                     data={'following_user_id': self.users[5].id})
+
+    def test_unfollow(self):
+        self.request('post', 'user-info-unfollow',
+                     data={'unfollowing_user_id': self.users[1].id})
+
+    def test_every_endpoint_has_budget(self):
+        if os.getenv(UPDATE_ENV):
+            self.skipTest('budgets are being recorded')
+        budgets = QueryBudgetFile(BUDGET_FILE).budgets
+        for url in router.get_urls():
+            for method in url.callback.actions:
+                name = f'{method.upper()} {url.name}'
+                with self.subTest(name):
+                    self.assertIn(name, budgets)
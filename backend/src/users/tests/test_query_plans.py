@@ -0,0 +1,86 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from users.models import Following
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN output of Postgres')
+class QueryPlanTestCase(TestCase):
+    """
+    Проверяем, что запросы используют индексы.
+    На маленьких тестовых таблицах планировщик выбирает seq scan
+    и bitmap scan, поэтому они отключаются на время теста.
+    Статистика собирается заново по таблице, где активных
+    пользователей мало, иначе выбор между частичным индексом
+    и первичным ключом зависит от того, когда autovacuum последний раз
+    обработал таблицу.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create(username=f'test_user{i}',
+                                         email=f'test_user{i}@gmail.com')
+                     for i in range(5)]
+        for user in cls.users[1:]:
+            Following.objects.create(user=cls.users[0], following_user=user)
+            Following.objects.create(user=user, following_user=cls.users[0])
+        # Активен каждый десятый: с половиной активных стоимость
+        # частичного индекса и первичного ключа почти одинакова
+        User.objects.bulk_create([
+            User(username=f'bulk_user{i}', email=f'bulk_user{i}@gmail.com',
+                 is_active=i % 10 == 0) for i in range(400)])
+
+    def explain(self, queryset):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE users_user')
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_bitmapscan = off')
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = self.explain(queryset)
+        self.assertIn(index_name, plan)
+        return plan
+
+    def test_recent_following_uses_index_without_sort(self):
+        queryset = Following.objects.filter(
+            user_id=self.users[0].id).order_by('-created_at')[:11]
+        plan = self.assertUsesIndex(queryset, 'following_user_created_idx')
+        self.assertNotIn('Sort', plan)
+
+    def test_recent_followers_uses_index_without_sort(self):
+        queryset = Following.objects.filter(
+            following_user_id=self.users[0].id).order_by('-created_at')[:11]
+        plan = self.assertUsesIndex(queryset, 'followers_user_created_idx')
+        self.assertNotIn('Sort', plan)
+
+    def test_active_users_list_uses_partial_index(self):
+        queryset = User.objects.filter(is_active=True).values(
+            'id', 'username', 'name', 'avatar').order_by('id')[:11]
+        self.assertUsesIndex(queryset, 'user_active_id_idx')
+
+    def test_active_users_by_username_uses_partial_index(self):
+        queryset = User.objects.filter(is_active=True).order_by(
+            'username')[:11]
+        self.assertUsesIndex(queryset, 'user_active_username_idx')
+
+    def test_username_iexact_uses_upper_index(self):
+        queryset = User.objects.filter(username__iexact='TEST_USER1')
+        self.assertUsesIndex(queryset, 'user_username_upper_like_idx')
+
+    def test_email_iexact_uses_upper_index(self):
+        queryset = User.objects.filter(email__iexact='TEST_USER1@gmail.com')
+        self.assertUsesIndex(queryset, 'user_email_upper_like_idx')
+
+    def test_username_prefix_search_uses_upper_index(self):
+        queryset = User.objects.filter(username__istartswith='test_user')
+        self.assertUsesIndex(queryset, 'user_username_upper_like_idx')
+
+    def test_email_prefix_search_uses_upper_index(self):
+        queryset = User.objects.filter(email__istartswith='test_user1')
+        self.assertUsesIndex(queryset, 'user_email_upper_like_idx')
@@ -0,0 +1,286 @@
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, \
+    override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from core.models import Task
+from core.tasks import run_pending
+from users.graph import DatabaseAdjacency, shortest_path
+from users.models import Following, FollowerEdge, FollowingEdge
+from users.repository import FollowRepository, ShardedFollowRepository, \
+    ShardReadFollowRepository, get_follow_repository, shard_index
+from users.tasks import deactivate_user
+
+User = get_user_model()
+
+SHARDS = ['follow_shard_0', 'follow_shard_1', 'follow_shard_2']
+
+
+class ShardIndexTestCase(SimpleTestCase):
+
+    def test_stable(self):
+        self.assertEqual([shard_index(i, 3) for i in range(10)],
+                         [shard_index(i, 3) for i in range(10)])
+
+    def test_spread(self):
+        counts = Counter(shard_index(i, 3) for i in range(1, 3001))
+        self.assertEqual({0, 1, 2}, set(counts))
+        self.assertTrue(all(count > 800 for count in counts.values()))
+
+
+@override_settings(FOLLOW_SHARDS=SHARDS)
+class ShardedFollowRepositoryTestCase(TransactionTestCase):
+    """
+    Шарды графа подписок в отдельных базах SQLite в памяти.
+    Базы добавляются только на время тестов класса, поэтому
+    тестовый раннер их не создает и не проверяет.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for alias in SHARDS:
+            connections.databases[alias] = {
+                'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}
+            call_command('migrate', database=alias, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias in SHARDS:
+            connections[alias].close()
+            del connections[alias]
+            del connections.databases[alias]
+        super().tearDownClass()
+
+    def setUp(self):
+        self.repository = ShardedFollowRepository(SHARDS)
+        self.users = [User.objects.create(username=f'user{i}',
+                                          email=f'user{i}@a.ru')
+                      for i in range(6)]
+        self.ids = [user.id for user in self.users]
+
+    def tearDown(self):
+        for alias in SHARDS:
+            FollowingEdge.objects.using(alias).delete()
+            FollowerEdge.objects.using(alias).delete()
+
+    def follow(self, *pairs):
+        self.repository.follow_many(
+            [(self.ids[a], self.ids[b], timezone.now()) for a, b in pairs])
+
+    def test_only_edge_tables_in_shards(self):
+        tables = connections[SHARDS[0]].introspection.table_names()
+        self.assertIn('users_followingedge', tables)
+        self.assertIn('users_followeredge', tables)
+        self.assertNotIn('users_user', tables)
+        self.assertNotIn('users_following', tables)
+
+    def test_edges_stored_in_owner_shard(self):
+        self.follow(*[(a, b) for a in range(6) for b in range(6) if a != b])
+        for alias in SHARDS:
+            for model in (FollowingEdge, FollowerEdge):
+                owners = model.objects.using(alias) \
+                    .values_list('owner_id', flat=True)
+                self.assertTrue(all(self.repository.shard_for(owner) == alias
+                                    for owner in owners))
+        total = sum(FollowingEdge.objects.using(alias).count()
+                    for alias in SHARDS)
+        self.assertEqual(30, total)
+
+    def test_following_and_followers(self):
+        self.follow((0, 1), (0, 2), (3, 1))
+        self.assertTrue(self.repository.is_following(self.ids[0],
+                                                     self.ids[1]))
+        self.assertFalse(self.repository.is_following(self.ids[1],
+                                                      self.ids[0]))
+        following = self.repository.following(self.ids)
+        self.assertEqual({self.ids[1], self.ids[2]},
+                         set(following[self.ids[0]]))
+        followers = self.repository.followers(self.ids)
+        self.assertEqual({self.ids[0], self.ids[3]},
+                         set(followers[self.ids[1]]))
+        self.assertEqual([], followers[self.ids[5]])
+
+    def test_single_shard_lookup(self):
+        self.follow((0, 1), (0, 2), (0, 3))
+        shard = self.repository.shard_for(self.ids[0])
+        with self.assertNumQueries(1, using=shard):
+            ids = self.repository.recent_following(self.ids[0], 2)
+        self.assertEqual(2, len(ids))
+
+    def test_one_query_per_shard(self):
+        self.follow((0, 1), (2, 3), (4, 5))
+        for alias in SHARDS:
+            expected = int(any(self.repository.shard_for(user_id) == alias
+                               for user_id in self.ids))
+            with self.assertNumQueries(expected, using=alias):
+                self.repository.following(self.ids)
+
+    def test_lists_newest_first(self):
+        """Списки из шардов идут по created_at, а не по username"""
+        now = timezone.now()
+        self.repository.follow_many([
+            (self.ids[a], self.ids[0], now - timedelta(minutes=a))
+            for a in (3, 1, 2)])
+        self.assertEqual(
+            [self.ids[1], self.ids[2], self.ids[3]],
+            [row['user_id']
+             for row in self.repository.followers_list(self.ids[0])])
+        self.assertEqual(
+            [self.ids[0]],
+            [row['following_user_id']
+             for row in self.repository.following_list(self.ids[2])])
+
+    def test_common_followers_in_chunks(self):
+        self.follow((1, 0), (2, 0), (3, 0), (4, 0), (2, 5), (4, 5), (1, 3))
+        for pair in ((0, 5), (5, 0)):
+            common = self.repository.common_followers(
+                *[self.ids[i] for i in pair], chunk_size=1)
+            self.assertEqual([self.ids[2], self.ids[4]],
+                             [row['user_id'] for row in common])
+        self.assertEqual([], self.repository.common_followers(
+            self.ids[3], self.ids[5]))
+
+    def test_common_followers_reads_smaller_side(self):
+        """Подписчики популярного пользователя целиком не читаются"""
+        self.follow((1, 0), (2, 0), (3, 0), (4, 0), (2, 5))
+        shard = self.repository.shard_for(self.ids[0])
+        with CaptureQueriesContext(connections[shard]) as queries:
+            self.repository.common_followers(self.ids[0], self.ids[5])
+        read = [query['sql'] for query in queries.captured_queries
+                if 'COUNT' not in query['sql']
+                and str(self.ids[0]) in query['sql']]
+        self.assertTrue(read)
+        self.assertTrue(all('"other_id" IN' in sql for sql in read))
+
+    def test_follow_is_idempotent_and_unfollow(self):
+        self.follow((0, 1))
+        self.follow((0, 1))
+        self.repository.unfollow(self.ids[0], self.ids[1])
+        self.assertFalse(self.repository.is_following(self.ids[0],
+                                                      self.ids[1]))
+        self.assertEqual([], self.repository.recent_followers(self.ids[1],
+                                                              10))
+
+    def test_following_mirrored_after_commit(self):
+        following = Following.objects.create(user=self.users[0],
+                                             following_user=self.users[1])
+        run_pending()
+        self.assertEqual([self.ids[1]],
+                         self.repository.recent_following(self.ids[0], 10))
+        self.assertEqual([self.ids[0]],
+                         self.repository.recent_followers(self.ids[1], 10))
+        following.delete()
+        run_pending()
+        self.assertEqual([], self.repository.recent_following(self.ids[0],
+                                                               10))
+
+    def test_mirror_retried_after_shard_error(self):
+        """Упавшая запись в шард остается в очереди и повторяется"""
+        Following.objects.create(user=self.users[0],
+                                 following_user=self.users[1])
+        with mock.patch.object(ShardedFollowRepository, 'follow_many',
+                               side_effect=RuntimeError('shard is down')):
+            run_pending()
+        self.assertEqual([], self.repository.recent_following(self.ids[0],
+                                                               10))
+        Task.objects.update(run_at=timezone.now())
+        run_pending()
+        self.assertEqual([self.ids[1]],
+                         self.repository.recent_following(self.ids[0], 10))
+        self.assertFalse(Task.objects.exists())
+
+    def test_sync_follows_source_of_truth(self):
+        """Устаревшая задача не возвращает удаленную подписку"""
+        self.follow((0, 1))
+        Following.objects.create(user=self.users[0],
+                                 following_user=self.users[2])
+        self.repository.sync([(self.ids[0], self.ids[1]),
+                              (self.ids[0], self.ids[2])])
+        self.assertEqual([self.ids[2]],
+                         self.repository.recent_following(self.ids[0], 10))
+
+    def test_purged_edges_removed_from_shards(self):
+        """Очистка неактивного пользователя удаляет ребра и в шардах"""
+        for other in self.users[1:4]:
+            Following.objects.create(user=self.users[0],
+                                     following_user=other)
+        Following.objects.create(user=self.users[4],
+                                 following_user=self.users[0])
+        deactivate_user(self.users[0])
+        # Очистка ставит в очередь синхронизацию шардов
+        while run_pending():
+            pass
+        self.assertEqual([], self.repository.recent_following(self.ids[0],
+                                                               10))
+        self.assertEqual([], self.repository.recent_followers(self.ids[0],
+                                                               10))
+        self.assertEqual([], self.repository.recent_followers(self.ids[1],
+                                                              10))
+        self.assertEqual([], self.repository.recent_following(self.ids[4],
+                                                               10))
+
+    def test_backfill_command(self):
+        Following.objects.bulk_create([
+            Following(user=self.users[0], following_user=self.users[1]),
+            Following(user=self.users[2], following_user=self.users[1]),
+        ])
+        out = StringIO()
+        call_command('backfill_follow_shards', batch_size=1, stdout=out)
+        call_command('backfill_follow_shards', stdout=out)
+        self.assertIn('Edges copied: 2', out.getvalue())
+        self.assertEqual({self.ids[0], self.ids[2]},
+                         set(self.repository.recent_followers(self.ids[1],
+                                                              10)))
+
+    def test_read_switch(self):
+        self.assertIsInstance(get_follow_repository(), FollowRepository)
+        self.assertNotIsInstance(get_follow_repository(),
+                                 ShardedFollowRepository)
+        self.assertNotIsInstance(get_follow_repository(),
+                                 ShardReadFollowRepository)
+        self.follow((0, 1), (1, 2))
+        with override_settings(FOLLOW_SHARDS_READ=True):
+            self.assertIsInstance(get_follow_repository(),
+                                  ShardReadFollowRepository)
+            result = shortest_path(self.ids[0], self.ids[2],
+                                   adjacency=DatabaseAdjacency())
+        self.assertEqual([self.ids[0], self.ids[1], self.ids[2]],
+                         result.path)
+
+    @override_settings(FOLLOW_SHARDS_READ=True)
+    def test_views_read_from_shards(self):
+        """Списки читаются из шардов, подписка пишется в основную базу"""
+        self.follow((1, 0), (2, 0), (3, 0), (2, 4))
+        User.objects.filter(pk=self.ids[3]).update(is_active=False)
+        client = APIClient()
+        client.force_authenticate(self.users[5])
+        response = client.get(reverse('user-info-followers',
+                                      args=(self.ids[0],)))
+        self.assertEqual({self.ids[1], self.ids[2]},
+                         {row['id'] for row in response.data['results']})
+        self.assertEqual('user1', next(
+            row['username'] for row in response.data['results']
+            if row['id'] == self.ids[1]))
+        response = client.get(reverse('user-info-followers-common',
+                                      args=(self.ids[0], self.ids[4])))
+        self.assertEqual([self.ids[2]],
+                         [row['id'] for row in response.data['results']])
+
+        client.post(reverse('user-info-follow'),
+                    {'following_user_id': self.ids[0]})
+        self.assertTrue(Following.objects.filter(
+            user_id=self.ids[5], following_user_id=self.ids[0]).exists())
+        run_pending()
+        self.assertTrue(get_follow_repository().is_following(self.ids[5],
+                                                             self.ids[0]))
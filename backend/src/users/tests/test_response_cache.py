@@ -0,0 +1,143 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from core.cache import reset_response_cache
+from users.models import Following
+from users.tasks import deactivate_user, purge_following
+
+User = get_user_model()
+
+
+class ResponseCacheTestCase(APITestCase):
+    """Кэширование профилей и списков подписок"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create(username=f'test_user{i}',
+                                         email=f'test_user{i}@gmail.com')
+                     for i in range(3)]
+        Following.objects.create(user=cls.users[1],
+                                 following_user=cls.users[0])
+
+    def setUp(self):
+        cache.clear()
+        reset_response_cache()
+        self.addCleanup(reset_response_cache)
+        self.client.force_authenticate(self.users[1])
+        self.profile_url = reverse('user-info-detail',
+                                   args=(self.users[0].id,))
+        self.followers_url = reverse('user-info-followers',
+                                     args=(self.users[0].id,))
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return response, len(queries)
+
+    def test_profile_cached(self):
+        first, queries = self.get(self.profile_url)
+        self.assertGreater(queries, 0)
+        second, queries = self.get(self.profile_url)
+        self.assertEqual(0, queries)
+        self.assertEqual(first.data, second.data)
+
+    def test_same_profile_for_every_viewer(self):
+        self.get(self.profile_url)
+        self.client.force_authenticate(self.users[2])
+        _, queries = self.get(self.profile_url)
+        self.assertEqual(0, queries)
+
+    def test_profile_update_invalidates(self):
+        self.get(self.profile_url)
+        self.client.force_authenticate(self.users[0])
+        response = self.client.patch(self.profile_url,
+                                     {'description': 'new'})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        response, _ = self.get(self.profile_url)
+        self.assertEqual('new', response.data['description'])
+
+    def test_login_keeps_profile_cache(self):
+        """Сохранение last_login при входе не сбрасывает профиль"""
+        self.get(self.profile_url)
+        user = User.objects.get(pk=self.users[0].pk)
+        user.last_login = timezone.now()
+        user.save(update_fields=['last_login'])
+        _, queries = self.get(self.profile_url)
+        self.assertEqual(0, queries)
+
+    def test_unrelated_profile_field_keeps_cache(self):
+        self.get(self.profile_url)
+        self.client.force_authenticate(self.users[0])
+        response = self.client.patch(reverse('rest_user_details'),
+                                     {'phone_number': '79778889900'})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        _, queries = self.get(self.profile_url)
+        self.assertEqual(0, queries)
+
+    def test_deactivation_invalidates_lists_per_batch(self):
+        """
+        Деактивация сбрасывает только профиль, списки сбрасываются
+        пачками очистки, а не перебором всех подписок в запросе
+        """
+        following_url = reverse('user-info-following',
+                                args=(self.users[1].id,))
+        self.get(self.profile_url)
+        response, _ = self.get(self.followers_url)
+        self.assertEqual(1, response.data['count'])
+        self.get(following_url)
+
+        with CaptureQueriesContext(connection) as queries:
+            deactivate_user(User.objects.get(pk=self.users[1].pk))
+        self.assertFalse(any('users_following' in query['sql']
+                             for query in queries.captured_queries))
+        _, queries = self.get(self.followers_url)
+        self.assertEqual(0, queries)
+
+        purge_following(user_id=self.users[1].id)
+        response, _ = self.get(self.followers_url)
+        self.assertEqual(0, response.data['count'])
+
+    def test_permissions_checked_before_cache(self):
+        self.get(self.followers_url)
+        self.client.force_authenticate(None)
+        response = self.client.get(self.followers_url)
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+
+    def test_follow_and_unfollow_invalidate_lists(self):
+        response, _ = self.get(self.followers_url)
+        self.assertEqual(1, response.data['count'])
+        _, queries = self.get(self.followers_url)
+        self.assertEqual(0, queries)
+
+        self.client.force_authenticate(self.users[2])
+        self.client.post(reverse('user-info-follow'),
+                         {'following_user_id': self.users[0].id})
+        response, _ = self.get(self.followers_url)
+        self.assertEqual(2, response.data['count'])
+
+        self.client.post(reverse('user-info-unfollow'),
+                         {'unfollowing_user_id': self.users[0].id})
+        response, _ = self.get(self.followers_url)
+        self.assertEqual(1, response.data['count'])
+
+    def test_purge_invalidates_lists(self):
+        """Подписки, удаленные очисткой пачками, сбрасывают списки"""
+        self.get(self.followers_url)
+        User.objects.filter(pk=self.users[1].pk).update(is_active=False)
+        purge_following(user_id=self.users[1].id)
+        response, _ = self.get(self.followers_url)
+        self.assertEqual(0, response.data['count'])
+
+    def test_pages_cached_separately(self):
+        first, _ = self.get(self.followers_url)
+        second, _ = self.get(self.followers_url, page_size=1, page=1)
+        self.assertEqual(first.data['results'], second.data['results'])
+        response = self.client.get(self.followers_url, {'page': 2})
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
@@ -1,64 +1,184 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db.models import F
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import RetrieveUpdateAPIView
-from rest_framework.mixins import ListModelMixin
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.mixins import DestroyModelMixin, ListModelMixin
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet, GenericViewSet
 
+from core.cache import cache_response
 from core.decorators import paginate
+from core.pagination import EstimatedCountPagination, \
+    RecentCursorPagination
+from users.cache import followers_tag, following_tag, profile_tag
+from users.graph import active_user_ids, shortest_path
 from users.models import Following
 from users.permissions import IsOwnerOrStaffOrReadOnly
+from users.profiles import PROFILE_SERIALIZERS, get_profiles
+from users.repository import attach_users, get_follow_repository
 from users.serializers import UserPersonalInfoDetailSerializer, \
     UserFollowingListSerializer, UserFollowersListSerializer, \
     FollowSerializer, UnfollowSerializer, ShortUserInfoSerializer
+from users.tasks import deactivate_user
 
 User = get_user_model()
 
 
 class UsersListView(ListModelMixin, GenericViewSet):
     """Список пользователей с краткой информацией"""
-    queryset = User.objects.filter(is_active=True)
+    queryset = User.objects.filter(is_active=True).values(
+        'id', 'username', 'name', 'avatar').order_by('id')
     serializer_class = ShortUserInfoSerializer
-    pagination_class = PageNumberPagination
+    pagination_class = EstimatedCountPagination
 
+    @action(detail=False, methods=['get'], name='Get many user profiles')
+    def batch(self, request):
+        """
+        Профили пользователей по списку id за один запрос:
+        ?ids=1,2,3&profile=short|detail
+        Профили возвращаются в порядке ids, отсутствующие
+        и неактивные пользователи перечисляются отдельно.
+        """
+        ids = _parse_ids(request.query_params.get('ids', ''),
+                         getattr(settings, 'USER_PROFILE_BATCH_SIZE', 200))
+        kind = request.query_params.get('profile', 'short')
+        if kind not in PROFILE_SERIALIZERS:
+            raise ValidationError(
+                {'profile': f'Must be one of: '
+                            f'{", ".join(PROFILE_SERIALIZERS)}.'})
+        results, missing, inactive = get_profiles(ids, kind, request)
+        return Response({'results': results, 'missing': missing,
+                         'inactive': inactive})
 
-class UserPersonalInfoDetailView(RetrieveUpdateAPIView, GenericViewSet):
-    """Отображаем и редактируем информацию о профиле пользователя"""
+
+def _parse_ids(value, limit):
+    try:
+        ids = [int(item) for item in value.split(',') if item.strip()]
+    except ValueError:
+        raise ValidationError(
+            {'ids': 'A comma separated list of integers is required.'})
+    if not ids:
+        raise ValidationError({'ids': 'This field is required.'})
+    if len(ids) > limit:
+        raise ValidationError(
+            {'ids': f'Ensure this field has no more than {limit} ids.'})
+    return ids
+
+
+class UserPersonalInfoDetailView(RetrieveUpdateAPIView, DestroyModelMixin,
+                                 GenericViewSet):
+    """Отображаем, редактируем и удаляем профиль пользователя"""
     lookup_value_regex = '\d+'
     queryset = User.objects.filter(is_active=True).annotate(owner_id=F('id'))
     serializer_class = UserPersonalInfoDetailSerializer
     permission_classes = [IsOwnerOrStaffOrReadOnly]
 
+    @cache_response(lambda view, request, pk: [profile_tag(pk)])
+    def retrieve(self, request, *args, **kwargs):
+        # Профиль одинаков для всех, кто его смотрит
+        return super().retrieve(request, *args, **kwargs)
+
+    def perform_destroy(self, instance):
+        # Подписки удаляются в фоне пачками, см. users.tasks
+        deactivate_user(instance, delete=True)
+
 
 class FollowingView(ViewSet, GenericViewSet):
     """
-    Подписки пользователей друг на друга
+    Подписки пользователей друг на друга.
+    Списки одинаковы для всех и кэшируются, подписки и отписки
+    сбрасывают кэш сразу, подписки деактивированного пользователя -
+    по мере удаления пачками, изменения профилей в списках видны
+    через RESPONSE_CACHE_TIMEOUT.
+    Ребра читаются из get_follow_repository(): при чтении из шардов
+    данные пользователей добавляются только к строкам страницы.
     """
-    pagination_class = PageNumberPagination
+    lookup_value_regex = r'\d+'
+    pagination_class = EstimatedCountPagination
     queryset = Following.objects.all()
 
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        return attach_users(page) if page is not None else None
+
+    @cache_response(lambda view, request, pk: [following_tag(pk)])
     @paginate
     @action(detail=True, methods=['get'], name='Get who user follows',
             serializer_class=UserFollowingListSerializer)
     def following(self, request, pk=None):
         """Список на кого подписн пользователь"""
-        queryset = Following.objects.filter(user_id=pk).values(
-            'following_user_id', username=F('following_user__username'),
-            name=F('following_user__name'), avatar=F('following_user__avatar')
-        ).order_by('following_user__username')
-        return queryset
+        return get_follow_repository().following_list(int(pk))
 
+    @cache_response(lambda view, request, pk: [followers_tag(pk)])
     @paginate
     @action(detail=True, methods=['get'], name='Get who follows user',
             serializer_class=UserFollowersListSerializer)
     def followers(self, request, pk=None):
         """Список кто подписан на пользователя"""
-        queryset = Following.objects.filter(following_user_id=pk).values(
-            'user_id', username=F('user__username'), name=F('user__name'),
-            avatar=F('user__avatar')).order_by('user__username')
-        return queryset
+        return get_follow_repository().followers_list(int(pk))
+
+    @cache_response(lambda view, request, pk: [following_tag(pk)])
+    @paginate
+    @action(detail=True, methods=['get'], url_path='following/recent',
+            name='Get who user recently followed',
+            serializer_class=UserFollowingListSerializer,
+            pagination_class=RecentCursorPagination)
+    def following_recent(self, request, pk=None):
+        """Вкладка профиля: подписки от новых к старым"""
+        return get_follow_repository().following_list(int(pk))
+
+    @cache_response(lambda view, request, pk: [followers_tag(pk)])
+    @paginate
+    @action(detail=True, methods=['get'], url_path='followers/recent',
+            name='Get who recently followed user',
+            serializer_class=UserFollowersListSerializer,
+            pagination_class=RecentCursorPagination)
+    def followers_recent(self, request, pk=None):
+        """Вкладка профиля: подписчики от новых к старым"""
+        return get_follow_repository().followers_list(int(pk))
+
+    @cache_response(lambda view, request, pk, other_pk: [
+        followers_tag(pk), followers_tag(other_pk)])
+    @paginate
+    @action(detail=True, methods=['get'],
+            url_path=r'followers/common/(?P<other_pk>\d+)',
+            name='Get common followers of two users',
+            serializer_class=UserFollowersListSerializer)
+    def followers_common(self, request, pk=None, other_pk=None):
+        """Кто подписан и на пользователя, и на other_pk"""
+        return get_follow_repository().common_followers(int(pk),
+                                                        int(other_pk))
+
+    @action(detail=True, methods=['get'], url_path=r'path/(?P<other_pk>\d+)',
+            name='Get how two users are connected',
+            serializer_class=ShortUserInfoSerializer)
+    def path(self, request, pk=None, other_pk=None):
+        """
+        Кратчайшая цепочка подписок от пользователя до other_pk.
+        Глубина поиска ограничена параметром max_depth и GRAPH_MAX_DEPTH.
+        """
+        limit = getattr(settings, 'GRAPH_MAX_DEPTH', 6)
+        try:
+            max_depth = int(request.query_params.get('max_depth', limit))
+        except ValueError:
+            raise ValidationError(
+                {'max_depth': 'A valid integer is required.'})
+        # Неактивные пользователи не показываются и не связывают других
+        result = shortest_path(int(pk), int(other_pk),
+                               max_depth=max(1, min(max_depth, limit)),
+                               allowed=active_user_ids)
+        path = result.path or []
+        users = {user['id']: user for user in User.objects.filter(
+            id__in=path, is_active=True).values(
+            'id', 'username', 'name', 'avatar')}
+        serializer = self.get_serializer(
+            [users[user_id] for user_id in path if user_id in users],
+            many=True)
+        return Response({'degrees': result.degrees,
+                         'complete': result.complete,
+                         'path': serializer.data})
 
     @action(detail=False, methods=['post'], name='Follow user',
             serializer_class=FollowSerializer)